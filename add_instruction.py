@@ -1,10 +1,26 @@
+import argparse
+import hashlib
 import json
 import os
 import sys
 
+import instrumentacao
+from formato_dados import com_formato, escrever_conversas, formato, iterar_conversas, iterar_pares, resolver_caminho
+
 # --- ARQUIVOS DE ENTRADA E SAÍDA ---
 ARQUIVO_ENTRADA = "dataset_final.jsonl"
 ARQUIVO_SAIDA = "dataset_instruct.jsonl"
+ARQUIVO_ENTRADA_VALIDACAO = "dataset_validacao.jsonl"
+ARQUIVO_SAIDA_VALIDACAO = "dataset_instruct_validacao.jsonl"
+ARQUIVO_COMPRIMENTOS = "comprimentos_tokens.json"
+ARQUIVO_CACHE_TOKENS = "cache_tokens_instrucoes.json"
+TAMANHO_LOTE_TOKENIZACAO = 1000
+
+# --- ORÇAMENTO DE TOKENS ---
+MODELO_TOKENIZADOR = "meta-llama/Meta-Llama-3-8B-Instruct"
+MAX_TOKENS_EXEMPLO = 512 # max_seq_length do fine-tuning: o que passar disso seria truncado em silêncio.
+MIN_TOKENS_INPUT = 16 # Inputs aparados abaixo disso perdem o contexto; o exemplo é descartado.
+MAX_RODADAS_APARO = 3
 
 def carregar_template_de_arquivo(caminho_arquivo):
     """
@@ -20,62 +36,297 @@ def carregar_template_de_arquivo(caminho_arquivo):
         print(f"ERRO FATAL: Falha ao ler o arquivo de descrição '{caminho_arquivo}': {e}")
         sys.exit(1)
 
-def criar_dataset_com_instrucoes(system_prompt_template):
+def formatar_conversa_para_treino(conversa):
     """
-    Lê o dataset JSONL, formata cada entrada com o template de prompt do Llama 3
-    (system, user, assistant) e salva em um novo arquivo.
+    Converte a lista de mensagens no texto plano usado pelo fine-tuning
+    (<|system|>, <|user|>, <|assistant|>). Compartilhada com a pontuação por
+    verossimilhança para que o texto avaliado seja idêntico ao treinado.
     """
-    if not os.path.exists(ARQUIVO_ENTRADA):
-        print(f"ERRO: Arquivo de entrada '{ARQUIVO_ENTRADA}' não encontrado.")
-        print("Certifique-se de ter executado as etapas anteriores do pipeline.")
-        sys.exit(1)
+    mensagens_formatadas = ""
+    for msg in conversa:
+        mensagens_formatadas += f"<|{msg['role']}|>\n{msg['content']}\n"
+    return mensagens_formatadas.strip()
+
+def comprimentos_tokens(caminho_dataset, tokenizer, caminho_cache=ARQUIVO_COMPRIMENTOS):
+    """
+    Número de tokens de cada exemplo de um dataset instrucional, no texto exato
+    que o fine-tuning vê. O resultado fica em cache em `caminho_cache` e só é
+    recalculado quando o dataset (tamanho/data de modificação) ou o tokenizador mudam.
+    """
+    info = os.stat(caminho_dataset)
+    chave = {
+        "dataset": os.path.abspath(caminho_dataset),
+        "tamanho_bytes": info.st_size,
+        "modificado_ns": info.st_mtime_ns,
+        "tokenizador": tokenizer.name_or_path,
+    }
+    if caminho_cache and os.path.exists(caminho_cache):
+        with open(caminho_cache, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("chave") == chave:
+            return cache["comprimentos"]
+
+    textos = [formatar_conversa_para_treino(conversa) for conversa in iterar_conversas(caminho_dataset)]
+    comprimentos = []
+    for inicio in range(0, len(textos), TAMANHO_LOTE_TOKENIZACAO):
+        lote = tokenizer(textos[inicio:inicio + TAMANHO_LOTE_TOKENIZACAO])["input_ids"]
+        comprimentos.extend(len(ids) for ids in lote)
+
+    if caminho_cache:
+        with open(caminho_cache, 'w', encoding='utf-8') as f:
+            json.dump({"chave": chave, "comprimentos": comprimentos}, f)
+    return comprimentos
+
+def _hash_texto(texto):
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:20]
+
+def carregar_cache_tokens(caminho, nome_tokenizador):
+    """Comprimentos já calculados (hash do texto -> tokens), válidos só para o mesmo tokenizador."""
+    if caminho and os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("tokenizador") == nome_tokenizador:
+            return cache["comprimentos"]
+    return {}
+
+def salvar_cache_tokens(caminho, nome_tokenizador, comprimentos):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({"tokenizador": nome_tokenizador, "comprimentos": comprimentos}, f)
+
+def _tokenizar_em_lotes(textos, tokenizer):
+    """Tokeniza em lotes e devolve, para cada texto, o comprimento e os offsets de caractere dos tokens."""
+    resultado = []
+    for inicio in range(0, len(textos), TAMANHO_LOTE_TOKENIZACAO):
+        codificado = tokenizer(textos[inicio:inicio + TAMANHO_LOTE_TOKENIZACAO], return_offsets_mapping=True)
+        resultado.extend(zip((len(ids) for ids in codificado["input_ids"]), codificado["offset_mapping"]))
+    return resultado
+
+def _aparar_input(conversa, offsets, excesso):
+    """
+    Remove do início do input (a parte mais antiga do contexto) pelo menos
+    `excesso` tokens. Em conversas multi-turno saem primeiro as mensagens
+    inteiras mais antigas; com um único input o corte é feito em uma quebra
+    de mensagem. A resposta do assistente nunca é alterada. Retorna None se
+    sobrar contexto de menos.
+    """
+    sistema, *turnos = conversa
+    if len(turnos) > 2:
+        posicao, removidos, descartar = len(f"<|system|>\n{sistema['content']}\n"), 0, 0
+        for msg in turnos[:-2]:
+            fim_msg = posicao + len(f"<|{msg['role']}|>\n{msg['content']}\n")
+            if removidos >= excesso and msg["role"] == "user":
+                break
+            removidos += sum(1 for inicio, fim in offsets if fim > inicio and posicao <= inicio < fim_msg)
+            descartar += 1
+            posicao = fim_msg
+        # A nova versão é retokenizada; se ainda passar do orçamento, o input restante é aparado na próxima rodada.
+        return [sistema] + turnos[descartar:]
+
+    usuario, assistente = turnos
+    inicio_input = len(f"<|system|>\n{sistema['content']}\n<|user|>\n")
+    fim_input = inicio_input + len(usuario["content"])
+    tokens_input = [inicio for inicio, fim in offsets if fim > inicio and inicio >= inicio_input and fim <= fim_input]
+    if len(tokens_input) - excesso < MIN_TOKENS_INPUT:
+        return None
+
+    restante = usuario["content"][tokens_input[excesso] - inicio_input:]
+    quebra = restante.find("\n")
+    if 0 <= quebra < len(restante) - 1:
+        restante = restante[quebra + 1:]
+    restante = restante.strip()
+    if not restante:
+        return None
+    return [sistema, {**usuario, "content": restante}, assistente]
+
+def aplicar_orcamento_tokens(conversas, tokenizer, max_tokens, cache, anteriores=None):
+    """
+    Garante que cada exemplo caiba em `max_tokens` sem cortar a resposta:
+    exemplos longos têm o input aparado e, se não houver como, são
+    descartados. Cada texto é tokenizado uma vez (em lotes); os comprimentos
+    ficam em `cache` para as próximas execuções. Os que já estavam em
+    `anteriores` (o cache da execução passada) são copiados para `cache` em
+    vez de recalculados: no fim, `cache` tem só os textos desta execução.
+    Retorna (conversas_ajustadas, estatisticas).
+    """
+    estatisticas = {"intactos": 0, "aparados": 0, "descartados": 0,
+                    "tokens_antes": 0, "tokens_cortados_antes": 0, "tokens_depois": 0}
+    textos = [formatar_conversa_para_treino(conversa) for conversa in conversas]
+    chaves = [_hash_texto(texto) for texto in textos]
 
-    print(f"Iniciando a criação do dataset instrucional a partir de '{ARQUIVO_ENTRADA}'...")
+    offsets = {}
+    anteriores = anteriores or {}
+    faltantes = []
+    for i, chave in enumerate(chaves):
+        if chave in cache:
+            continue
+        if chave in anteriores:
+            cache[chave] = anteriores[chave]
+        else:
+            faltantes.append(i)
+    for i, (comprimento, offsets_texto) in zip(faltantes, _tokenizar_em_lotes([textos[i] for i in faltantes], tokenizer)):
+        cache[chaves[i]] = comprimento
+        if comprimento > max_tokens:
+            offsets[i] = offsets_texto
 
+    resultado = [None] * len(conversas)
+    pendentes = {}
+    for i, conversa in enumerate(conversas):
+        comprimento = cache[chaves[i]]
+        # Sem o orçamento, o treino processaria até max_tokens de cada exemplo (o resto é truncado).
+        estatisticas["tokens_antes"] += min(comprimento, max_tokens)
+        if comprimento <= max_tokens:
+            resultado[i] = conversa
+            estatisticas["intactos"] += 1
+            continue
+        estatisticas["tokens_cortados_antes"] += max_tokens
+        pendentes[i] = comprimento - max_tokens
+
+    # Exemplos longos que vieram do cache ainda precisam dos offsets para o aparo.
+    sem_offsets = [i for i in pendentes if i not in offsets]
+    for i, (_, offsets_texto) in zip(sem_offsets, _tokenizar_em_lotes([textos[i] for i in sem_offsets], tokenizer)):
+        offsets[i] = offsets_texto
+    pendentes = {i: (conversas[i], offsets[i], excesso) for i, excesso in pendentes.items()}
+
+    # O aparo usa offsets do texto original; a nova versão é conferida e, se ainda passar, aparada de novo.
+    for _ in range(MAX_RODADAS_APARO):
+        aparadas = {i: _aparar_input(*pendente) for i, pendente in pendentes.items()}
+        aparadas = {i: conversa for i, conversa in aparadas.items() if conversa is not None}
+        indices = list(aparadas)
+        novos_textos = [formatar_conversa_para_treino(aparadas[i]) for i in indices]
+        pendentes = {}
+        for i, texto, (comprimento, offsets_texto) in zip(indices, novos_textos, _tokenizar_em_lotes(novos_textos, tokenizer)):
+            cache[_hash_texto(texto)] = comprimento
+            if comprimento <= max_tokens:
+                resultado[i] = aparadas[i]
+                estatisticas["aparados"] += 1
+            else:
+                pendentes[i] = (aparadas[i], offsets_texto, comprimento - max_tokens)
+        if not pendentes:
+            break
+
+    ajustadas = []
+    for conversa in resultado:
+        if conversa is None:
+            estatisticas["descartados"] += 1
+            continue
+        ajustadas.append(conversa)
+        estatisticas["tokens_depois"] += cache[_hash_texto(formatar_conversa_para_treino(conversa))]
+    return ajustadas, estatisticas
+
+def imprimir_estatisticas_orcamento(estatisticas, max_tokens):
+    total = estatisticas["intactos"] + estatisticas["aparados"] + estatisticas["descartados"]
+    antes, depois = estatisticas["tokens_antes"], estatisticas["tokens_depois"]
+    print(f"Orçamento de {max_tokens} tokens por exemplo:")
+    print(f"  - Intactos: {estatisticas['intactos']} de {total}")
+    print(f"  - Input aparado (resposta preservada): {estatisticas['aparados']}")
+    print(f"  - Descartados (não cabem sem cortar a resposta): {estatisticas['descartados']}")
+    if antes:
+        print(f"  - Tokens de treino por época: {antes} -> {depois} ({1 - depois / antes:.1%} a menos)")
+        print(f"  - Compute antes gasto em exemplos que seriam truncados: "
+              f"{estatisticas['tokens_cortados_antes'] / antes:.1%}")
+
+def formatar_arquivo(caminho_entrada, caminho_saida, system_prompt_template, tokenizer=None,
+                     max_tokens=MAX_TOKENS_EXEMPLO, cache_tokens=None, cache_anterior=None):
+    """
+    Formata cada par de `caminho_entrada` com o template de prompt do Llama 3
+    (system, user, assistant) e salva em `caminho_saida` (JSONL ou Parquet, pela
+    extensão). Com `tokenizer`, aplica
+    o orçamento de tokens. Retorna a quantidade de exemplos.
+    """
     dados_formatados = []
     
-    with open(ARQUIVO_ENTRADA, 'r', encoding='utf-8') as f_in:
-        for linha in f_in:
-            try:
-                exemplo = json.loads(linha)
-                
-                input_original = exemplo.get("input")
-                output_original = exemplo.get("output")
-                categoria = exemplo.get("categoria", "desconhecido")
-
-                if not input_original or not output_original:
-                    continue
-
-                prompt_sistema = system_prompt_template.format(categoria=categoria)
-
-                conversa_formatada = [
-                    {"role": "system", "content": prompt_sistema},
-                    {"role": "user", "content": input_original},
-                    {"role": "assistant", "content": output_original}
-                ]
-                
-                dados_formatados.append(conversa_formatada)
-
-            except json.JSONDecodeError:
-                print(f"AVISO: Pulando linha mal formatada: {linha.strip()}")
+    with instrumentacao.etapa("formatacao", unidade="exemplos") as registro:
+        for exemplo in iterar_pares(caminho_entrada):
+            input_original = exemplo.get("input")
+            output_original = exemplo.get("output")
+            categoria = exemplo.get("categoria", "desconhecido")
+
+            if not input_original or not output_original:
                 continue
+
+            prompt_sistema = system_prompt_template.format(categoria=categoria)
+
+            # Pares gerados no modo de contexto já trazem a conversa user/assistant completa.
+            turnos = exemplo.get("mensagens") or [
+                {"role": "user", "content": input_original},
+                {"role": "assistant", "content": output_original}
+            ]
+            conversa_formatada = [{"role": "system", "content": prompt_sistema}] + turnos
+            
+            dados_formatados.append(conversa_formatada)
+        registro["itens"] = len(dados_formatados)
     
-    with open(ARQUIVO_SAIDA, 'w', encoding='utf-8') as f_out:
-        for item in dados_formatados:
-            f_out.write(json.dumps(item, ensure_ascii=False) + '\n')
+    if tokenizer is not None:
+        with instrumentacao.etapa("orcamento_tokens", unidade="exemplos", itens=len(dados_formatados)):
+            dados_formatados, estatisticas = aplicar_orcamento_tokens(
+                dados_formatados, tokenizer, max_tokens, cache_tokens if cache_tokens is not None else {},
+                cache_anterior)
+        imprimir_estatisticas_orcamento(estatisticas, max_tokens)
+
+    with instrumentacao.etapa("escrita", unidade="exemplos", itens=len(dados_formatados)):
+        escrever_conversas(caminho_saida, dados_formatados)
+    return len(dados_formatados)
+
+def criar_dataset_com_instrucoes(system_prompt_template, tokenizer=None, max_tokens=MAX_TOKENS_EXEMPLO,
+                                 formato_saida=None):
+    """
+    Gera o dataset instrucional de treino e, se a Etapa 2 tiver separado
+    pares de validação, também o de validação. Com `tokenizer`, os exemplos
+    são ajustados ao orçamento de `max_tokens`. A entrada pode estar em JSONL
+    ou Parquet; a saída segue o formato da entrada, salvo `formato_saida`.
+    """
+    arquivo_entrada = resolver_caminho(ARQUIVO_ENTRADA)
+    if not os.path.exists(arquivo_entrada):
+        print(f"ERRO: Arquivo de entrada '{ARQUIVO_ENTRADA}' não encontrado.")
+        print("Certifique-se de ter executado as etapas anteriores do pipeline.")
+        sys.exit(1)
+    formato_saida = formato_saida or formato(arquivo_entrada)
+    arquivo_saida = com_formato(ARQUIVO_SAIDA, formato_saida)
+    arquivo_entrada_validacao = resolver_caminho(ARQUIVO_ENTRADA_VALIDACAO)
+    arquivo_saida_validacao = com_formato(ARQUIVO_SAIDA_VALIDACAO, formato_saida)
+
+    print(f"Iniciando a criação do dataset instrucional a partir de '{arquivo_entrada}'...")
+    # Só os comprimentos usados nesta execução são salvos: os de exemplos que saíram do dataset não se acumulam.
+    cache_tokens, cache_anterior = None, None
+    if tokenizer is not None:
+        cache_tokens, cache_anterior = {}, carregar_cache_tokens(ARQUIVO_CACHE_TOKENS, tokenizer.name_or_path)
+    total_treino = formatar_arquivo(arquivo_entrada, arquivo_saida, system_prompt_template,
+                                    tokenizer, max_tokens, cache_tokens, cache_anterior)
+
+    total_validacao = None
+    if os.path.exists(arquivo_entrada_validacao):
+        total_validacao = formatar_arquivo(arquivo_entrada_validacao, arquivo_saida_validacao, system_prompt_template,
+                                           tokenizer, max_tokens, cache_tokens, cache_anterior)
+    if tokenizer is not None:
+        salvar_cache_tokens(ARQUIVO_CACHE_TOKENS, tokenizer.name_or_path, cache_tokens)
 
     print("-" * 50)
     print("Etapa de injeção de instrução concluída com sucesso!")
-    print(f"Foram criados {len(dados_formatados)} exemplos de treino.")
-    print(f"O novo dataset instrucional foi salvo em: '{ARQUIVO_SAIDA}'")
+    print(f"Foram criados {total_treino} exemplos de treino.")
+    print(f"O novo dataset instrucional foi salvo em: '{arquivo_saida}'")
+    if total_validacao is not None:
+        print(f"Foram criados {total_validacao} exemplos de validação em '{arquivo_saida_validacao}'.")
     print("-" * 50)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Uso: python add_instruction.py \"caminho/para/descricao.txt\"")
-        sys.exit(1)
-    
-    caminho_descricao = sys.argv[1]
-    template = carregar_template_de_arquivo(caminho_descricao)
-    criar_dataset_com_instrucoes(template)
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Injeta o prompt de sistema da persona nos pares e ajusta cada exemplo ao orçamento de tokens.",
+        epilog="Exemplo: python add_instruction.py descricao.txt"
+    )
+    parser.add_argument("caminho_descricao", help="Caminho para o arquivo de descrição da persona.")
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS_EXEMPLO,
+                        help="Tokens máximos por exemplo, como no max_seq_length do treino (0 desativa o ajuste).")
+    parser.add_argument("--tokenizador", default=MODELO_TOKENIZADOR)
+    parser.add_argument("--formato", choices=["jsonl", "parquet"], default=None,
+                        help="Formato do dataset instrucional (padrão: o mesmo do dataset de entrada).")
+    args = parser.parse_args()
+
+    instrumentacao.iniciar("add_instruction")
+    template = carregar_template_de_arquivo(args.caminho_descricao)
+    tokenizer = None
+    if args.max_tokens > 0:
+        from transformers import AutoTokenizer
+        print(f"Carregando o tokenizador de '{args.tokenizador}'...")
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizador)
+    criar_dataset_com_instrucoes(template, tokenizer, args.max_tokens, args.formato)
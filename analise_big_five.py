@@ -1,74 +1,33 @@
-import os
 import sys
+
 import pandas as pd
-import numpy as np
+
+import instrumentacao
+from analise_comum import NIVEL_CONFIANCA, REAMOSTRAGENS, carregar_analise
 
 def analyze_personality_scores(folder_path, human_baseline_col, output_filename="analise_big_five_resultados.txt"):
     """
     Lê arquivos CSV, realiza uma análise comparativa avançada e genérica, e salva em um arquivo de texto.
     """
-    if not os.path.isdir(folder_path):
-        print(f"ERRO: O caminho '{folder_path}' não é um diretório válido.")
-        sys.exit(1)
-
-    csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
-    if not csv_files:
-        print(f"ERRO: Nenhum arquivo .csv encontrado no diretório '{folder_path}'.")
-        sys.exit(1)
-
-    print(f"Encontrados {len(csv_files)} arquivos CSV. Baseline humana definida como: '{human_baseline_col}'. Iniciando análise...")
-
-    all_data = {}
-    persona_columns = []
-
-    # 1. Carregar todos os dados primeiro
-    for filename in csv_files:
-        try:
-            # Limpa o nome do arquivo para obter a categoria, usando o nome da baseline fornecido
-            category_name = os.path.splitext(filename)[0].replace(human_baseline_col, "").strip()
-            df = pd.read_csv(os.path.join(folder_path, filename))
-            
-            if not persona_columns:
-                persona_columns = [col for col in df.columns if col.lower() not in ['category', 'categoria', 'pergunta', 'texto']]
-            
-            all_data[category_name] = df[persona_columns]
-        except Exception as e:
-            print(f"AVISO: Falha ao carregar '{filename}': {e}")
-            continue
-
-    if not all_data:
-        print("ERRO: Nenhum dado válido foi carregado. Saindo.")
-        sys.exit(1)
-        
-    # Verifica se a coluna da baseline humana existe nos dados
-    if human_baseline_col not in persona_columns:
-        print(f"ERRO: A coluna da baseline humana '{human_baseline_col}' não foi encontrada nos arquivos CSV.")
-        print(f"Colunas encontradas: {persona_columns}")
-        sys.exit(1)
-
-    # 2. Calcular as médias por categoria e criar uma tabela pivotada
-    mean_scores_list = []
-    for category, df in all_data.items():
-        row = {'Traço de Personalidade': category}
-        for persona in persona_columns:
-            scores = pd.to_numeric(df[persona], errors='coerce').dropna()
-            row[persona] = scores.mean()
-        mean_scores_list.append(row)
-    
-    pivoted_means_df = pd.DataFrame(mean_scores_list).set_index('Traço de Personalidade').T
-    pivoted_means_df.index.name = "Persona"
-    pivoted_means_df = pivoted_means_df.round(2)
-
-    # 3. Calcular as "distâncias de personalidade" em relação à baseline humana
+    # 1-3. Médias, distâncias para a baseline e incerteza (compartilhadas com o gerar_graficos.py, em cache).
+    analise = carregar_analise(folder_path, human_baseline_col)
+    pivoted_means_df = analise['medias'].round(2)
+    pivoted_means_df.columns.name = 'Traço de Personalidade'
+    diferencas = analise['diferencas'].rename_axis(columns='Traço de Personalidade')
+    distancias = analise['distancias']
+    tem_incerteza = 'dif_p_valor' in analise
     distance_results = {}
-    human_vector = pivoted_means_df.loc[human_baseline_col]
-    
-    for persona in persona_columns:
-        if persona != human_baseline_col:
-            persona_vector = pivoted_means_df.loc[persona]
-            abs_diff = (human_vector - persona_vector).abs().round(2)
-            euclidean_dist = np.linalg.norm(human_vector - persona_vector).round(2)
-            distance_results[persona] = {'diff_por_traco': abs_diff, 'distancia_total': euclidean_dist}
+    for persona in diferencas.index:
+        diff_por_traco = diferencas.loc[persona].round(2)
+        if tem_incerteza:
+            diff_por_traco = pd.DataFrame({
+                'Diferença': diff_por_traco,
+                f'IC{NIVEL_CONFIANCA:.0%} inf.': analise['dif_ic_inferior'].loc[persona].round(2),
+                f'IC{NIVEL_CONFIANCA:.0%} sup.': analise['dif_ic_superior'].loc[persona].round(2),
+                'p (permutação)': analise['dif_p_valor'].loc[persona].round(4),
+            }).rename_axis('Traço de Personalidade')
+        distance_results[persona] = {'diff_por_traco': diff_por_traco,
+                                     'distancia_total': round(float(distancias.loc[persona, 'distancia_total']), 2)}
 
     # 4. Escrever tudo para o arquivo de saída
     print(f"Salvando análise em '{output_filename}'...")
@@ -93,8 +52,21 @@ def analyze_personality_scores(folder_path, human_baseline_col, output_filename=
             f.write(data['diff_por_traco'].to_string())
             f.write("\n\n")
             f.write(f"DISTÂNCIA EUCLIDIANA TOTAL (dissimilaridade geral): {data['distancia_total']}\n")
+            if tem_incerteza:
+                linha = distancias.loc[persona]
+                f.write(f"IC {NIVEL_CONFIANCA:.0%} (bootstrap com correção de viés): [{linha['ic_inferior']:.2f}, {linha['ic_superior']:.2f}] | "
+                        f"p-valor (permutação, H0: mesma personalidade): {linha['p_valor']:.4f}\n")
             f.write("(Este é um único número que resume a diferença total de personalidade. Quanto menor, mais parecida a IA é do humano de referência.)\n\n")
 
+        if tem_incerteza and not analise['comparacoes'].empty:
+            f.write(f"--- Comparação Entre as IAs (diferença de distância até {human_baseline_col}) ---\n")
+            f.write(f"Intervalos de {NIVEL_CONFIANCA:.0%} por bootstrap ({REAMOSTRAGENS} reamostragens das perguntas). "
+                    "Se o intervalo não contém 0, a diferença entre as duas IAs é consistente.\n\n")
+            for comparacao, linha in analise['comparacoes'].iterrows():
+                veredito = "inconclusivo (contém 0)" if linha['ic_inferior'] <= 0 <= linha['ic_superior'] else "diferença consistente"
+                f.write(f"{comparacao}: [{linha['ic_inferior']:.2f}, {linha['ic_superior']:.2f}] -> {veredito}\n")
+            f.write("\n")
+
     print(f"\nAnálise concluída com sucesso. Resultados salvos em '{output_filename}'.")
 
 
@@ -107,4 +79,5 @@ if __name__ == "__main__":
         
     input_folder = sys.argv[1]
     human_column = sys.argv[2]
+    instrumentacao.iniciar("analise_big_five")
     analyze_personality_scores(input_folder, human_column)
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""
+Núcleo compartilhado da análise Big Five (analise_big_five.py e gerar_graficos.py).
+
+Todos os CSVs da pasta são lidos e convertidos de uma vez; as médias por
+persona e traço, as distâncias em relação à baseline humana e a incerteza
+delas (intervalos bootstrap e testes de permutação) ficam em cache em um
+arquivo Parquet, invalidado quando algum CSV muda (nome, tamanho ou data de
+modificação) ou quando a baseline ou os parâmetros da reamostragem mudam.
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import instrumentacao
+
+# --- CONFIGURAÇÕES ---
+PASTA_CACHE = "cache_analise"
+COLUNAS_NAO_PERSONA = ['category', 'categoria', 'pergunta', 'texto']
+VERSAO_CACHE = 2 # Incrementar quando o formato ou o cálculo mudar.
+
+# Incerteza: as perguntas de cada traço são reamostradas (bootstrap) ou têm o
+# sinal da diferença pareada trocado ao acaso (permutação).
+REAMOSTRAGENS = 10000
+NIVEL_CONFIANCA = 0.95
+SEMENTE = 42
+MAX_ELEMENTOS_TENSOR = 20_000_000 # Limita a memória das matrizes (reamostragens x perguntas) de cada bloco.
+
+def listar_csvs(pasta):
+    """Arquivos .csv da pasta, em ordem alfabética; encerra com erro se não houver nenhum."""
+    if not os.path.isdir(pasta):
+        print(f"ERRO: O caminho '{pasta}' não é um diretório válido.")
+        sys.exit(1)
+    arquivos = sorted(f for f in os.listdir(pasta) if f.endswith('.csv'))
+    if not arquivos:
+        print(f"ERRO: Nenhum arquivo .csv encontrado no diretório '{pasta}'.")
+        sys.exit(1)
+    return arquivos
+
+def chave_cache(pasta, arquivos, baseline, reamostragens=REAMOSTRAGENS):
+    """Identifica o conjunto de entradas: nome, tamanho e data de modificação de cada CSV, a baseline e a reamostragem."""
+    entradas = []
+    for nome in arquivos:
+        info = os.stat(os.path.join(pasta, nome))
+        entradas.append([nome, info.st_size, info.st_mtime_ns])
+    conteudo = json.dumps({"versao": VERSAO_CACHE, "baseline": baseline, "arquivos": entradas,
+                           "reamostragens": reamostragens, "nivel": NIVEL_CONFIANCA, "semente": SEMENTE})
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+def _caminho_cache(pasta):
+    # Um arquivo de cache por pasta de CSVs.
+    nome = hashlib.sha1(os.path.abspath(pasta).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(PASTA_CACHE, f"big_five_{nome}.parquet")
+
+# --- Leitura e Cálculo ---
+
+def carregar_pontuacoes(pasta, arquivos, baseline):
+    """
+    Lê todos os CSVs e devolve um único DataFrame numérico (uma linha por
+    resposta, uma coluna por persona) indexado pelo traço, que vem do nome do
+    arquivo sem o nome da baseline.
+    """
+    tabelas, tracos, colunas_persona = [], [], None
+    with instrumentacao.etapa("leitura_csv", unidade="arquivos", itens=len(arquivos)):
+        for nome in arquivos:
+            try:
+                # Só as colunas de persona são lidas: as de texto (pergunta etc.) são as mais caras de parsear.
+                df = pd.read_csv(os.path.join(pasta, nome), usecols=lambda col: col.lower() not in COLUNAS_NAO_PERSONA)
+            except Exception as e:
+                print(f"AVISO: Falha ao carregar '{nome}': {e}")
+                continue
+            if colunas_persona is None:
+                colunas_persona = list(df.columns)
+            try:
+                tabelas.append(df[colunas_persona])
+            except KeyError as e:
+                print(f"AVISO: Falha ao carregar '{nome}': {e}")
+                continue
+            tracos.append(os.path.splitext(nome)[0].replace(baseline, "").strip())
+
+    if not tabelas:
+        print("ERRO: Nenhum dado válido foi carregado. Saindo.")
+        sys.exit(1)
+    pontuacoes = pd.concat(tabelas, keys=tracos, names=["Traço", None])
+    # Conversão numérica de todas as colunas de uma vez (valores inválidos viram NaN e são ignorados nas médias).
+    return pontuacoes.apply(pd.to_numeric, errors='coerce').droplevel(1)
+
+def calcular_analise(pontuacoes, baseline):
+    """
+    Médias (persona x traço), diferença absoluta de cada persona para a
+    baseline em cada traço e distância euclidiana total.
+    Retorna (medias, diferencas, distancias).
+    """
+    if baseline not in pontuacoes.columns:
+        print(f"ERRO: A coluna da baseline humana '{baseline}' não foi encontrada nos arquivos CSV.")
+        print(f"Colunas encontradas: {list(pontuacoes.columns)}")
+        sys.exit(1)
+    medias = pontuacoes.groupby(level="Traço", sort=False).mean().T
+    medias.index.name = "Persona"
+    medias.columns.name = None
+
+    outras = medias.drop(index=baseline)
+    diferencas = (outras - medias.loc[baseline]).abs()
+    distancias = pd.Series(np.linalg.norm((outras - medias.loc[baseline]).to_numpy(), axis=1),
+                           index=outras.index, name="distancia_total")
+    return medias, diferencas, distancias
+
+# --- Incerteza (bootstrap e permutação) ---
+
+def _matrizes_por_traco(pontuacoes):
+    """Uma matriz (perguntas x personas) por traço, na ordem das médias."""
+    return [grupo.to_numpy(dtype=float) for _, grupo in pontuacoes.groupby(level="Traço", sort=False)]
+
+def _tamanho_bloco(reamostragens, elementos_por_reamostragem):
+    return max(1, min(reamostragens, MAX_ELEMENTOS_TENSOR // max(1, elementos_por_reamostragem)))
+
+def medias_bootstrap(matrizes, reamostragens, rng):
+    """
+    Médias de cada persona em cada traço para `reamostragens` reamostragens
+    com reposição das perguntas (as respostas de uma pergunta ficam juntas,
+    preservando o pareamento). Retorna um array (reamostragens x traços x personas).
+    """
+    personas = matrizes[0].shape[1]
+    resultado = np.empty((reamostragens, len(matrizes), personas))
+    for t, matriz in enumerate(matrizes):
+        validos = ~np.isnan(matriz)
+        valores = np.where(validos, matriz, 0.0)
+        n = len(matriz)
+        bloco = _tamanho_bloco(reamostragens, n)
+        for inicio in range(0, reamostragens, bloco):
+            fim = min(inicio + bloco, reamostragens)
+            indices = rng.integers(0, n, size=(fim - inicio, n))
+            # Quantas vezes cada pergunta foi sorteada em cada reamostragem: somar o tensor
+            # (reamostragens x perguntas x personas) vira um produto de matrizes.
+            deslocamentos = np.arange(fim - inicio)[:, None] * n
+            contagens = np.bincount((indices + deslocamentos).ravel(), minlength=(fim - inicio) * n)
+            contagens = contagens.reshape(fim - inicio, n).astype(float)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                resultado[inicio:fim, t] = (contagens @ valores) / (contagens @ validos.astype(float))
+    return resultado
+
+def diferencas_permutacao(matrizes, coluna_baseline, reamostragens, rng):
+    """
+    Teste de permutação pareado: sob a hipótese nula a persona e a baseline
+    são intercambiáveis em cada pergunta, então o sinal de cada diferença
+    pode ser trocado ao acaso. Retorna (observadas, nulas), com as médias das
+    diferenças (traços x outras personas) e as mesmas médias sob a nula
+    (reamostragens x traços x outras personas).
+    """
+    outras = [c for c in range(matrizes[0].shape[1]) if c != coluna_baseline]
+    observadas = np.empty((len(matrizes), len(outras)))
+    nulas = np.empty((reamostragens, len(matrizes), len(outras)))
+    for t, matriz in enumerate(matrizes):
+        diferencas = matriz[:, outras] - matriz[:, [coluna_baseline]]
+        validos = ~np.isnan(diferencas)
+        diferencas = np.where(validos, diferencas, 0.0)
+        n_validos = np.maximum(validos.sum(axis=0), 1)
+        observadas[t] = diferencas.sum(axis=0) / n_validos
+        bloco = _tamanho_bloco(reamostragens, len(matriz))
+        for inicio in range(0, reamostragens, bloco):
+            fim = min(inicio + bloco, reamostragens)
+            sinais = rng.integers(0, 2, size=(fim - inicio, len(matriz))) * 2.0 - 1.0
+            nulas[inicio:fim, t] = (sinais @ diferencas) / n_validos
+    return observadas, nulas
+
+def intervalo_bootstrap(reamostras, observado, minimo=None):
+    """
+    Intervalo percentil com correção de viés: a distribuição bootstrap é
+    deslocada pelo viés estimado (média bootstrap - valor observado) antes dos
+    quantis. Diferenças absolutas e distâncias são enviesadas para cima perto
+    de zero; sem a correção o intervalo pode nem conter o valor observado.
+    """
+    alfa = (1 - NIVEL_CONFIANCA) / 2
+    corrigidas = reamostras - (np.nanmean(reamostras, axis=0) - observado)
+    inferior, superior = np.nanquantile(corrigidas, [alfa, 1 - alfa], axis=0)
+    if minimo is not None:
+        inferior, superior = np.maximum(inferior, minimo), np.maximum(superior, minimo)
+    return inferior, superior
+
+def _p_valor(observado, nulas):
+    # Bilateral, com a correção +1 para nunca reportar p = 0.
+    return (1 + (np.abs(nulas) >= np.abs(observado) - 1e-12).sum(axis=0)) / (len(nulas) + 1)
+
+def calcular_incerteza(pontuacoes, medias, baseline, reamostragens=REAMOSTRAGENS, semente=SEMENTE):
+    """
+    Intervalos de confiança (bootstrap) e p-valores (permutação)
+    da diferença absoluta por traço e da distância euclidiana total de cada
+    persona para a baseline, além do intervalo da diferença de distância
+    entre cada par de personas. Tudo é calculado sobre arrays de
+    reamostragens de uma vez. Retorna um dicionário de DataFrames.
+    """
+    rng = np.random.default_rng(semente)
+    matrizes = _matrizes_por_traco(pontuacoes)
+    personas = list(pontuacoes.columns)
+    coluna_baseline = personas.index(baseline)
+    outras = [p for p in personas if p != baseline]
+    tracos = list(medias.columns)
+
+    boot = medias_bootstrap(matrizes, reamostragens, rng)
+    boot_dif = np.abs(np.delete(boot, coluna_baseline, axis=2) - boot[:, :, [coluna_baseline]])
+    boot_dist = np.sqrt((boot_dif ** 2).sum(axis=1)) # (reamostragens x outras personas)
+    dif = np.abs(medias.loc[outras].to_numpy() - medias.loc[baseline].to_numpy()).T # (traços x outras personas)
+    dist = np.sqrt((dif ** 2).sum(axis=0))
+    inferior_dif, superior_dif = intervalo_bootstrap(boot_dif, dif, minimo=0.0)
+    inferior_dist, superior_dist = intervalo_bootstrap(boot_dist, dist, minimo=0.0)
+
+    observadas, nulas = diferencas_permutacao(matrizes, coluna_baseline, reamostragens, rng)
+    p_dif = _p_valor(observadas, nulas)
+    p_dist = _p_valor(np.sqrt((observadas ** 2).sum(axis=0)), np.sqrt((nulas ** 2).sum(axis=1)))
+
+    def tabela(valores):
+        return pd.DataFrame(valores.T, index=pd.Index(outras, name="Persona"), columns=tracos)
+
+    distancias = pd.DataFrame({"ic_inferior": inferior_dist, "ic_superior": superior_dist, "p_valor": p_dist},
+                              index=pd.Index(outras, name="Persona"))
+    comparacoes = []
+    for i, a in enumerate(outras):
+        for j in range(i + 1, len(outras)):
+            inferior, superior = intervalo_bootstrap(boot_dist[:, i] - boot_dist[:, j], dist[i] - dist[j])
+            comparacoes.append({"Comparação": f"{a} - {outras[j]}", "ic_inferior": inferior, "ic_superior": superior})
+    colunas_comparacao = ["Comparação", "ic_inferior", "ic_superior"]
+    return {
+        "dif_ic_inferior": tabela(inferior_dif),
+        "dif_ic_superior": tabela(superior_dif),
+        "dif_p_valor": tabela(p_dif),
+        "distancias_incerteza": distancias,
+        "comparacoes": pd.DataFrame(comparacoes, columns=colunas_comparacao).set_index("Comparação"),
+    }
+
+# --- Cache em Parquet ---
+
+def _salvar_cache(caminho, chave, analise):
+    # Formato longo (tabela, linha, coluna, valor): um único arquivo guarda todas as tabelas.
+    partes = []
+    for tabela, df in analise.items():
+        longo = df.rename_axis("linha").reset_index().melt(id_vars="linha", var_name="coluna", value_name="valor")
+        partes.append(longo.assign(tabela=tabela, nome_indice=df.index.name or ""))
+    longo = pd.concat(partes, ignore_index=True).assign(chave=chave)
+    longo["coluna"] = longo["coluna"].astype(str)
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    longo.to_parquet(caminho, index=False)
+
+def _ler_cache(caminho, chave):
+    longo = pd.read_parquet(caminho)
+    if longo.empty or longo["chave"].iat[0] != chave:
+        return None
+
+    analise = {}
+    for tabela, parte in longo.groupby("tabela", sort=False):
+        df = parte.pivot(index="linha", columns="coluna", values="valor")
+        # pivot ordena alfabeticamente; a ordem original é a da primeira aparição.
+        df = df.loc[parte["linha"].unique(), parte["coluna"].unique()]
+        df.index.name = parte["nome_indice"].iat[0] or None
+        df.columns.name = None
+        analise[tabela] = df
+    return analise
+
+def carregar_analise(pasta, baseline, usar_cache=True, reamostragens=REAMOSTRAGENS):
+    """
+    Ponto de entrada dos scripts de análise. Devolve um dicionário com
+    'medias' (persona x traço), 'diferencas' (diferença absoluta para a
+    baseline) e 'distancias' (coluna 'distancia_total'). Com `reamostragens`
+    > 0, 'distancias' ganha as colunas de intervalo e p-valor e o dicionário
+    as demais tabelas de calcular_incerteza.
+    Lê do cache Parquet quando nada mudou.
+    """
+    arquivos = listar_csvs(pasta)
+    print(f"Encontrados {len(arquivos)} arquivos CSV. Baseline humana definida como: '{baseline}'.")
+    chave = chave_cache(pasta, arquivos, baseline, reamostragens)
+    caminho = _caminho_cache(pasta)
+
+    if usar_cache and os.path.exists(caminho):
+        try:
+            analise = _ler_cache(caminho, chave)
+        except ImportError:
+            analise = None
+        if analise is not None:
+            print(f"Usando análise em cache ('{caminho}').")
+            return analise
+
+    pontuacoes = carregar_pontuacoes(pasta, arquivos, baseline)
+    with instrumentacao.etapa("calculo_medias", unidade="respostas", itens=len(pontuacoes)):
+        medias, diferencas, distancias = calcular_analise(pontuacoes, baseline)
+    analise = {"medias": medias, "diferencas": diferencas, "distancias": distancias.to_frame()}
+    if reamostragens > 0:
+        with instrumentacao.etapa("incerteza", unidade="reamostragens", itens=reamostragens):
+            incerteza = calcular_incerteza(pontuacoes, medias, baseline, reamostragens)
+        analise["distancias"] = analise["distancias"].join(incerteza.pop("distancias_incerteza"))
+        analise.update(incerteza)
+    if usar_cache:
+        try:
+            _salvar_cache(caminho, chave, analise)
+        except ImportError:
+            print("AVISO: pyarrow (ou fastparquet) não instalado; a análise não será guardada em cache.")
+    return analise
@@ -1,53 +1,43 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from peft import PeftModel
+import argparse
 import sys
 import os
-import json
 import random
 import numpy as np
-import pandas as pd
 import re
 
-# --- Validação e Configuração Inicial ---
-if len(sys.argv) != 2:
-    print("Uso: python analise_quantitativa.py <N_amostras>")
-    print("Exemplo: python analise_quantitativa.py 150")
-    sys.exit(1)
+from backend_inferencia import adicionar_argumentos_backend, carregar_modelo
+import instrumentacao
+from geracao import adicionar_argumentos_especulacao, criar_especulador, gerar_resposta
+from formato_dados import ler_pares, resolver_caminho
+from perfil_estilometrico import ARQUIVO_PERFIL, CATEGORIA_GERAL, carregar_perfil, comparar, formatar_comparacao, perfilar
 
-try:
-    N_SAMPLES = int(sys.argv[1])
-except ValueError:
-    print("ERRO: O número de amostras deve ser um inteiro.")
-    sys.exit(1)
+# --- Validação e Configuração Inicial ---
+parser = argparse.ArgumentParser(
+    description="Compara métricas quantitativas e semânticas entre respostas humanas e do Doppelbot.",
+    epilog="Exemplo: python analise_quantitativa.py 150"
+)
+parser.add_argument("n_amostras", type=int, help="Número de amostras aleatórias do dataset.")
+adicionar_argumentos_backend(parser)
+adicionar_argumentos_especulacao(parser)
+parser.add_argument("--perfil", default=ARQUIVO_PERFIL,
+                    help="Perfil estilométrico do dataset completo (perfil_estilometrico.py); usado se existir.")
+args = parser.parse_args()
+
+N_SAMPLES = args.n_amostras
 
 # --- Caminhos e IDs de Modelo ---
 BASE_MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
 ADAPTERS_PATH = "doppelbot-llama3-8b-instruct-adapters"
-DATASET_FILE = "dataset_final.jsonl"
+DATASET_FILE = resolver_caminho("dataset_final.jsonl") # Ou o .parquet, se for o mais recente.
 OUTPUT_FILE = "analise_resultados.txt" # Nome do arquivo de saída
 EMBEDDING_MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2' # Modelo leve e eficiente para embeddings
 
 # --- Funções de Carregamento ---
 
-def carregar_doppelbot():
+def carregar_doppelbot(backend="cuda", threads=None):
     """Carrega o modelo Doppelbot fine-tuned com LoRA."""
     print("Carregando modelo Doppelbot e tokenizador...")
-    bnb_config = BitsAndBytesConfig(
-        load_in_4bit=True,
-        bnb_4bit_quant_type="nf4",
-        bnb_4bit_compute_dtype=torch.bfloat16
-    )
-    model = AutoModelForCausalLM.from_pretrained(
-        BASE_MODEL_ID,
-        quantization_config=bnb_config,
-        device_map="auto"
-    )
-    tokenizer = AutoTokenizer.from_pretrained(ADAPTERS_PATH)
-    model = PeftModel.from_pretrained(model, ADAPTERS_PATH)
-    model = model.eval()
+    model, tokenizer = carregar_modelo(BASE_MODEL_ID, ADAPTERS_PATH, backend, threads, ajustar_vocabulario=False)
     print("Modelo Doppelbot carregado.")
     return model, tokenizer
 
@@ -57,8 +47,8 @@ def carregar_dados_amostra(filepath, n):
         print(f"ERRO: Arquivo de dataset '{filepath}' não encontrado.")
         sys.exit(1)
     
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = [json.loads(line) for line in f]
+    # Só as colunas usadas: no Parquet o contexto multi-turno nem é lido.
+    data = ler_pares(filepath, colunas=["input", "output", "system"])
     
     if len(data) < n:
         print(f"AVISO: O dataset tem apenas {len(data)} amostras. Usando todas as amostras.")
@@ -68,7 +58,7 @@ def carregar_dados_amostra(filepath, n):
 
 # --- Função de Geração de Resposta ---
 
-def gerar_respostas_bot(model, tokenizer, prompts):
+def gerar_respostas_bot(model, tokenizer, prompts, especulador=None):
     """Gera respostas do Doppelbot para uma lista de prompts."""
     respostas_bot = []
     print(f"\nGerando {len(prompts)} respostas do Doppelbot...")
@@ -81,28 +71,7 @@ def gerar_respostas_bot(model, tokenizer, prompts):
             {"role": "user", "content": prompt_data["input"]}
         ]
         
-        input_ids = tokenizer.apply_chat_template(
-            conversa,
-            add_generation_prompt=True,
-            return_tensors="pt"
-        ).to(model.device)
-
-        with torch.no_grad():
-            outputs = model.generate(
-                    input_ids,
-                    max_new_tokens=150,
-                    do_sample=True,
-                    temperature=0.3,
-                    top_p=0.9,
-                    top_k=50,
-                    repetition_penalty=1.25,
-                    no_repeat_ngram_size=3,
-                    eos_token_id=[tokenizer.eos_token_id, tokenizer.convert_tokens_to_ids("<|eot_id|>")],
-                    pad_token_id=tokenizer.eos_token_id
-                )
-        
-        resposta_ids = outputs[0][input_ids.shape[-1]:]
-        resposta_texto = tokenizer.decode(resposta_ids, skip_special_tokens=True).strip()
+        resposta_texto = gerar_resposta(model, tokenizer, conversa, max_new_tokens=150, especulador=especulador)
         respostas_bot.append(resposta_texto)
         
     print("Geração de respostas concluída.")
@@ -140,6 +109,9 @@ def calcular_metricas_quantitativas(textos):
 
 def calcular_similaridade_semantica(respostas_humanas, respostas_bot, model_id):
     """Calcula a similaridade de cosseno média entre duas listas de textos."""
+    from sentence_transformers import SentenceTransformer
+    from sklearn.metrics.pairwise import cosine_similarity
+
     print("\nCarregando modelo de embeddings para análise semântica...")
     model = SentenceTransformer(model_id)
     print("Modelo de embeddings carregado.")
@@ -155,21 +127,27 @@ def calcular_similaridade_semantica(respostas_humanas, respostas_bot, model_id):
 # --- Bloco Principal de Execução ---
 
 if __name__ == "__main__":
+    instrumentacao.iniciar("analise_quantitativa")
+
     # 1. Carregar dados
     amostras = carregar_dados_amostra(DATASET_FILE, N_SAMPLES)
     prompts = [{"input": item["input"], "system": item.get("system", "")} for item in amostras]
     respostas_humanas = [item["output"] for item in amostras]
 
     # 2. Carregar modelo e gerar respostas
-    doppelbot_model, doppelbot_tokenizer = carregar_doppelbot()
-    respostas_bot = gerar_respostas_bot(doppelbot_model, doppelbot_tokenizer, prompts)
+    with instrumentacao.etapa("carregamento_modelo"):
+        doppelbot_model, doppelbot_tokenizer = carregar_doppelbot(args.backend, args.threads)
+    especulador = criar_especulador(args, doppelbot_model, doppelbot_tokenizer)
+    respostas_bot = gerar_respostas_bot(doppelbot_model, doppelbot_tokenizer, prompts, especulador)
     
     # 3. Calcular métricas
     print("\nCalculando métricas para os textos...")
-    metricas_humanas = calcular_metricas_quantitativas(respostas_humanas)
-    metricas_bot = calcular_metricas_quantitativas(respostas_bot)
+    with instrumentacao.etapa("metricas_quantitativas", unidade="textos", itens=2 * len(respostas_bot)):
+        metricas_humanas = calcular_metricas_quantitativas(respostas_humanas)
+        metricas_bot = calcular_metricas_quantitativas(respostas_bot)
     
-    similaridade_media = calcular_similaridade_semantica(respostas_humanas, respostas_bot, EMBEDDING_MODEL_ID)
+    with instrumentacao.etapa("similaridade_semantica", unidade="textos", itens=2 * len(respostas_bot)):
+        similaridade_media = calcular_similaridade_semantica(respostas_humanas, respostas_bot, EMBEDDING_MODEL_ID)
     
     # 4. Apresentar resultados em um arquivo .txt
     print(f"\nSalvando resultados em '{OUTPUT_FILE}'...")
@@ -177,7 +155,8 @@ if __name__ == "__main__":
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         f.write("--- ANÁLISE QUANTITATIVA E SEMÂNTICA COMPARATIVA ---\n\n")
         
-        # Criar um DataFrame do Pandas
+        # Criar um DataFrame do Pandas (importado só aqui: o --help não paga por ele)
+        import pandas as pd
         df_data = {
             "Métrica": list(metricas_humanas.keys()),
             "Humano (Original)": list(metricas_humanas.values()),
@@ -193,5 +172,12 @@ if __name__ == "__main__":
         f.write("--- ANÁLISE DE SIMILARIDADE ---\n\n")
         f.write(f"Similaridade de Cosseno Média (Humano vs. Bot): {similaridade_media:.4f}\n\n")
         f.write("(Valores de similaridade mais próximos de 1.0 indicam maior semelhança de significado.)\n")
+
+        if os.path.exists(args.perfil):
+            # Referência do dataset inteiro, não só da amostra: z = distância da média do bot em desvios humanos.
+            perfil_bot = perfilar((None, texto) for texto in respostas_bot)[CATEGORIA_GERAL]
+            f.write("\n--- PERFIL ESTILOMÉTRICO (DATASET COMPLETO vs. BOT) ---\n\n")
+            f.write(formatar_comparacao(comparar(carregar_perfil(args.perfil)[CATEGORIA_GERAL], perfil_bot), "Doppelbot"))
+            f.write("\n")
     
     print("\nAnálise concluída.")
\ No newline at end of file
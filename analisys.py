@@ -1,12 +1,14 @@
 # analisar_dataset.py (v2 - com gráfico melhorado)
-import json
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from transformers import AutoTokenizer
 import os
 
+import instrumentacao
+from add_instruction import ARQUIVO_COMPRIMENTOS, comprimentos_tokens as carregar_comprimentos
+from formato_dados import resolver_caminho
+
 # --- CONFIGURAÇÕES ---
-NOME_DATASET = "dataset_instruct.jsonl"
+NOME_DATASET = resolver_caminho("dataset_instruct.jsonl") # Ou o .parquet, se for o mais recente.
 NOME_MODELO = "meta-llama/Meta-Llama-3-8B-Instruct"
 ARQUIVO_GRAFICO = "distribuicao_tokens_zoom.png" # Novo nome para o arquivo do gráfico
 
@@ -15,19 +17,17 @@ def analisar_comprimento_sequencias():
         print(f"ERRO: Arquivo de dataset '{NOME_DATASET}' não encontrado.")
         return
 
+    from transformers import AutoTokenizer
+
     print(f"Carregando o tokenizer de '{NOME_MODELO}'...")
     tokenizer = AutoTokenizer.from_pretrained(NOME_MODELO)
 
     print(f"Processando o dataset '{NOME_DATASET}' para contar os tokens...")
-    comprimentos_tokens = []
-    with open(NOME_DATASET, 'r', encoding='utf-8') as f:
-        for linha in f:
-            try:
-                conversa = json.loads(linha)
-                token_ids = tokenizer.apply_chat_template(conversa, add_generation_prompt=False)
-                comprimentos_tokens.append(len(token_ids))
-            except json.JSONDecodeError:
-                continue
+    with instrumentacao.etapa("tokenizacao", unidade="exemplos") as registro:
+        # Mesmo texto visto pelo fine-tuning; o resultado fica em cache para o autoajuste de lote.
+        comprimentos_tokens = carregar_comprimentos(NOME_DATASET, tokenizer)
+        registro["itens"] = len(comprimentos_tokens)
+    print(f"Comprimentos salvos em cache em '{ARQUIVO_COMPRIMENTOS}'.")
 
     if not comprimentos_tokens:
         print("Nenhum dado válido encontrado para análise.")
@@ -56,6 +56,10 @@ def analisar_comprimento_sequencias():
 
     # --- GERAÇÃO DO GRÁFICO MELHORADO ---
     print("Gerando gráfico da distribuição de tokens (com zoom)...")
+    import matplotlib
+    matplotlib.use("Agg") # Só salva o arquivo, sem abrir janela.
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(15, 7))
     # Aumentamos o número de 'bins' para mais detalhes e limitamos o 'range'
     plt.hist(comprimentos_tokens, bins=150, color='deepskyblue', edgecolor='black', range=(0, p99_5))
@@ -81,4 +85,8 @@ def analisar_comprimento_sequencias():
 
 
 if __name__ == "__main__":
+    argparse.ArgumentParser(
+        description=f"Estatísticas e histograma do comprimento em tokens de '{NOME_DATASET}' (salvo em '{ARQUIVO_GRAFICO}')."
+    ).parse_args()
+    instrumentacao.iniciar("analisys")
     analisar_comprimento_sequencias()
\ No newline at end of file
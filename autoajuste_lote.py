@@ -0,0 +1,201 @@
+import argparse
+import random
+import time
+
+import torch
+
+# --- CONFIGURAÇÕES ---
+LOTE_EFETIVO_PADRAO = 8
+PASSOS_SONDAGEM = 3
+
+def micro_lotes_candidatos(lote_efetivo):
+    """Tamanhos de micro-lote que dividem o lote efetivo (o acúmulo de gradiente completa o resto)."""
+    return [n for n in range(1, lote_efetivo + 1) if lote_efetivo % n == 0]
+
+# --- Medição de Memória ---
+
+class MedidorMemoria:
+    """
+    Pico de memória de um passo de treino. Na GPU usa o contador do alocador
+    CUDA; na CPU soma os tensores guardados para o backward (ativações), que é
+    a parte que cresce com o micro-lote e com a ausência de checkpointing.
+    """
+
+    def __init__(self, dispositivo):
+        self.cuda = dispositivo.type == "cuda"
+        self.bytes_ativacoes = 0
+        self._vistos = set()
+
+    def _guardar(self, tensor):
+        armazenamento = tensor.untyped_storage()
+        if armazenamento.data_ptr() not in self._vistos:
+            self._vistos.add(armazenamento.data_ptr())
+            self.bytes_ativacoes += armazenamento.nbytes()
+        return tensor
+
+    def __enter__(self):
+        if self.cuda:
+            torch.cuda.empty_cache()
+            torch.cuda.reset_peak_memory_stats()
+            self._ganchos = None
+        else:
+            self._ganchos = torch.autograd.graph.saved_tensors_hooks(self._guardar, lambda tensor: tensor)
+            self._ganchos.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        if self._ganchos is not None:
+            self._ganchos.__exit__(*exc)
+        return False
+
+    def pico_mb(self, model):
+        if self.cuda:
+            return torch.cuda.max_memory_allocated() / (1024 * 1024)
+        pesos = sum(p.numel() * p.element_size() for p in model.parameters())
+        gradientes = sum(p.numel() * p.element_size() for p in model.parameters() if p.requires_grad)
+        return (pesos + gradientes + self.bytes_ativacoes) / (1024 * 1024)
+
+# --- Sondagem ---
+
+def _lote_sintetico(comprimentos, tamanho, vocab, pad_id, dispositivo):
+    """Lote com tokens aleatórios e padding à direita até o maior comprimento (como o collator do SFT)."""
+    maior = max(comprimentos)
+    input_ids = torch.full((tamanho, maior), pad_id, dtype=torch.long)
+    mascara = torch.zeros((tamanho, maior), dtype=torch.long)
+    for linha, comprimento in enumerate(comprimentos):
+        input_ids[linha, :comprimento] = torch.randint(0, vocab, (comprimento,))
+        mascara[linha, :comprimento] = 1
+    rotulos = input_ids.masked_fill(mascara == 0, -100)
+    return input_ids.to(dispositivo), mascara.to(dispositivo), rotulos.to(dispositivo)
+
+def _passo_treino(model, lote):
+    input_ids, mascara, rotulos = lote
+    saida = model(input_ids=input_ids, attention_mask=mascara, labels=rotulos)
+    saida.loss.backward()
+
+def _ativar_checkpointing(model, ativar):
+    if ativar:
+        model.gradient_checkpointing_enable(gradient_checkpointing_kwargs={"use_reentrant": False})
+    else:
+        model.gradient_checkpointing_disable()
+
+def sondar_configuracao(model, comprimentos, micro_lote, checkpointing, passos, vocab, pad_id, rng,
+                        orcamento_mb=None):
+    """
+    Mede uma configuração: o pico de memória no pior caso (micro-lote inteiro
+    com o maior comprimento) e a vazão em tokens reais/s em lotes sorteados da
+    distribuição de comprimentos (vazão não é medida se o pico passar de
+    `orcamento_mb`). Retorna None se faltar memória.
+    """
+    dispositivo = next(model.parameters()).device
+    _ativar_checkpointing(model, checkpointing)
+    model.train()
+    try:
+        pior_caso = _lote_sintetico([max(comprimentos)] * micro_lote, micro_lote, vocab, pad_id, dispositivo)
+        with MedidorMemoria(dispositivo) as medidor:
+            _passo_treino(model, pior_caso)
+        memoria = medidor.pico_mb(model)
+        model.zero_grad(set_to_none=True)
+        if orcamento_mb is not None and memoria > orcamento_mb:
+            return {"memoria_mb": memoria, "tokens_por_s": None}
+
+        tokens, inicio = 0, time.perf_counter()
+        for _ in range(passos):
+            amostra = [rng.choice(comprimentos) for _ in range(micro_lote)]
+            _passo_treino(model, _lote_sintetico(amostra, micro_lote, vocab, pad_id, dispositivo))
+            tokens += sum(amostra)
+        if dispositivo.type == "cuda":
+            torch.cuda.synchronize()
+        vazao = tokens / (time.perf_counter() - inicio)
+    except torch.cuda.OutOfMemoryError:
+        return None
+    finally:
+        model.zero_grad(set_to_none=True)
+        if dispositivo.type == "cuda":
+            torch.cuda.empty_cache()
+    return {"memoria_mb": memoria, "tokens_por_s": vazao}
+
+def escolher_configuracao(model, comprimentos, orcamento_mb, lote_efetivo=LOTE_EFETIVO_PADRAO,
+                          max_seq_length=512, passos=PASSOS_SONDAGEM, vocab=None, pad_id=0, semente=42):
+    """
+    Testa micro-lotes crescentes (divisores de `lote_efetivo`) com e sem
+    gradient checkpointing e escolhe a configuração de maior vazão medida que
+    cabe em `orcamento_mb`. O lote efetivo (micro-lote x acúmulo) não muda.
+    Retorna (melhor, resultados); `melhor` é None se nada couber no orçamento.
+    """
+    rng = random.Random(semente)
+    comprimentos = [min(c, max_seq_length) for c in comprimentos if c > 0]
+    vocab = vocab or model.config.vocab_size
+    estado_checkpointing = getattr(model, "is_gradient_checkpointing", False)
+
+    resultados = []
+    for checkpointing in (False, True):
+        for micro_lote in micro_lotes_candidatos(lote_efetivo):
+            medicao = sondar_configuracao(model, comprimentos, micro_lote, checkpointing, passos,
+                                          vocab, pad_id, rng, orcamento_mb)
+            resultado = {
+                "per_device_train_batch_size": micro_lote,
+                "gradient_accumulation_steps": lote_efetivo // micro_lote,
+                "gradient_checkpointing": checkpointing,
+                "memoria_mb": medicao["memoria_mb"] if medicao else None,
+                "tokens_por_s": medicao["tokens_por_s"] if medicao else None,
+            }
+            resultado["cabe"] = medicao is not None and medicao["memoria_mb"] <= orcamento_mb
+            resultados.append(resultado)
+            if medicao is None:
+                estado = "sem memória"
+            elif not resultado["cabe"]:
+                estado = f"{resultado['memoria_mb']:.0f} MB, acima do orçamento"
+            else:
+                estado = f"{resultado['memoria_mb']:.0f} MB, {resultado['tokens_por_s']:.0f} tokens/s"
+            print(f"  micro-lote {micro_lote} x acúmulo {lote_efetivo // micro_lote}, "
+                  f"checkpointing={'sim' if checkpointing else 'não'}: {estado}")
+            # Micro-lotes maiores só usam mais memória: para ao estourar o orçamento.
+            if not resultado["cabe"]:
+                break
+
+    _ativar_checkpointing(model, estado_checkpointing)
+    viaveis = [r for r in resultados if r["cabe"]]
+    melhor = max(viaveis, key=lambda r: r["tokens_por_s"]) if viaveis else None
+    return melhor, resultados
+
+# --- Demonstração com Modelo Pequeno (CPU) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sonda micro-lotes e gradient checkpointing em um Llama pequeno com LoRA, sem GPU.",
+        epilog="Exemplo: python autoajuste_lote.py --orcamento-mb 400 --comprimentos comprimentos_tokens.json"
+    )
+    parser.add_argument("--orcamento-mb", type=float, default=400)
+    parser.add_argument("--lote-efetivo", type=int, default=LOTE_EFETIVO_PADRAO)
+    parser.add_argument("--max-seq-length", type=int, default=512)
+    parser.add_argument("--comprimentos", default=None,
+                        help="Cache gerado pelo analisys.py; sem ele é usada uma distribuição sintética.")
+    parser.add_argument("--passos", type=int, default=PASSOS_SONDAGEM)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    import json
+    from peft import LoraConfig, get_peft_model
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    torch.manual_seed(args.semente)
+    if args.comprimentos:
+        with open(args.comprimentos, 'r', encoding='utf-8') as f:
+            comprimentos = json.load(f)["comprimentos"]
+    else:
+        rng = random.Random(args.semente)
+        comprimentos = [int(rng.lognormvariate(4.5, 0.8)) + 8 for _ in range(1000)]
+
+    config = LlamaConfig(vocab_size=1000, hidden_size=128, intermediate_size=512, num_hidden_layers=4,
+                         num_attention_heads=4, num_key_value_heads=2, use_cache=False)
+    model = get_peft_model(LlamaForCausalLM(config), LoraConfig(r=8, task_type="CAUSAL_LM",
+                                                                target_modules=["q_proj", "v_proj"]))
+    print(f"Sondando {len(micro_lotes_candidatos(args.lote_efetivo))} micro-lotes com orçamento de {args.orcamento_mb:.0f} MB...")
+    melhor, _ = escolher_configuracao(model, comprimentos, args.orcamento_mb, args.lote_efetivo,
+                                      args.max_seq_length, args.passos, semente=args.semente)
+    if melhor is None:
+        print("Nenhuma configuração coube no orçamento.")
+    else:
+        print(f"\nEscolhido: micro-lote {melhor['per_device_train_batch_size']} x acúmulo "
+              f"{melhor['gradient_accumulation_steps']}, checkpointing="
+              f"{'sim' if melhor['gradient_checkpointing'] else 'não'} ({melhor['tokens_por_s']:.0f} tokens/s)")
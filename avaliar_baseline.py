@@ -1,8 +1,12 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+import argparse
 import sys
 import os
-import re
+from contextlib import ExitStack
+
+from backend_inferencia import adicionar_argumentos_backend, carregar_modelo
+import instrumentacao
+from geracao import PARAMETROS_AMOSTRAGEM, adicionar_argumentos_especulacao, criar_especulador
+from registro_geracoes import RegistroGeracoes, adicionar_argumentos_registro, e_registro_estruturado, gerar_e_registrar
 
 # --- Constantes ---
 # O prefixo do usuário é mantido para uma comparação justa de estímulos
@@ -24,14 +28,26 @@ def carregar_perguntas(caminho_arquivo):
         sys.exit(1)
 
 # --- Validação de Argumentos ---
-if len(sys.argv) != 3:
-    print("Uso: python avaliar_baseline.py <caminho_perguntas> <caminho_saida>")
-    print("Exemplo: python avaliar_baseline.py perguntas_teste.txt respostas_baseline.txt")
+parser = argparse.ArgumentParser(
+    description="Gera as respostas do modelo BASE para as afirmações do teste de personalidade.",
+    epilog="Exemplo: python avaliar_baseline.py perguntas_teste.txt respostas_baseline.txt"
+)
+parser.add_argument("caminho_perguntas")
+parser.add_argument("caminho_saida")
+parser.add_argument("--amostras", "--samples", type=int, default=1, metavar="K",
+                    help="Respostas geradas por pergunta, compartilhando o prefill do prompt (padrão: 1).")
+adicionar_argumentos_backend(parser)
+adicionar_argumentos_especulacao(parser)
+adicionar_argumentos_registro(parser)
+args = parser.parse_args()
+if args.amostras < 1:
+    print("ERRO: --amostras deve ser pelo menos 1.")
     sys.exit(1)
+instrumentacao.iniciar("avaliar_baseline")
 
 # --- Caminhos e Configurações ---
-caminho_perguntas = sys.argv[1]
-caminho_saida = sys.argv[2]
+caminho_perguntas = args.caminho_perguntas
+caminho_saida = args.caminho_saida
 base_model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
 
 # --- Carregamento de Dados ---
@@ -39,28 +55,31 @@ perguntas = carregar_perguntas(caminho_perguntas)
 print(f"Encontradas {len(perguntas)} perguntas em '{caminho_perguntas}'.")
 
 # --- Carregamento do Modelo BASE (sem adaptadores LoRA) ---
-print("Carregando modelo e tokenizador BASE...")
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_quant_type="nf4",
-    bnb_4bit_compute_dtype=torch.bfloat16
-)
-model = AutoModelForCausalLM.from_pretrained(
-    base_model_id,
-    quantization_config=bnb_config,
-    device_map="auto"
-)
-tokenizer = AutoTokenizer.from_pretrained(base_model_id)
+with instrumentacao.etapa("carregamento_modelo"):
+    print("Carregando modelo e tokenizador BASE...")
+    model, tokenizer = carregar_modelo(base_model_id, backend=args.backend, threads=args.threads)
+    print("Modelo BASE carregado. Nenhum adaptador LoRA foi aplicado.")
 
-print("Modelo BASE carregado. Nenhum adaptador LoRA foi aplicado.")
-model = model.eval()
+especulador = criar_especulador(args, model, tokenizer)
+if args.semente is not None:
+    import torch # Já carregado junto com o modelo.
+    torch.manual_seed(args.semente)
 
+# Saída .jsonl/.parquet: só registros estruturados. Saída .txt: o texto de sempre (e --registro, se pedido).
+caminho_registro = caminho_saida if e_registro_estruturado(caminho_saida) else args.registro
+caminho_texto = None if e_registro_estruturado(caminho_saida) else caminho_saida
+parametros = {**PARAMETROS_AMOSTRAGEM, "max_new_tokens": 50, "especulacao": args.especulacao, "backend": args.backend}
 
 # --- Processamento das Perguntas e Geração das Respostas ---
 print(f"\nIniciando geração de respostas... Os resultados serão salvos em '{caminho_saida}'.")
 
 try:
-    with open(caminho_saida, 'w', encoding='utf-8') as f_out:
+    with ExitStack() as pilha:
+        f_out = pilha.enter_context(open(caminho_texto, 'w', encoding='utf-8')) if caminho_texto else None
+        registro = None
+        if caminho_registro:
+            registro = pilha.enter_context(RegistroGeracoes(caminho_registro, base_model_id, None,
+                                                            parametros, args.semente))
         for i, pergunta_texto in enumerate(perguntas):
             num_pergunta = i + 1
             print(f"Processando pergunta {num_pergunta}/{len(perguntas)}...")
@@ -73,35 +92,26 @@ try:
                 {"role": "user", "content": user_prompt_final}
             ]
 
-            input_ids = tokenizer.apply_chat_template(
-                conversa_atual,
-                add_generation_prompt=True,
-                return_tensors="pt"
-            ).to(model.device)
-
             # Gera a resposta usando os mesmos hiperparâmetros para uma comparação justa
-            with torch.no_grad():
-                outputs = model.generate(
-                    input_ids,
-                    max_new_tokens=50,
-                    do_sample=True,
-                    temperature=0.3,
-                    top_p=0.9,
-                    top_k=50,
-                    repetition_penalty=1.25,
-                    no_repeat_ngram_size=3,
-                    eos_token_id=[tokenizer.eos_token_id, tokenizer.convert_tokens_to_ids("<|eot_id|>")],
-                    pad_token_id=tokenizer.eos_token_id
-                )
-
-            # Decodifica e formata a resposta
-            resposta_ids = outputs[0][input_ids.shape[-1]:]
-            resposta_bruta = tokenizer.decode(resposta_ids, skip_special_tokens=True).strip()
+            respostas, medidas = gerar_e_registrar(model, tokenizer, conversa_atual, max_new_tokens=50,
+                                                   num_amostras=args.amostras, especulador=especulador)
+
+            if registro is not None:
+                for num_amostra, (resposta_bruta, medida) in enumerate(zip(respostas, medidas), start=1):
+                    registro.adicionar(num_pergunta, pergunta_texto, conversa_atual, resposta_bruta,
+                                       amostra=num_amostra, **medida)
+            if f_out is None:
+                continue
 
             # Escreve no arquivo de saída
             f_out.write(f"--- Pergunta {num_pergunta} ---\n")
             f_out.write(f"Texto: {pergunta_texto}\n")
-            f_out.write(f"Resposta do Modelo Base: {resposta_bruta}\n\n")
+            if len(respostas) == 1:
+                f_out.write(f"Resposta do Modelo Base: {respostas[0]}\n")
+            else:
+                for num_amostra, resposta_bruta in enumerate(respostas, start=1):
+                    f_out.write(f"Resposta do Modelo Base (amostra {num_amostra}/{len(respostas)}): {resposta_bruta}\n")
+            f_out.write("\n")
 
     print("\nProcesso concluído com sucesso!")
     print(f"As respostas do modelo BASE foram salvas em '{caminho_saida}'.")
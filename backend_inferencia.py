@@ -0,0 +1,110 @@
+import os
+import sys
+
+# --- BACKENDS DISPONÍVEIS ---
+# cuda: modelo base em 4 bits (bitsandbytes) com os adaptadores LoRA aplicados em tempo de execução.
+# cpu:  adaptadores mesclados aos pesos e camadas lineares quantizadas dinamicamente para int8.
+# O torch só é importado ao carregar o modelo: registrar os argumentos (e o --help) continua instantâneo.
+BACKENDS = ["cuda", "cpu"]
+
+def adicionar_argumentos_backend(parser):
+    """Registra no argparse a escolha do backend de inferência."""
+    parser.add_argument("--backend", choices=BACKENDS, default="cuda",
+                        help="cuda: 4 bits na GPU (padrão); cpu: adaptadores mesclados e quantização int8 dinâmica.")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads usadas pelo PyTorch no backend cpu (padrão: todos os núcleos).")
+
+def configurar_threads(threads):
+    """Fixa o número de threads intra-operação do PyTorch (None mantém o padrão)."""
+    import torch
+
+    if threads is not None:
+        if threads < 1:
+            print("ERRO: --threads deve ser pelo menos 1.")
+            sys.exit(1)
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+def quantizar_int8(model):
+    """
+    Quantização dinâmica: os pesos das camadas lineares viram int8 e as
+    ativações são quantizadas a cada chamada. Reduz a memória em ~4x em relação
+    ao float32 e usa os kernels int8 (FBGEMM/oneDNN) da CPU.
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _ajustar_vocabulario(model, tokenizer):
+    # O tokenizador dos adaptadores pode trazer o token extra '<|msg_sep|>'.
+    if "<|msg_sep|>" not in tokenizer.get_vocab():
+        tokenizer.add_special_tokens({'additional_special_tokens': ['<|msg_sep|>']})
+    if len(tokenizer) != model.get_input_embeddings().weight.shape[0]:
+        print("Ajustando vocabulário do modelo para corresponder aos adaptadores...")
+        model.resize_token_embeddings(len(tokenizer))
+
+def _carregar_cuda(base_model_id):
+    import torch
+    from transformers import AutoModelForCausalLM, BitsAndBytesConfig
+
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16
+    )
+    return AutoModelForCausalLM.from_pretrained(
+        base_model_id,
+        quantization_config=bnb_config,
+        device_map="auto"
+    )
+
+def _carregar_cpu(base_model_id):
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    # float32: a quantização dinâmica parte de pesos em ponto flutuante de 32 bits.
+    return AutoModelForCausalLM.from_pretrained(
+        base_model_id,
+        torch_dtype=torch.float32,
+        low_cpu_mem_usage=True
+    )
+
+def carregar_modelo(base_model_id, caminho_adaptadores=None, backend="cuda", threads=None,
+                    ajustar_vocabulario=True):
+    """
+    Carrega modelo e tokenizador no backend escolhido. Com `caminho_adaptadores`
+    os adaptadores LoRA são aplicados (cuda) ou mesclados aos pesos antes da
+    quantização (cpu). Retorna (model, tokenizer) já em modo de avaliação.
+    """
+    from transformers import AutoTokenizer
+
+    if backend not in BACKENDS:
+        print(f"ERRO: Backend '{backend}' desconhecido. Opções: {', '.join(BACKENDS)}.")
+        sys.exit(1)
+    if caminho_adaptadores is not None and not os.path.isdir(caminho_adaptadores):
+        print(f"ERRO: Pasta de adaptadores '{caminho_adaptadores}' não encontrada.")
+        sys.exit(1)
+
+    if backend == "cpu":
+        print(f"Backend CPU com {configurar_threads(threads)} threads.")
+        model = _carregar_cpu(base_model_id)
+    else:
+        model = _carregar_cuda(base_model_id)
+
+    tokenizer = AutoTokenizer.from_pretrained(caminho_adaptadores or base_model_id)
+    if caminho_adaptadores is not None:
+        from peft import PeftModel
+
+        if ajustar_vocabulario:
+            _ajustar_vocabulario(model, tokenizer)
+        print("Carregando adaptadores LoRA...")
+        model = PeftModel.from_pretrained(model, caminho_adaptadores)
+        if backend == "cpu":
+            print("Mesclando adaptadores aos pesos do modelo...")
+            model = model.merge_and_unload()
+
+    if backend == "cpu":
+        print("Quantizando camadas lineares para int8...")
+        model = quantizar_int8(model)
+    return model.eval(), tokenizer
@@ -0,0 +1,141 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import torch
+
+from backend_inferencia import carregar_modelo, configurar_threads
+
+# --- Modelo Sintético ---
+
+def criar_modelo_sintetico(pasta, vocab, dimensao, camadas, semente):
+    """
+    Salva em `pasta/base` um Llama pequeno com pesos aleatórios (e tokenizador
+    compatível) e em `pasta/adaptadores` um LoRA nos mesmos módulos do
+    fine-tuning. Dispensa downloads: o objetivo é medir vazão, não qualidade.
+    """
+    from peft import LoraConfig, get_peft_model
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    torch.manual_seed(semente)
+    base = os.path.join(pasta, "base")
+    adaptadores = os.path.join(pasta, "adaptadores")
+
+    vocabulario = {f"t{i}": i for i in range(vocab)}
+    tokenizador = Tokenizer(models.WordLevel(vocabulario, unk_token="t2"))
+    tokenizador.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizador = PreTrainedTokenizerFast(tokenizer_object=tokenizador, bos_token="t0", eos_token="t1",
+                                          unk_token="t2", additional_special_tokens=["<|msg_sep|>"])
+    tokenizador.save_pretrained(base)
+    tokenizador.save_pretrained(adaptadores)
+
+    config = LlamaConfig(
+        vocab_size=len(tokenizador),
+        hidden_size=dimensao,
+        intermediate_size=dimensao * 4,
+        num_hidden_layers=camadas,
+        num_attention_heads=max(1, dimensao // 64),
+        num_key_value_heads=max(1, dimensao // 256),
+        bos_token_id=0,
+        eos_token_id=1,
+    )
+    LlamaForCausalLM(config).save_pretrained(base)
+
+    peft_config = LoraConfig(
+        r=64, lora_alpha=128, task_type="CAUSAL_LM", init_lora_weights=False,
+        target_modules=["q_proj", "k_proj", "v_proj", "o_proj", "gate_proj", "up_proj", "down_proj"],
+    )
+    get_peft_model(LlamaForCausalLM.from_pretrained(base), peft_config).save_pretrained(adaptadores)
+    return base, adaptadores
+
+# --- Variantes Medidas ---
+
+def carregar_variantes(base, adaptadores):
+    """LoRA sem mesclar (float32), LoRA mesclado (float32) e o backend cpu completo (mesclado + int8)."""
+    from peft import PeftModel
+    from transformers import AutoModelForCausalLM
+
+    def lora_float32():
+        return PeftModel.from_pretrained(AutoModelForCausalLM.from_pretrained(base), adaptadores).eval()
+
+    def mesclado_float32():
+        return lora_float32().merge_and_unload().eval()
+
+    def mesclado_int8():
+        return carregar_modelo(base, adaptadores, backend="cpu")[0]
+
+    return {
+        "float32 + LoRA": lora_float32,
+        "float32 mesclado": mesclado_float32,
+        "int8 mesclado (backend cpu)": mesclado_int8,
+    }
+
+def tamanho_mb(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+def medir_tokens_por_segundo(model, tokens_prompt, tokens_novos, repeticoes, vocab):
+    """Gera exatamente `tokens_novos` tokens (greedy) e retorna a melhor vazão das repetições."""
+    input_ids = torch.randint(3, vocab, (1, tokens_prompt))
+    argumentos = dict(max_new_tokens=tokens_novos, min_new_tokens=tokens_novos, do_sample=False, pad_token_id=1)
+    with torch.no_grad():
+        model.generate(input_ids, **{**argumentos, "max_new_tokens": 4, "min_new_tokens": 4})  # aquecimento
+        melhor = float("inf")
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            model.generate(input_ids, **argumentos)
+            melhor = min(melhor, time.perf_counter() - inicio)
+    return tokens_novos / melhor
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede tokens/s do backend cpu (adaptadores mesclados + int8 dinâmico) em um modelo pequeno.",
+        epilog="Exemplo: python benchmark_cpu.py --threads 1 2 4 --camadas 4 --dimensao 512"
+    )
+    parser.add_argument("--modelo", default=None,
+                        help="Pasta/ID de um modelo base local. Se omitido, um Llama sintético é criado.")
+    parser.add_argument("--adaptadores", default=None, help="Pasta de adaptadores LoRA para o --modelo.")
+    parser.add_argument("--vocab", type=int, default=32000)
+    parser.add_argument("--dimensao", type=int, default=512)
+    parser.add_argument("--camadas", type=int, default=4)
+    parser.add_argument("--tokens-prompt", type=int, default=128)
+    parser.add_argument("--tokens-novos", type=int, default=64)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if args.modelo is None:
+            print(f"Criando Llama sintético ({args.camadas} camadas, dimensão {args.dimensao}, vocabulário {args.vocab})...")
+            base, adaptadores = criar_modelo_sintetico(pasta, args.vocab, args.dimensao, args.camadas, args.semente)
+        elif args.adaptadores is None:
+            print("ERRO: Informe --adaptadores junto com --modelo.")
+            sys.exit(1)
+        else:
+            base, adaptadores = args.modelo, args.adaptadores
+
+        linhas = []
+        for nome, carregar in carregar_variantes(base, adaptadores).items():
+            model = carregar()
+            tamanho = tamanho_mb(model)
+            for threads in args.threads:
+                configurar_threads(threads)
+                vazao = medir_tokens_por_segundo(model, args.tokens_prompt, args.tokens_novos,
+                                                 args.repeticoes, model.config.vocab_size)
+                print(f"{nome:<30} threads={threads:<3} {vazao:8.1f} tokens/s")
+                linhas.append({"Variante": nome, "Threads": threads, "Tamanho (MB)": tamanho, "Tokens/s": vazao})
+            del model
+
+    df = pd.DataFrame(linhas)
+    referencia = df[df["Variante"] == "float32 + LoRA"].set_index("Threads")["Tokens/s"]
+    df["Speedup"] = df["Tokens/s"] / df["Threads"].map(referencia)
+    print("\n--- VAZÃO NA CPU ---\n")
+    print(df.round(2).to_string(index=False))
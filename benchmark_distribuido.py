@@ -0,0 +1,48 @@
+import argparse
+import random
+import tempfile
+from argparse import Namespace
+
+import pandas as pd
+
+from benchmark_cpu import criar_modelo_sintetico
+from treino_distribuido import CONFIG_LORA, lancar
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede a escalabilidade do treino_distribuido.py (1, 2, 4... processos) em um Llama sintético.",
+        epilog="Exemplo: python benchmark_distribuido.py --processos 1 2 4 --passos 20"
+    )
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--passos", type=int, default=20, help="Passos do otimizador medidos em cada configuração.")
+    parser.add_argument("--lote-efetivo", type=int, default=8)
+    parser.add_argument("--exemplos", type=int, default=512)
+    parser.add_argument("--vocab", type=int, default=2000)
+    parser.add_argument("--dimensao", type=int, default=256)
+    parser.add_argument("--camadas", type=int, default=4)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    exemplos = [[rng.randrange(3, args.vocab) for _ in range(rng.randint(32, 256))] for _ in range(args.exemplos)]
+
+    linhas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        print(f"Criando Llama sintético ({args.camadas} camadas, dimensão {args.dimensao})...")
+        base, _ = criar_modelo_sintetico(pasta, args.vocab, args.dimensao, args.camadas, args.semente)
+        for processos in args.processos:
+            config = Namespace(modelo=base, processos=processos, threads_por_processo=None,
+                               lote_efetivo=args.lote_efetivo, micro_lote=1, epocas=1, max_passos=args.passos,
+                               taxa_aprendizado=2e-4, passos_log=args.passos, semente=args.semente, saida=None,
+                               lora_dropout=CONFIG_LORA["lora_dropout"])
+            print(f"\n--- {processos} processo(s) ---")
+            resultado = lancar(config, exemplos)
+            linhas.append({"Processos": processos, "Tempo (s)": resultado["tempo_s"],
+                           "Tokens/s": resultado["tokens_por_s"], "Loss final": resultado["historico"][-1]["loss"]})
+
+    df = pd.DataFrame(linhas)
+    df["Speedup"] = df["Tokens/s"] / df["Tokens/s"].iloc[0]
+    df["Eficiência"] = df["Speedup"] / (df["Processos"] / df["Processos"].iloc[0])
+    print("\n--- ESCALABILIDADE DO TREINO EM CPU ---\n")
+    print(df.round(3).to_string(index=False))
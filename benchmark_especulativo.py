@@ -0,0 +1,111 @@
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from peft import PeftModel
+import argparse
+import sys
+import os
+import time
+
+from geracao import adicionar_argumentos_especulacao, criar_especulador, gerar_ids
+
+# --- Constantes ---
+BASE_MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
+ADAPTERS_PATH = "doppelbot-llama3-8b-instruct-adapters"
+PREFIXO_PERGUNTA = (
+    "Estou fazendo um teste para avaliar sua personalidade. Para a afirmação abaixo, responda estritamente em primeira pessoa (usando 'Eu'), explicando como ela se aplica ou não a você e ao seu jeito de ser.\n\nAfirmação: "
+)
+
+# --- Funções Auxiliares ---
+def carregar_texto(caminho_arquivo):
+    if not os.path.exists(caminho_arquivo):
+        print(f"ERRO: Arquivo '{caminho_arquivo}' não encontrado.")
+        sys.exit(1)
+    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def sincronizar():
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+def medir(model, tokenizer, prompts_ids, max_new_tokens, especulador=None):
+    """Gera uma resposta por prompt e retorna (tokens gerados, segundos)."""
+    total_tokens = 0
+    sincronizar()
+    inicio = time.perf_counter()
+    for input_ids in prompts_ids:
+        outputs = gerar_ids(model, tokenizer, input_ids, max_new_tokens, especulador)
+        total_tokens += outputs.shape[-1] - input_ids.shape[-1]
+    sincronizar()
+    return total_tokens, time.perf_counter() - inicio
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede taxa de aceitação e speedup da decodificação especulativa.",
+        epilog="Exemplo: python benchmark_especulativo.py descricao.txt --especulacao ngram"
+    )
+    parser.add_argument("descricao", help="Arquivo de descrição da persona.")
+    parser.add_argument("--perguntas", default="perguntas_teste.txt")
+    parser.add_argument("--max-new-tokens", type=int, default=50)
+    parser.add_argument("--semente", type=int, default=42)
+    adicionar_argumentos_especulacao(parser)
+    args = parser.parse_args()
+    if args.especulacao is None:
+        args.especulacao = "ngram"
+
+    prompt_template = carregar_texto(args.descricao)
+    perguntas = [linha.strip() for linha in carregar_texto(args.perguntas).splitlines() if linha.strip()]
+    print(f"Encontradas {len(perguntas)} perguntas em '{args.perguntas}'.")
+
+    # --- Carregamento do Modelo (mesma configuração do chat.py) ---
+    print("Carregando modelo e tokenizador...")
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16
+    )
+    model = AutoModelForCausalLM.from_pretrained(
+        BASE_MODEL_ID,
+        quantization_config=bnb_config,
+        device_map="auto"
+    )
+    tokenizer = AutoTokenizer.from_pretrained(ADAPTERS_PATH)
+    if "<|msg_sep|>" not in tokenizer.get_vocab():
+        tokenizer.add_special_tokens({'additional_special_tokens': ['<|msg_sep|>']})
+    model.resize_token_embeddings(len(tokenizer))
+    model = PeftModel.from_pretrained(model, ADAPTERS_PATH).eval()
+
+    especulador = criar_especulador(args, model, tokenizer)
+
+    system_prompt = prompt_template.format(categoria="amigo")
+    prompts_ids = [
+        tokenizer.apply_chat_template(
+            [{"role": "system", "content": system_prompt},
+             {"role": "user", "content": f"{PREFIXO_PERGUNTA}{pergunta}"}],
+            add_generation_prompt=True,
+            return_tensors="pt",
+            return_dict=False
+        ).to(model.device)
+        for pergunta in perguntas
+    ]
+
+    # Aquecimento para não contabilizar a inicialização dos kernels.
+    gerar_ids(model, tokenizer, prompts_ids[0], 8)
+
+    print("\nMedindo decodificação padrão (token a token)...")
+    torch.manual_seed(args.semente)
+    tokens_base, tempo_base = medir(model, tokenizer, prompts_ids, args.max_new_tokens)
+
+    print(f"Medindo decodificação especulativa (modo '{args.especulacao}')...")
+    torch.manual_seed(args.semente)
+    tokens_esp, tempo_esp = medir(model, tokenizer, prompts_ids, args.max_new_tokens, especulador)
+
+    stats = especulador.estatisticas
+    print("\n--- RESULTADOS DO BENCHMARK ESPECULATIVO ---")
+    print(f"Perguntas: {len(perguntas)} | max_new_tokens: {args.max_new_tokens} | tokens de rascunho: {args.tokens_rascunho}")
+    print(f"Padrão:       {tokens_base} tokens em {tempo_base:.2f}s ({tokens_base / tempo_base:.1f} tokens/s)")
+    print(f"Especulativo: {tokens_esp} tokens em {tempo_esp:.2f}s ({tokens_esp / tempo_esp:.1f} tokens/s)")
+    print(f"Tokens propostos: {stats['propostos']} | aceitos: {stats['aceitos']} | passos de verificação: {stats['passos']}")
+    print(f"Taxa de aceitação: {especulador.taxa_aceitacao():.2%}")
+    print(f"Tokens por passo de verificação: {stats['tokens'] / max(stats['passos'], 1):.2f}")
+    print(f"Speedup ponta a ponta (tokens/s): {(tokens_esp / tempo_esp) / (tokens_base / tempo_base):.2f}x")
@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from formato_dados import com_formato, escrever_conversas, escrever_pares, ler_conversas, ler_pares
+
+# --- Dados Sintéticos ---
+PALAVRAS = ("kkkk", "mano", "sim", "nao", "talvez", "amanha", "hoje", "trabalho", "reuniao", "festa", "vamos",
+            "onde", "quando", "beleza", "valeu", "tmj", "certeza", "demais", "pizza", "cinema", "obrigado")
+# Prompt de sistema do tamanho de uma descrição de persona real: no JSONL ele se repete em cada linha.
+PERSONA = ("Você é o Doppelbot, um assistente que imita o jeito de escrever do usuário em conversas com "
+           "alguém da categoria {categoria}. Responda de forma curta, informal e no mesmo tom. ") * 6
+
+def gerar_pares(quantidade, semente):
+    rng = random.Random(semente)
+    def frase():
+        return "\n".join(" ".join(rng.choices(PALAVRAS, k=rng.randint(2, 12))) for _ in range(rng.randint(1, 3)))
+    return [{"input": frase(), "output": frase(), "categoria": rng.choice(("Amigo", "Trabalho", "Familia"))}
+            for _ in range(quantidade)]
+
+def conversas_de(pares):
+    return [[{"role": "system", "content": PERSONA.format(categoria=par["categoria"])},
+             {"role": "user", "content": par["input"]},
+             {"role": "assistant", "content": par["output"]}] for par in pares]
+
+def melhor_tempo(funcao, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara tamanho e tempo de leitura/escrita dos datasets em JSONL e em Parquet (zstd).",
+        epilog="Exemplo: python benchmark_formato.py --dataset dataset_final.jsonl"
+    )
+    parser.add_argument("--dataset", default=None,
+                        help="Dataset de pares (JSONL ou Parquet) a usar; sem ele, pares sintéticos são gerados.")
+    parser.add_argument("--pares", type=int, default=50000, help="Pares sintéticos gerados quando não há --dataset.")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.dataset is not None:
+        if not os.path.exists(args.dataset):
+            print(f"ERRO: Arquivo de dataset '{args.dataset}' não encontrado.")
+            sys.exit(1)
+        pares = ler_pares(args.dataset)
+        print(f"{len(pares)} pares lidos de '{args.dataset}'.")
+    else:
+        pares = gerar_pares(args.pares, args.semente)
+        print(f"{len(pares)} pares sintéticos gerados.")
+    conversas = conversas_de(pares)
+
+    linhas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for formato in ("jsonl", "parquet"):
+            caminho_pares = com_formato(os.path.join(pasta, "dataset_final.jsonl"), formato)
+            caminho_conversas = com_formato(os.path.join(pasta, "dataset_instruct.jsonl"), formato)
+            escrita_pares = melhor_tempo(lambda: escrever_pares(caminho_pares, pares), args.repeticoes)
+            escrita_conversas = melhor_tempo(lambda: escrever_conversas(caminho_conversas, conversas), args.repeticoes)
+            linhas.append({
+                "Arquivo": "dataset_final", "Formato": formato,
+                "Tamanho (MB)": os.path.getsize(caminho_pares) / (1024 * 1024),
+                "Escrita (s)": escrita_pares,
+                "Leitura (s)": melhor_tempo(lambda: ler_pares(caminho_pares), args.repeticoes),
+                "Só 'output' (s)": melhor_tempo(lambda: ler_pares(caminho_pares, ["output"]), args.repeticoes),
+            })
+            linhas.append({
+                "Arquivo": "dataset_instruct", "Formato": formato,
+                "Tamanho (MB)": os.path.getsize(caminho_conversas) / (1024 * 1024),
+                "Escrita (s)": escrita_conversas,
+                "Leitura (s)": melhor_tempo(lambda: ler_conversas(caminho_conversas), args.repeticoes),
+                "Só 'output' (s)": float("nan"),
+            })
+            print(f"{formato}: concluído.")
+
+    df = pd.DataFrame(linhas)
+    referencia = df[df["Formato"] == "jsonl"].set_index("Arquivo")["Tamanho (MB)"]
+    df["Compressão"] = df["Arquivo"].map(referencia) / df["Tamanho (MB)"]
+    print("\n--- JSONL vs. PARQUET (ZSTD) ---\n")
+    print(df.sort_values(["Arquivo", "Formato"]).round(3).to_string(index=False))
@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from doppelbot import SUBCOMANDOS
+
+# --- CONFIGURAÇÕES ---
+DOPPELBOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "doppelbot.py")
+MODULOS_PESADOS = ["torch", "transformers", "peft", "trl", "datasets", "sentence_transformers", "sklearn",
+                   "matplotlib", "seaborn", "emoji"]
+MARCADOR = "@@IMPORTACAO@@"
+
+# Roda o doppelbot.py no processo filho e informa quais módulos pesados foram carregados.
+CODIGO_FILHO = """
+import json, runpy, sys
+sys.argv = {argv!r}
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+print({marcador!r} + json.dumps(sorted(m for m in {pesados!r} if m in sys.modules)))
+"""
+
+def medir(argumentos, repeticoes):
+    """(melhor tempo total do processo, módulos pesados carregados) de `python doppelbot.py <argumentos>`."""
+    codigo = CODIGO_FILHO.format(argv=[DOPPELBOT, *argumentos], marcador=MARCADOR, pesados=MODULOS_PESADOS)
+    melhor, carregados = float("inf"), []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True).stdout
+        melhor = min(melhor, time.perf_counter() - inicio)
+        for linha in saida.splitlines():
+            if linha.startswith(MARCADOR):
+                carregados = json.loads(linha[len(MARCADOR):])
+    return melhor, carregados
+
+def medir_importacao(modulo, repeticoes):
+    """Melhor tempo de `python -c "import <modulo>"` (o custo que cada script pagava antes de ler os argumentos)."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = subprocess.run([sys.executable, "-c", f"import {modulo}"], capture_output=True)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor if resultado.returncode == 0 else float("nan")
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede o tempo de '--help' de cada subcomando do doppelbot.py e o custo das importações pesadas.",
+        epilog="Exemplo: python benchmark_importacao.py --repeticoes 5"
+    )
+    parser.add_argument("--subcomandos", nargs="+", default=list(SUBCOMANDOS), choices=list(SUBCOMANDOS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    interpretador = medir_importacao("sys", args.repeticoes)
+    linhas = [{"Comando": "(interpretador vazio)", "Tempo (s)": interpretador, "Módulos pesados": ""}]
+    for nome in args.subcomandos:
+        tempo, carregados = medir([nome, "--help"], args.repeticoes)
+        linhas.append({"Comando": f"{nome} --help", "Tempo (s)": tempo, "Módulos pesados": ", ".join(carregados) or "-"})
+        print(f"{nome}: {tempo:.2f}s")
+    tempo, carregados = medir(["preproces"], args.repeticoes)
+    linhas.append({"Comando": "preproces (erro)", "Tempo (s)": tempo, "Módulos pesados": ", ".join(carregados) or "-"})
+
+    print("\n--- TEMPO ATÉ RESPONDER (PROCESSO COMPLETO) ---\n")
+    print(pd.DataFrame(linhas).round(3).to_string(index=False))
+
+    referencia = [{"Módulo": modulo, "import (s)": medir_importacao(modulo, args.repeticoes) - interpretador}
+                  for modulo in MODULOS_PESADOS]
+    print("\n--- CUSTO DE CADA IMPORTAÇÃO PESADA (DESCONTADO O INTERPRETADOR) ---\n")
+    print(pd.DataFrame(referencia).round(3).to_string(index=False))
@@ -0,0 +1,90 @@
+import json
+from datetime import date
+
+import add_instruction
+import deduplicacao
+import indice_dias
+import name_normalize
+import perfil_estilometrico
+import pre_processing
+
+TEMPLATE_PERSONA = "Você é o Doppelbot conversando com alguém da categoria {categoria}."
+
+def bench_padronizar_conversas(medir, corpus_original, tmp_path, monkeypatch):
+    monkeypatch.setattr(name_normalize, "PASTA_PADRONIZADA", str(tmp_path / "padronizadas"))
+    medir(name_normalize.padronizar_conversas, "Fulano de Tal", corpus_original)
+
+def bench_parsear_conversa_bruta(medir, conversa_padronizada):
+    caminho, outro_nome = conversa_padronizada
+    mensagens = medir(pre_processing.parsear_conversa_bruta, caminho, pre_processing.MEU_NOME_PADRONIZADO, outro_nome)
+    assert mensagens
+
+def bench_construir_indice_dias(medir, conversa_padronizada):
+    caminho, _ = conversa_padronizada
+    indice = medir(indice_dias.construir_indice, caminho)
+    assert indice["ordenado"] and indice["dias"]
+
+def bench_parsear_periodo(medir, conversa_padronizada, tmp_path, monkeypatch):
+    monkeypatch.setattr(indice_dias, "PASTA_INDICES", str(tmp_path / "indices"))
+    caminho, outro_nome = conversa_padronizada
+    # Uma semana no meio da conversa, com o índice já montado (só o seek e o parse do trecho são medidos).
+    dias = indice_dias.carregar_indice(caminho)["dias"]
+    desde = date.fromisoformat(dias[len(dias) // 2][0])
+    ate = date.fromisoformat(dias[min(len(dias) // 2 + 6, len(dias) - 1)][0])
+    mensagens = medir(pre_processing.parsear_conversa_bruta, caminho, pre_processing.MEU_NOME_PADRONIZADO, outro_nome,
+                      desde=desde, ate=ate)
+    assert mensagens and all(desde <= msg["timestamp"].date() <= ate for msg in mensagens)
+
+def bench_parsear_conversa_grupo(medir, conversa_grupo_padronizada):
+    caminho, outro_nome = conversa_grupo_padronizada
+
+    def parsear_e_parear():
+        autores = pre_processing.TabelaAutores(pre_processing.MEU_NOME_PADRONIZADO, outro_nome)
+        mensagens = pre_processing.parsear_conversa_bruta(caminho, pre_processing.MEU_NOME_PADRONIZADO, outro_nome, autores,
+                                                          aceitar_grupo=True)
+        blocos = pre_processing.filtrar_blocos_ai(pre_processing.agrupar_mensagens(mensagens), pre_processing.ID_MEU_NOME)
+        return autores, pre_processing.criar_e_validar_pares(blocos, pre_processing.ID_MEU_NOME)
+
+    autores, pares = medir(parsear_e_parear)
+    assert autores.e_grupo() and pares
+
+def bench_agrupar_mensagens(medir, mensagens):
+    blocos = medir(pre_processing.agrupar_mensagens, mensagens)
+    assert 0 < len(blocos) <= len(mensagens)
+
+def bench_filtrar_blocos_ai(medir, blocos):
+    filtrados = medir(pre_processing.filtrar_blocos_ai, blocos, pre_processing.ID_MEU_NOME, pre_processing.ID_INTERLOCUTOR)
+    assert len(filtrados) <= len(blocos)
+
+def bench_limpar_texto_e_validar(medir, blocos):
+    textos = [bloco["texto_completo_bruto"] for bloco in blocos]
+
+    def limpar_todos():
+        return [pre_processing.limpar_texto_e_validar(texto) for texto in textos]
+
+    limpos = medir(limpar_todos)
+    assert len(limpos) == len(textos)
+
+def bench_criar_pares_contexto(medir, blocos):
+    blocos_sem_ai = pre_processing.filtrar_blocos_ai(blocos, pre_processing.ID_MEU_NOME, pre_processing.ID_INTERLOCUTOR)
+    pares = medir(pre_processing.criar_e_validar_pares, blocos_sem_ai, pre_processing.ID_MEU_NOME, 16)
+    assert pares and all(par["mensagens"][-1]["content"] == par["output"] for par in pares)
+
+def bench_deduplicacao(medir, dataset_final):
+    with open(dataset_final, 'r', encoding='utf-8') as f:
+        pares = [json.loads(linha) for linha in f]
+    mantidos, relatorio = medir(deduplicacao.deduplicar, pares)
+    assert 0 < len(mantidos) <= len(pares) and relatorio["pares_depois"] == len(mantidos)
+
+def bench_perfil_estilometrico(medir, dataset_final):
+    def perfilar_dataset():
+        return perfil_estilometrico.perfilar(perfil_estilometrico.ler_textos(dataset_final, "output"))
+    perfis = medir(perfilar_dataset)
+    assert perfis[perfil_estilometrico.CATEGORIA_GERAL].resumo()["textos"] > 0
+
+def bench_add_instruction(medir, dataset_final, tmp_path, monkeypatch):
+    monkeypatch.setattr(add_instruction, "ARQUIVO_ENTRADA", dataset_final)
+    monkeypatch.setattr(add_instruction, "ARQUIVO_SAIDA", str(tmp_path / "dataset_instruct.jsonl"))
+    monkeypatch.setattr(add_instruction, "ARQUIVO_ENTRADA_VALIDACAO", str(tmp_path / "sem_validacao.jsonl"))
+    medir(add_instruction.criar_dataset_com_instrucoes, TEMPLATE_PERSONA)
+    assert (tmp_path / "dataset_instruct.jsonl").stat().st_size > 0
@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ_PROJETO)
+
+import name_normalize
+import pre_processing
+from gerador_sintetico import gerar_corpus
+
+MEU_NOME_SINTETICO = "Fulano de Tal"
+ARQUIVO_LIMITES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "limites.json")
+
+def pytest_addoption(parser):
+    grupo = parser.getgroup("doppelbot", "Configuração do corpus sintético e dos limites de regressão")
+    grupo.addoption("--bench-categorias", type=int, default=2, help="Categorias no corpus sintético.")
+    grupo.addoption("--bench-arquivos", type=int, default=2, help="Arquivos por categoria.")
+    grupo.addoption("--bench-mensagens", type=int, default=5000, help="Mensagens por arquivo.")
+    grupo.addoption("--bench-semente", type=int, default=42)
+    grupo.addoption("--bench-rodadas", type=int, default=5, help="Rodadas medidas por benchmark.")
+    grupo.addoption("--limites", default=ARQUIVO_LIMITES, help="JSON com o tempo médio máximo de cada benchmark.")
+    grupo.addoption("--limite-fator", type=float, default=1.0,
+                    help="Multiplicador aplicado a todos os limites (ex: 2.0 em máquinas lentas; 0 desativa).")
+
+# --- Corpus sintético (gerado uma vez por sessão) ---
+
+@pytest.fixture(scope="session")
+def corpus_original(tmp_path_factory, pytestconfig):
+    pasta = tmp_path_factory.mktemp("conversas_originais")
+    categorias = [f"Categoria{i + 1}" for i in range(pytestconfig.getoption("--bench-categorias"))]
+    gerar_corpus(str(pasta), MEU_NOME_SINTETICO, categorias,
+                 pytestconfig.getoption("--bench-arquivos"),
+                 pytestconfig.getoption("--bench-mensagens"),
+                 pytestconfig.getoption("--bench-semente"))
+    return str(pasta)
+
+@pytest.fixture(scope="session")
+def corpus_padronizado(corpus_original, tmp_path_factory):
+    pasta = str(tmp_path_factory.mktemp("conversas_padronizadas"))
+    pasta_anterior = name_normalize.PASTA_PADRONIZADA
+    name_normalize.PASTA_PADRONIZADA = pasta
+    try:
+        name_normalize.padronizar_conversas(MEU_NOME_SINTETICO, corpus_original)
+    finally:
+        name_normalize.PASTA_PADRONIZADA = pasta_anterior
+    return pasta
+
+@pytest.fixture(scope="session")
+def conversa_padronizada(corpus_padronizado):
+    """(caminho, outro_nome) do primeiro arquivo padronizado."""
+    categoria = sorted(os.listdir(corpus_padronizado))[0]
+    nome_arquivo = sorted(os.listdir(os.path.join(corpus_padronizado, categoria)))[0]
+    return os.path.join(corpus_padronizado, categoria, nome_arquivo), nome_arquivo.replace(".txt", "")
+
+@pytest.fixture(scope="session")
+def conversa_grupo_padronizada(tmp_path_factory, pytestconfig):
+    """(caminho, outro_nome) de um grupo sintético com 300 participantes, já padronizado."""
+    pasta = tmp_path_factory.mktemp("grupo_original")
+    gerar_corpus(str(pasta), MEU_NOME_SINTETICO, ["Grupo"], 0, pytestconfig.getoption("--bench-mensagens"),
+                 pytestconfig.getoption("--bench-semente"), grupos_por_categoria=1, participantes_por_grupo=300)
+    pasta_padronizada = str(tmp_path_factory.mktemp("grupo_padronizado"))
+    pasta_anterior = name_normalize.PASTA_PADRONIZADA
+    name_normalize.PASTA_PADRONIZADA = pasta_padronizada
+    try:
+        name_normalize.padronizar_conversas(MEU_NOME_SINTETICO, str(pasta))
+    finally:
+        name_normalize.PASTA_PADRONIZADA = pasta_anterior
+    return os.path.join(pasta_padronizada, "Grupo", "Grupo1.txt"), "Grupo1"
+
+@pytest.fixture(scope="session")
+def mensagens(conversa_padronizada):
+    caminho, outro_nome = conversa_padronizada
+    return pre_processing.parsear_conversa_bruta(caminho, pre_processing.MEU_NOME_PADRONIZADO, outro_nome)
+
+@pytest.fixture(scope="session")
+def blocos(mensagens):
+    return pre_processing.agrupar_mensagens(mensagens)
+
+@pytest.fixture(scope="session")
+def dataset_final(blocos, tmp_path_factory):
+    """Arquivo no formato de saída da Etapa 2, usado pelo benchmark da Etapa 3."""
+    blocos_sem_ai = pre_processing.filtrar_blocos_ai(blocos, pre_processing.ID_MEU_NOME, pre_processing.ID_INTERLOCUTOR)
+    pares = pre_processing.criar_e_validar_pares(blocos_sem_ai, pre_processing.ID_MEU_NOME)
+    caminho = tmp_path_factory.mktemp("etapa2") / "dataset_final.jsonl"
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for par in pares:
+            f.write(json.dumps({**par, "categoria": "Categoria1"}, ensure_ascii=False) + '\n')
+    return str(caminho)
+
+# --- Medição com limite de regressão ---
+
+@pytest.fixture(scope="session")
+def limites(pytestconfig):
+    with open(pytestconfig.getoption("--limites"), 'r', encoding='utf-8') as f:
+        return {nome: valor for nome, valor in json.load(f).items() if not nome.startswith("_")}
+
+@pytest.fixture
+def medir(benchmark, request, limites, pytestconfig):
+    """
+    Executa `func` com benchmark.pedantic e falha se o tempo médio passar do
+    limite configurado em limites.json (multiplicado por --limite-fator).
+    """
+    def _medir(func, *args, **kwargs):
+        resultado = benchmark.pedantic(func, args=args, kwargs=kwargs,
+                                       rounds=pytestconfig.getoption("--bench-rodadas"), iterations=1,
+                                       warmup_rounds=1)
+        fator = pytestconfig.getoption("--limite-fator")
+        limite = limites.get(request.node.originalname)
+        if benchmark.stats is not None and limite is not None and fator > 0:
+            media = benchmark.stats.stats.mean
+            assert media <= limite * fator, (
+                f"Regressão de desempenho em '{request.node.originalname}': média de {media:.4f}s "
+                f"acima do limite de {limite * fator:.4f}s ({limite}s x fator {fator})."
+            )
+        return resultado
+    return _medir
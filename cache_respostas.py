@@ -0,0 +1,198 @@
+import random
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict, deque
+
+# --- CONFIGURAÇÕES PADRÃO DO CACHE ---
+MAX_ENTRADAS = 2000
+TTL_SEGUNDOS = 6 * 60 * 60
+# Similaridade de Jaccard mínima (n-gramas de caracteres) para o acerto aproximado.
+LIMIAR_SIMILARIDADE = 0.6
+TAMANHO_NGRAM = 3
+# Uma entrada só é servida do cache depois de acumular MIN_VARIANTES respostas
+# diferentes; até lá o modelo continua gerando para variar as respostas.
+MIN_VARIANTES = 3
+MAX_VARIANTES = 6
+# Quantas latências recentes são guardadas para as métricas.
+JANELA_LATENCIAS = 1000
+
+def normalizar_entrada(texto):
+    """
+    Normaliza a mensagem para a chave do cache: minúsculas, sem acentos,
+    sem pontuação e com letras repetidas encurtadas ("kkkkkk" -> "kk",
+    "e aí???" -> "e ai").
+    """
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    texto = re.sub(r'(\w)\1{2,}', r'\1\1', texto)
+    return ' '.join(texto.split())
+
+def ngramas_caracteres(texto, n=TAMANHO_NGRAM):
+    """Conjunto de hashes dos n-gramas de caracteres (com bordas) do texto normalizado."""
+    texto = f" {texto} "
+    if len(texto) <= n:
+        return {hash(texto)}
+    return {hash(texto[i:i + n]) for i in range(len(texto) - n + 1)}
+
+class CacheRespostas:
+    """
+    Cache de respostas indexado por (categoria, mensagem normalizada).
+
+    A busca exata é um acesso a dicionário. A busca aproximada usa um índice
+    invertido de n-gramas de caracteres: só as entradas que compartilham algum
+    n-grama com a mensagem são comparadas (Jaccard). As entradas expiram por
+    TTL e, acima de `max_entradas`, a menos usada recentemente é removida.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, ttl_segundos=TTL_SEGUNDOS,
+                 limiar_similaridade=LIMIAR_SIMILARIDADE, min_variantes=MIN_VARIANTES,
+                 max_variantes=MAX_VARIANTES, semente=None):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.limiar_similaridade = limiar_similaridade
+        self.min_variantes = min_variantes
+        self.max_variantes = max_variantes
+        self.rng = random.Random(semente)
+
+        self.entradas = OrderedDict()   # chave -> {"variantes", "ngramas", "criado_em"}
+        self.indice_ngramas = {}        # (categoria, ngrama) -> set(chaves)
+
+        self.stats = {"consultas": 0, "acertos_exatos": 0, "acertos_aproximados": 0, "falhas": 0, "remocoes": 0}
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+        self.latencias_geracao = deque(maxlen=JANELA_LATENCIAS)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    # --- Manutenção das entradas ---
+
+    def _remover(self, chave):
+        entrada = self.entradas.pop(chave)
+        categoria = chave[0]
+        for ngrama in entrada["ngramas"]:
+            chaves = self.indice_ngramas.get((categoria, ngrama))
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self.indice_ngramas[(categoria, ngrama)]
+        self.stats["remocoes"] += 1
+
+    def _expirada(self, entrada, agora):
+        return self.ttl_segundos is not None and agora - entrada["criado_em"] > self.ttl_segundos
+
+    def _servivel(self, chave, agora):
+        """Retorna a entrada se ela existir, não tiver expirado e já tiver variantes suficientes."""
+        entrada = self.entradas.get(chave)
+        if entrada is None:
+            return None
+        if self._expirada(entrada, agora):
+            self._remover(chave)
+            return None
+        if len(entrada["variantes"]) < self.min_variantes:
+            return None
+        return entrada
+
+    def _busca_aproximada(self, categoria, ngramas, agora):
+        compartilhados = Counter()
+        for ngrama in ngramas:
+            compartilhados.update(self.indice_ngramas.get((categoria, ngrama), ()))
+
+        for chave, intersecao in compartilhados.most_common():
+            uniao = len(ngramas) + len(self.entradas[chave]["ngramas"]) - intersecao
+            if intersecao / uniao < self.limiar_similaridade:
+                # As próximas têm ainda menos n-gramas em comum com a mensagem.
+                if intersecao / len(ngramas) < self.limiar_similaridade:
+                    break
+                continue
+            entrada = self._servivel(chave, agora)
+            if entrada is not None:
+                return chave, entrada
+        return None, None
+
+    # --- API pública ---
+
+    def buscar(self, categoria, texto):
+        """Retorna uma das respostas armazenadas para a mensagem, ou None em caso de falha."""
+        inicio = time.perf_counter()
+        agora = time.time()
+        self.stats["consultas"] += 1
+
+        chave = (categoria, normalizar_entrada(texto))
+        entrada = self._servivel(chave, agora)
+        if entrada is not None:
+            self.stats["acertos_exatos"] += 1
+        else:
+            chave, entrada = self._busca_aproximada(categoria, ngramas_caracteres(chave[1]), agora)
+            if entrada is not None:
+                self.stats["acertos_aproximados"] += 1
+            else:
+                self.stats["falhas"] += 1
+
+        resposta = None
+        if entrada is not None:
+            self.entradas.move_to_end(chave)
+            resposta = self.rng.choice(entrada["variantes"])
+
+        self.latencias.append(time.perf_counter() - inicio)
+        return resposta
+
+    def adicionar(self, categoria, texto, resposta):
+        """Armazena uma resposta gerada pelo modelo como variante da mensagem."""
+        normalizada = normalizar_entrada(texto)
+        if not normalizada or not resposta:
+            return
+        chave = (categoria, normalizada)
+        entrada = self.entradas.get(chave)
+        if entrada is not None and self._expirada(entrada, time.time()):
+            self._remover(chave)
+            entrada = None
+
+        if entrada is None:
+            entrada = {"variantes": [], "ngramas": ngramas_caracteres(normalizada), "criado_em": time.time()}
+            self.entradas[chave] = entrada
+            for ngrama in entrada["ngramas"]:
+                self.indice_ngramas.setdefault((categoria, ngrama), set()).add(chave)
+
+        if resposta not in entrada["variantes"]:
+            entrada["variantes"].append(resposta)
+            if len(entrada["variantes"]) > self.max_variantes:
+                entrada["variantes"].pop(0)
+        self.entradas.move_to_end(chave)
+
+        while len(self.entradas) > self.max_entradas:
+            self._remover(next(iter(self.entradas)))
+
+    def limpar(self):
+        """Descarta todas as respostas (ex: o modelo mudou e elas não o representam mais). As métricas continuam."""
+        self.stats["remocoes"] += len(self.entradas)
+        self.entradas.clear()
+        self.indice_ngramas.clear()
+
+    def registrar_geracao(self, segundos):
+        """Registra o tempo de uma geração feita após uma falha, para comparar com os acertos."""
+        self.latencias_geracao.append(segundos)
+
+    def metricas(self):
+        """Taxa de acerto e latência das consultas ao cache."""
+        consultas = self.stats["consultas"]
+        acertos = self.stats["acertos_exatos"] + self.stats["acertos_aproximados"]
+        latencias_ms = sorted(l * 1000 for l in self.latencias)
+        return {
+            **self.stats,
+            "entradas": len(self.entradas),
+            "taxa_acerto": acertos / consultas if consultas else 0.0,
+            "latencia_media_ms": sum(latencias_ms) / len(latencias_ms) if latencias_ms else 0.0,
+            "latencia_p95_ms": latencias_ms[int(0.95 * (len(latencias_ms) - 1))] if latencias_ms else 0.0,
+            "latencia_media_geracao_ms": (sum(self.latencias_geracao) * 1000 / len(self.latencias_geracao)
+                                          if self.latencias_geracao else 0.0),
+        }
+
+    def resumo(self):
+        m = self.metricas()
+        return (f"Cache: {m['consultas']} consultas | taxa de acerto {m['taxa_acerto']:.1%} "
+                f"(exatos: {m['acertos_exatos']}, aproximados: {m['acertos_aproximados']}) | "
+                f"latência média {m['latencia_media_ms']:.3f} ms (p95 {m['latencia_p95_ms']:.3f} ms) | "
+                f"{m['entradas']} entradas, {m['remocoes']} removidas | "
+                f"geração média {m['latencia_media_geracao_ms']:.0f} ms")
@@ -0,0 +1,137 @@
+import argparse
+import readline
+import sys
+import os
+import time
+from contextlib import nullcontext
+
+from backend_inferencia import adicionar_argumentos_backend, carregar_modelo
+from cache_respostas import CacheRespostas
+import instrumentacao
+from geracao import adicionar_argumentos_especulacao, criar_especulador, formatar_resposta, gerar_resposta
+
+# --- Função para carregar o prompt de um arquivo ---
+def carregar_prompt_base(caminho_arquivo):
+    if not os.path.exists(caminho_arquivo):
+        print(f"ERRO: Arquivo de descrição '{caminho_arquivo}' não encontrado.")
+        sys.exit(1)
+    try:
+        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        print(f"ERRO: Falha ao ler o arquivo de descrição: {e}")
+        sys.exit(1)
+
+# --- Validação de Argumentos ---
+parser = argparse.ArgumentParser(description="Chat interativo com o Doppelbot.")
+parser.add_argument("descricao", help="Caminho para o arquivo de descrição da persona (ex: descricao.txt)")
+parser.add_argument("--exemplos", type=int, default=0,
+                    help="Quantidade de conversas reais similares injetadas como exemplos a cada mensagem (0 = desativado).")
+parser.add_argument("--indice", default="indice_exemplos",
+                    help="Pasta do índice criado por 'python indice_recuperacao.py'.")
+parser.add_argument("--nprobe", type=int, default=8, help="Listas IVF consultadas por busca (se o índice usar IVF).")
+parser.add_argument("--cache", action="store_true",
+                    help="Reutiliza respostas já geradas para mensagens iguais ou quase iguais (ex: 'kkkk', 'bom dia').")
+parser.add_argument("--cache-ttl", type=int, default=6 * 60 * 60, help="Validade das respostas no cache, em segundos.")
+parser.add_argument("--cache-limiar", type=float, default=0.6,
+                    help="Similaridade mínima (0 a 1) para reaproveitar a resposta de uma mensagem parecida.")
+parser.add_argument("--observar-checkpoints", nargs="?", const="./results", default=None, metavar="PASTA",
+                    help="Carrega em segundo plano cada checkpoint novo do treino (padrão: ./results), sem reiniciar.")
+parser.add_argument("--intervalo-checkpoints", type=float, default=30.0,
+                    help="Segundos entre as verificações da pasta de checkpoints.")
+adicionar_argumentos_backend(parser)
+adicionar_argumentos_especulacao(parser)
+args = parser.parse_args()
+instrumentacao.iniciar("doppelbot")
+
+# --- Caminhos e Configurações ---
+caminho_descricao = args.descricao
+base_model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
+adapters_path = "doppelbot-llama3-8b-instruct-adapters"
+
+prompt_template = carregar_prompt_base(caminho_descricao)
+
+# --- Carrega modelo com LoRA ---
+with instrumentacao.etapa("carregamento_modelo"):
+    print("Carregando modelo e tokenizador...")
+    model, tokenizer = carregar_modelo(base_model_id, adapters_path, args.backend, args.threads)
+
+especulador = criar_especulador(args, model, tokenizer)
+
+cache = CacheRespostas(ttl_segundos=args.cache_ttl, limiar_similaridade=args.cache_limiar) if args.cache else None
+
+# --- Recarga de checkpoints em segundo plano (opcional) ---
+recarga = None
+if args.observar_checkpoints is not None:
+    from recarga_adaptadores import RecargaAdaptadores
+    # As respostas em cache vieram dos pesos anteriores: cada checkpoint novo começa com o cache vazio.
+    recarga = RecargaAdaptadores(model, args.observar_checkpoints, args.intervalo_checkpoints,
+                                 adaptadores_iniciais=adapters_path,
+                                 ao_trocar=(lambda _: cache.limpar()) if cache is not None else None)
+    recarga.iniciar()
+
+# --- Índice de exemplos reais (few-shot por similaridade) ---
+indice_exemplos = None
+if args.exemplos > 0:
+    from sentence_transformers import SentenceTransformer
+    from indice_recuperacao import IndiceExemplos, exemplos_como_mensagens
+    indice_exemplos = IndiceExemplos(args.indice)
+    modelo_embeddings = SentenceTransformer(indice_exemplos.meta["modelo"])
+    print(f"Índice de exemplos carregado ({len(indice_exemplos)} conversas reais).")
+
+# --- Monta o prompt de sistema com base na categoria ---
+categoria = input("Com quem o Doppelbot está falando? (ex: amigo, interesse romântico...): ").strip()
+if not categoria:
+    categoria = "amigo"
+
+system_prompt = prompt_template.format(categoria=categoria)
+
+# Os exemplos recuperados vêm da mesma categoria da conversa, se o índice tiver exemplos dela.
+categoria_exemplos = None
+if indice_exemplos is not None:
+    categoria_exemplos = indice_exemplos.categoria_no_indice(categoria)
+    if categoria_exemplos is None:
+        print(f"AVISO: O índice não tem exemplos da categoria '{categoria}'; os exemplos virão de todas as categorias.")
+
+
+print("\n=== Gerador de Respostas Isoladas ===")
+print("(Digite 'sair' para encerrar)\n")
+
+while True:
+    user_input = input("Você: ").strip()
+    if user_input.lower() in ["sair", "exit", "quit"]:
+        if cache is not None:
+            print(cache.resumo())
+        if recarga is not None:
+            recarga.parar()
+            print(recarga.resumo())
+        break
+
+    # Com a recarga ativa, um checkpoint novo só entra entre uma resposta e outra. A consulta e a gravação
+    # no cache ficam dentro do mesmo bloco: uma resposta dos pesos antigos nunca entra no cache já limpo.
+    with recarga.uso() if recarga is not None else nullcontext():
+        resposta_bruta = cache.buscar(categoria, user_input) if cache is not None else None
+        if resposta_bruta is None:
+            # O histórico é criado do zero a cada pergunta; apenas os exemplos
+            # recuperados do índice (se ativado) entram antes da mensagem atual.
+            exemplos = []
+            if indice_exemplos is not None:
+                vetor = modelo_embeddings.encode([user_input], convert_to_numpy=True)[0]
+                exemplos = exemplos_como_mensagens(indice_exemplos.buscar(vetor, args.exemplos, args.nprobe,
+                                                                                categoria_exemplos))
+
+            conversa_atual = [
+                {"role": "system", "content": system_prompt},
+                *exemplos,
+                {"role": "user", "content": user_input}
+            ]
+
+            inicio = time.perf_counter()
+            resposta_bruta = gerar_resposta(model, tokenizer, conversa_atual, max_new_tokens=150,
+                                            especulador=especulador)
+            if cache is not None:
+                cache.registrar_geracao(time.perf_counter() - inicio)
+                cache.adicionar(categoria, user_input, resposta_bruta)
+    resposta_formatada = formatar_resposta(resposta_bruta)
+
+    print(f"Doppelbot:\n{resposta_formatada}\n")
@@ -0,0 +1,246 @@
+import os
+import sys
+import torch
+from transformers import (
+    AutoModelForCausalLM,
+    LogitsProcessorList,
+    NoRepeatNGramLogitsProcessor,
+    RepetitionPenaltyLogitsProcessor,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+)
+
+from formato_dados import iterar_pares, resolver_caminho
+from geracao import PARAMETROS_AMOSTRAGEM
+
+# --- CONSTANTES DO ÍNDICE DE N-GRAMAS ---
+# Tamanhos de n-grama consultados (do maior para o menor) ao propor tokens.
+NGRAM_MIN = 1
+NGRAM_MAX = 3
+# Quantos tokens de continuação são guardados para cada n-grama.
+MAX_CONTINUACAO = 10
+
+def criar_processadores():
+    """
+    Reproduz a cadeia de processadores que o `model.generate` monta a partir de
+    PARAMETROS_AMOSTRAGEM, na mesma ordem (penalidades primeiro, depois os warpers).
+    Sem do_sample (decodificação gulosa) o generate não aplica os warpers.
+    """
+    p = PARAMETROS_AMOSTRAGEM
+    processadores = [
+        RepetitionPenaltyLogitsProcessor(p["repetition_penalty"]),
+        NoRepeatNGramLogitsProcessor(p["no_repeat_ngram_size"]),
+    ]
+    if p["do_sample"]:
+        processadores += [
+            TemperatureLogitsWarper(p["temperature"]),
+            TopKLogitsWarper(p["top_k"]),
+            TopPLogitsWarper(p["top_p"]),
+        ]
+    return LogitsProcessorList(processadores)
+
+class IndiceNgram:
+    """
+    Tabela n-grama -> tokens seguintes, construída a partir das mensagens reais
+    do usuário. Em cada passo, os últimos tokens gerados são procurados na tabela
+    e a continuação encontrada é proposta como rascunho.
+    """
+
+    def __init__(self, n_min=NGRAM_MIN, n_max=NGRAM_MAX, max_continuacao=MAX_CONTINUACAO):
+        self.n_min = n_min
+        self.n_max = n_max
+        self.max_continuacao = max_continuacao
+        self.tabela = {}
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def adicionar(self, ids):
+        """Indexa uma sequência de tokens. Ocorrências mais recentes sobrescrevem as antigas."""
+        for n in range(self.n_min, self.n_max + 1):
+            for i in range(len(ids) - n):
+                continuacao = ids[i + n:i + n + self.max_continuacao]
+                self.tabela[tuple(ids[i:i + n])] = tuple(continuacao)
+
+    def propor(self, contexto, num_tokens):
+        """Retorna até `num_tokens` tokens de rascunho para o final de `contexto`."""
+        if num_tokens <= 0:
+            return []
+        for n in range(self.n_max, self.n_min - 1, -1):
+            if len(contexto) < n:
+                continue
+            continuacao = self.tabela.get(tuple(contexto[-n:]))
+            if continuacao:
+                return list(continuacao[:num_tokens])
+        return []
+
+    @classmethod
+    def de_dataset(cls, caminho_dataset, tokenizer, tamanho_lote=1000):
+        """Constrói o índice a partir dos campos 'output' (respostas do usuário) do dataset."""
+        caminho_dataset = resolver_caminho(caminho_dataset) # O .parquet, se a Etapa 2 gravou nesse formato.
+        if not os.path.exists(caminho_dataset):
+            print(f"ERRO: Arquivo de histórico '{caminho_dataset}' não encontrado.")
+            sys.exit(1)
+
+        textos = [par.get("output", "") for par in iterar_pares(caminho_dataset, colunas=["output"])]
+
+        indice = cls()
+        for inicio in range(0, len(textos), tamanho_lote):
+            lote = [t for t in textos[inicio:inicio + tamanho_lote] if t]
+            if not lote:
+                continue
+            for ids in tokenizer(lote, add_special_tokens=False)["input_ids"]:
+                indice.adicionar(ids)
+        return indice
+
+class EspeculadorNgram:
+    """
+    Decodificação especulativa com rascunho determinístico vindo do IndiceNgram.
+
+    Os tokens propostos são verificados pelo modelo fine-tuned em um único
+    forward. Como o rascunho é determinístico, cada token é aceito com a
+    probabilidade que o modelo atribui a ele (após penalidades, temperatura,
+    top-k e top-p); em caso de rejeição, o token é amostrado da distribuição do
+    modelo sem o token rejeitado. A distribuição final é exatamente a mesma da
+    amostragem token a token. Sem do_sample, um token só é aceito se for o de
+    maior probabilidade, e a saída é idêntica à do generate guloso.
+    """
+
+    def __init__(self, indice, num_tokens_rascunho=5):
+        self.indice = indice
+        self.num_tokens_rascunho = num_tokens_rascunho
+        self.processadores = criar_processadores()
+        self.amostragem = PARAMETROS_AMOSTRAGEM["do_sample"]
+        self.estatisticas = {"propostos": 0, "aceitos": 0, "passos": 0, "tokens": 0}
+
+    def taxa_aceitacao(self):
+        propostos = self.estatisticas["propostos"]
+        return self.estatisticas["aceitos"] / propostos if propostos else 0.0
+
+    def _escolher(self, probs):
+        return torch.multinomial(probs / probs.sum(), 1).item() if self.amostragem else int(torch.argmax(probs))
+
+    def _amostrar(self, sequencia, logits, device):
+        prefixo = torch.tensor([sequencia], device=device)
+        scores = self.processadores(prefixo, logits.unsqueeze(0).float())
+        return torch.softmax(scores, dim=-1)[0]
+
+    @torch.no_grad()
+    def gerar(self, model, input_ids, max_new_tokens, eos_ids):
+        eos_ids = {t for t in eos_ids if t is not None}
+        device = input_ids.device
+        sequencia = input_ids[0].tolist()
+        tamanho_prompt = len(sequencia)
+
+        # O cache sempre contém todos os tokens da sequência menos o último
+        # ("pendente"), que é reenviado junto com o próximo rascunho.
+        saida = model(input_ids[:, :-1], use_cache=True)
+        cache = saida.past_key_values
+
+        while len(sequencia) - tamanho_prompt < max_new_tokens:
+            restantes = max_new_tokens - (len(sequencia) - tamanho_prompt)
+            rascunho = self.indice.propor(sequencia, min(self.num_tokens_rascunho, restantes - 1))
+
+            entrada = torch.tensor([[sequencia[-1]] + rascunho], device=device)
+            saida = model(entrada, past_key_values=cache, use_cache=True)
+            cache = saida.past_key_values
+            logits = saida.logits[0]
+            self.estatisticas["passos"] += 1
+            self.estatisticas["propostos"] += len(rascunho)
+
+            tamanho_antes = len(sequencia)
+            novo_token = None
+            for i, token in enumerate(rascunho):
+                probs = self._amostrar(sequencia, logits[i], device)
+                aceito = (torch.rand(1).item() < probs[token].item() if self.amostragem
+                          else token == int(torch.argmax(probs)))
+                if aceito:
+                    sequencia.append(token)
+                    self.estatisticas["aceitos"] += 1
+                    if token in eos_ids:
+                        break
+                    continue
+                if self.amostragem:
+                    probs[token] = 0.0
+                novo_token = self._escolher(probs)
+                break
+            else:
+                novo_token = self._escolher(self._amostrar(sequencia, logits[len(rascunho)], device))
+
+            # Descarta do cache as posições dos tokens de rascunho rejeitados
+            # (valor negativo = quantidade de posições removidas do final).
+            rejeitados = len(rascunho) - (len(sequencia) - tamanho_antes)
+            if rejeitados > 0:
+                cache.crop(-rejeitados)
+
+            if sequencia[-1] in eos_ids and novo_token is None:
+                break
+            sequencia.append(novo_token)
+            if novo_token in eos_ids:
+                break
+
+        self.estatisticas["tokens"] += len(sequencia) - tamanho_prompt
+        return torch.tensor([sequencia], device=device)
+
+class EspeculadorRascunho:
+    """
+    Decodificação assistida do transformers com um modelo de rascunho pequeno
+    que compartilha o vocabulário do Llama 3. O `generate` aplica a amostragem
+    especulativa com os mesmos processadores de logits do modo padrão.
+    """
+
+    def __init__(self, modelo_rascunho, num_tokens_rascunho=5):
+        self.modelo = modelo_rascunho
+        self.modelo.generation_config.num_assistant_tokens = num_tokens_rascunho
+        self.modelo.generation_config.num_assistant_tokens_schedule = "constant"
+        self.estatisticas = {"propostos": 0, "aceitos": 0, "passos": 0, "tokens": 0}
+
+    @classmethod
+    def carregar(cls, model_id, tokenizer, num_tokens_rascunho=5, cpu=False):
+        if cpu:
+            # Acompanha o backend cpu do modelo principal (ver backend_inferencia.py).
+            modelo = AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.float32)
+        else:
+            modelo = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                torch_dtype=torch.bfloat16,
+                device_map="auto"
+            )
+        # O tokenizador dos adaptadores tem o token extra '<|msg_sep|>'.
+        modelo.resize_token_embeddings(len(tokenizer))
+        return cls(modelo.eval(), num_tokens_rascunho)
+
+    def taxa_aceitacao(self):
+        propostos = self.estatisticas["propostos"]
+        return self.estatisticas["aceitos"] / propostos if propostos else 0.0
+
+    @torch.no_grad()
+    def gerar(self, model, input_ids, max_new_tokens, eos_ids):
+        # Conta os forwards de cada modelo: cada forward do rascunho propõe um
+        # token e cada forward do modelo principal produz os aceitos + 1.
+        contagem = {"alvo": 0, "rascunho": 0}
+        alvo = model.get_base_model() if hasattr(model, "get_base_model") else model
+        ganchos = [
+            alvo.register_forward_hook(lambda *_: contagem.__setitem__("alvo", contagem["alvo"] + 1)),
+            self.modelo.register_forward_hook(lambda *_: contagem.__setitem__("rascunho", contagem["rascunho"] + 1)),
+        ]
+        try:
+            outputs = model.generate(
+                input_ids,
+                assistant_model=self.modelo,
+                max_new_tokens=max_new_tokens,
+                eos_token_id=eos_ids,
+                pad_token_id=eos_ids[0],
+                **PARAMETROS_AMOSTRAGEM
+            )
+        finally:
+            for gancho in ganchos:
+                gancho.remove()
+
+        novos = outputs.shape[-1] - input_ids.shape[-1]
+        self.estatisticas["passos"] += contagem["alvo"]
+        self.estatisticas["propostos"] += contagem["rascunho"]
+        self.estatisticas["aceitos"] += max(0, novos - contagem["alvo"])
+        self.estatisticas["tokens"] += novos
+        return outputs
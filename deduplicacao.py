@@ -0,0 +1,239 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+import instrumentacao
+from formato_dados import escrever_pares, ler_pares, resolver_caminho
+
+# --- CONFIGURAÇÕES ---
+LIMIAR_SIMILARIDADE = 0.8 # Jaccard estimada a partir da qual dois pares são o mesmo padrão.
+MAX_POR_PADRAO = 2 # Cópias mantidas de cada padrão (ex: "bom dia" -> "bom dia"). O pre_processing só deduplica com --max-por-padrao.
+NUM_PERMUTACOES = 64
+TAMANHO_SHINGLE = 4 # Bytes por shingle (n-grama de caracteres do texto normalizado).
+TAMANHO_BLOCO_HASH = 1 << 18 # Shingles processados por vez no cálculo das assinaturas.
+LOTE_EFETIVO_REFERENCIA = 8 # Usado só para converter pares em passos de treino no relatório.
+SEMENTE = 42
+
+# --- Assinaturas MinHash ---
+
+def normalizar(texto):
+    """Minúsculas e espaços colapsados: diferenças só de caixa ou espaçamento não separam padrões."""
+    return re.sub(r'\s+', ' ', texto.lower()).strip()
+
+def texto_do_par(par):
+    """
+    Texto comparado entre os pares. No modo de contexto (campo "mensagens"), a conversa inteira entra na
+    chave: a mesma resposta a contextos diferentes não é o mesmo padrão.
+    """
+    if par.get("mensagens"):
+        return "\x1e".join(f"{m['role']}\x1f{normalizar(m['content'])}" for m in par["mensagens"])
+    return f"{normalizar(par['input'])}\x1f{normalizar(par['output'])}"
+
+def _shingles(textos):
+    """
+    Shingles de TAMANHO_SHINGLE bytes de cada texto, empacotados em inteiros
+    de 32 bits. Devolve (shingles concatenados, início de cada texto).
+    """
+    partes, inicios, total = [], [], 0
+    for texto in textos:
+        dados = np.frombuffer(texto.encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+        if len(dados) < TAMANHO_SHINGLE:
+            dados = np.pad(dados, (0, TAMANHO_SHINGLE - len(dados)))
+        n = len(dados) - TAMANHO_SHINGLE + 1
+        valores = np.zeros(n, dtype=np.uint32)
+        for deslocamento in range(TAMANHO_SHINGLE):
+            valores = (valores << np.uint32(8)) | dados[deslocamento:deslocamento + n]
+        partes.append(valores)
+        inicios.append(total)
+        total += n
+    return np.concatenate(partes).astype(np.uint64), np.array(inicios, dtype=np.int64)
+
+def assinaturas_minhash(textos, num_permutacoes=NUM_PERMUTACOES, semente=SEMENTE):
+    """
+    Matriz (textos x permutações) de MinHash. Cada permutação é um hash
+    multiply-shift ((a*x + b) >> 32, em aritmética de 64 bits); o mínimo por
+    texto é calculado de uma vez para todos os textos com np.minimum.reduceat.
+    """
+    rng = np.random.default_rng(semente)
+    a = rng.integers(1, 2**63, size=num_permutacoes, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_permutacoes, dtype=np.uint64)
+    shingles, inicios = _shingles(textos)
+
+    assinaturas = np.empty((len(textos), num_permutacoes), dtype=np.uint32)
+    # Processa em blocos alinhados aos textos para limitar a memória da matriz (permutações x shingles).
+    primeiro = 0
+    while primeiro < len(textos):
+        limite = inicios[primeiro] + TAMANHO_BLOCO_HASH
+        ultimo = max(primeiro + 1, int(np.searchsorted(inicios, limite, side="right")))
+        fim = inicios[ultimo] if ultimo < len(textos) else len(shingles)
+        bloco = shingles[inicios[primeiro]:fim]
+        with np.errstate(over="ignore"):
+            hashes = (a[:, None] * bloco[None, :] + b[:, None]) >> np.uint64(32)
+        assinaturas[primeiro:ultimo] = np.minimum.reduceat(hashes, inicios[primeiro:ultimo] - inicios[primeiro], axis=1).T
+        primeiro = ultimo
+    return assinaturas
+
+# --- LSH por Bandas ---
+
+def escolher_bandas(num_permutacoes, limiar):
+    """
+    Bandas x linhas (com bandas * linhas <= num_permutacoes) cujo ponto de
+    inflexão (1/bandas)^(1/linhas) fica mais perto do limiar: pares acima
+    dele quase sempre caem juntos em algum balde.
+    """
+    opcoes = [(bandas, num_permutacoes // bandas) for bandas in range(1, num_permutacoes + 1)]
+    return min(opcoes, key=lambda opcao: abs((1 / opcao[0]) ** (1 / opcao[1]) - limiar))
+
+class UniaoBusca:
+    def __init__(self, n):
+        self.pai = list(range(n))
+
+    def raiz(self, i):
+        while self.pai[i] != i:
+            self.pai[i] = self.pai[self.pai[i]]
+            i = self.pai[i]
+        return i
+
+    def unir(self, i, j):
+        ri, rj = self.raiz(i), self.raiz(j)
+        if ri != rj:
+            # O menor índice vira a raiz: o padrão é representado pela primeira ocorrência.
+            self.pai[max(ri, rj)] = min(ri, rj)
+
+def agrupar_similares(assinaturas, limiar=LIMIAR_SIMILARIDADE):
+    """
+    Agrupa textos com Jaccard estimada >= `limiar`. Cada banda da assinatura
+    vira uma chave de balde; dentro de um balde cada membro é comparado com
+    os representantes dos grupos já abertos no balde (o primeiro membro e
+    cada um que não se pareceu com nenhum deles). Baldes de cópias de um
+    mesmo padrão têm um representante só, então o custo fica perto de linear
+    no número de textos (não quadrático). Retorna o id do grupo (índice da
+    primeira ocorrência) de cada texto e o número de comparações.
+    """
+    n, num_permutacoes = assinaturas.shape
+    bandas, linhas = escolher_bandas(num_permutacoes, limiar)
+    multiplicadores = np.random.default_rng(SEMENTE).integers(1, 2**63, size=linhas, dtype=np.uint64) | np.uint64(1)
+    uniao = UniaoBusca(n)
+    comparacoes = 0
+    for banda in range(bandas):
+        fatia = assinaturas[:, banda * linhas:(banda + 1) * linhas].astype(np.uint64)
+        with np.errstate(over="ignore"):
+            chaves = (fatia * multiplicadores).sum(axis=1)
+        ordem = np.argsort(chaves, kind="stable")
+        chaves_ordenadas = chaves[ordem]
+        fronteiras = np.flatnonzero(np.diff(chaves_ordenadas)) + 1
+        for balde in np.split(ordem, fronteiras):
+            if len(balde) < 2:
+                continue
+            primeiro = int(balde[0])
+            parecidos_com_primeiro = (assinaturas[balde[1:]] == assinaturas[primeiro]).mean(axis=1) >= limiar
+            comparacoes += len(balde) - 1
+            # Comparar só com o primeiro perderia dois membros parecidos entre si mas não com ele: os que
+            # não se parecem com nenhum representante anterior abrem um grupo novo no balde.
+            representantes = []
+            for membro, parecido in zip(balde[1:].tolist(), parecidos_com_primeiro):
+                if parecido:
+                    uniao.unir(primeiro, membro)
+                if representantes:
+                    similaridades = (assinaturas[representantes] == assinaturas[membro]).mean(axis=1)
+                    comparacoes += len(representantes)
+                    for posicao in np.flatnonzero(similaridades >= limiar):
+                        uniao.unir(representantes[posicao], membro)
+                        parecido = True
+                if not parecido:
+                    representantes.append(membro)
+    return [uniao.raiz(i) for i in range(n)], comparacoes
+
+# --- Deduplicação do Dataset ---
+
+def deduplicar(pares, limiar=LIMIAR_SIMILARIDADE, max_por_padrao=MAX_POR_PADRAO, num_permutacoes=NUM_PERMUTACOES):
+    """
+    Remove pares quase duplicados, mantendo as `max_por_padrao` primeiras
+    ocorrências de cada padrão. Pares de categorias diferentes nunca são
+    agrupados (o prompt de sistema muda). Retorna (pares_mantidos, relatorio).
+    """
+    por_categoria = {}
+    for indice, par in enumerate(pares):
+        por_categoria.setdefault(par.get("categoria"), []).append(indice)
+
+    manter = np.zeros(len(pares), dtype=bool)
+    relatorio = {"pares_antes": len(pares), "padroes_repetidos": 0, "comparacoes": 0, "maiores_padroes": []}
+    for indices in por_categoria.values():
+        assinaturas = assinaturas_minhash([texto_do_par(pares[i]) for i in indices], num_permutacoes)
+        grupos, comparacoes = agrupar_similares(assinaturas, limiar)
+        relatorio["comparacoes"] += comparacoes
+        vistos = {}
+        for posicao, grupo in enumerate(grupos):
+            vistos[grupo] = vistos.get(grupo, 0) + 1
+            if vistos[grupo] <= max_por_padrao:
+                manter[indices[posicao]] = True
+        for grupo, quantidade in vistos.items():
+            if quantidade > 1:
+                relatorio["padroes_repetidos"] += 1
+                relatorio["maiores_padroes"].append((quantidade, indices[grupo]))
+
+    mantidos = [par for par, fica in zip(pares, manter) if fica]
+    relatorio["pares_depois"] = len(mantidos)
+    relatorio["caracteres_antes"] = sum(len(par["input"]) + len(par["output"]) for par in pares)
+    relatorio["caracteres_depois"] = sum(len(par["input"]) + len(par["output"]) for par in mantidos)
+    relatorio["maiores_padroes"] = [
+        {"ocorrencias": quantidade, "input": pares[indice]["input"][:60], "output": pares[indice]["output"][:60]}
+        for quantidade, indice in sorted(relatorio["maiores_padroes"], reverse=True)[:5]
+    ]
+    return mantidos, relatorio
+
+def imprimir_relatorio(relatorio, limiar, max_por_padrao):
+    antes, depois = relatorio["pares_antes"], relatorio["pares_depois"]
+    if not antes:
+        return
+    print(f"Deduplicação (Jaccard >= {limiar}, até {max_por_padrao} por padrão):")
+    print(f"  - Pares: {antes} -> {depois} ({1 - depois / antes:.1%} a menos, "
+          f"{relatorio['padroes_repetidos']} padrões repetidos)")
+    print(f"  - Passos por época (lote {LOTE_EFETIVO_REFERENCIA}): "
+          f"{antes // LOTE_EFETIVO_REFERENCIA} -> {depois // LOTE_EFETIVO_REFERENCIA}")
+    caracteres_antes = relatorio["caracteres_antes"]
+    if caracteres_antes:
+        reducao = 1 - relatorio["caracteres_depois"] / caracteres_antes
+        print(f"  - Texto de treino: {reducao:.1%} menor (o tempo de treino cai na mesma proporção dos tokens)")
+    for padrao in relatorio["maiores_padroes"]:
+        print(f"    {padrao['ocorrencias']:>6}x  {padrao['input']!r} -> {padrao['output']!r}")
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Remove pares quase duplicados de um dataset JSONL ou Parquet (MinHash + LSH). "
+                    "O pre_processing.py já aplica esta etapa; use este script em datasets existentes.",
+        epilog="Exemplo: python deduplicacao.py dataset_final.jsonl --saida dataset_dedup.jsonl --limiar 0.8"
+    )
+    parser.add_argument("dataset")
+    parser.add_argument("--saida", default=None, help="Padrão: <dataset>_dedup, no formato do dataset (.jsonl ou .parquet).")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_SIMILARIDADE)
+    parser.add_argument("--max-por-padrao", type=int, default=MAX_POR_PADRAO)
+    parser.add_argument("--permutacoes", type=int, default=NUM_PERMUTACOES)
+    args = parser.parse_args()
+    args.dataset = resolver_caminho(args.dataset) # O .parquet de mesmo nome, se for o mais recente.
+
+    if not os.path.exists(args.dataset):
+        print(f"ERRO: Arquivo de dataset '{args.dataset}' não encontrado.")
+        sys.exit(1)
+    if not 0 < args.limiar <= 1 or args.max_por_padrao < 1:
+        print("ERRO: --limiar deve estar em (0, 1] e --max-por-padrao deve ser pelo menos 1.")
+        sys.exit(1)
+
+    instrumentacao.iniciar("deduplicacao")
+    pares = ler_pares(args.dataset)
+    inicio = time.perf_counter()
+    with instrumentacao.etapa("deduplicacao", unidade="pares", itens=len(pares)):
+        mantidos, relatorio = deduplicar(pares, args.limiar, args.max_por_padrao, args.permutacoes)
+    imprimir_relatorio(relatorio, args.limiar, args.max_por_padrao)
+    print(f"  - {relatorio['comparacoes']} comparações de assinatura em {time.perf_counter() - inicio:.2f}s "
+          f"(todos os pares seriam {len(pares) * (len(pares) - 1) // 2})")
+
+    base, extensao = os.path.splitext(args.dataset)
+    saida = args.saida or f"{base}_dedup{extensao}"
+    escrever_pares(saida, mantidos)
+    print(f"Dataset deduplicado salvo em '{saida}'.")
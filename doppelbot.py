@@ -1,104 +1,77 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
-from peft import PeftModel
-import readline
-import sys
-import os
-import re
-
-# --- Função para carregar o prompt de um arquivo ---
-def carregar_prompt_base(caminho_arquivo):
-    if not os.path.exists(caminho_arquivo):
-        print(f"ERRO: Arquivo de descrição '{caminho_arquivo}' não encontrado.")
-        sys.exit(1)
-    try:
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            return f.read()
-    except Exception as e:
-        print(f"ERRO: Falha ao ler o arquivo de descrição: {e}")
-        sys.exit(1)
-
-# --- Validação de Argumentos ---
-if len(sys.argv) != 2:
-    print("Uso: python testar_bot.py <caminho_para_o_arquivo_de_descricao>")
-    print("Exemplo: python testar_bot.py descricao.txt")
-    sys.exit(1)
-
-# --- Caminhos e Configurações ---
-caminho_descricao = sys.argv[1]
-base_model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
-adapters_path = "doppelbot-llama3-8b-instruct-adapters"
+"""
+Ponto de entrada único do Doppelbot.
 
-prompt_template = carregar_prompt_base(caminho_descricao)
+    python doppelbot.py <subcomando> [argumentos do subcomando]
+    python doppelbot.py preprocess --contexto 6
+    python doppelbot.py train --help
 
-# --- Carrega modelo com LoRA ---
-print("Carregando modelo e tokenizador...")
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_quant_type="nf4",
-    bnb_4bit_compute_dtype=torch.bfloat16
-)
-model = AutoModelForCausalLM.from_pretrained(
-    base_model_id,
-    quantization_config=bnb_config,
-    device_map="auto"
-)
+Cada subcomando executa o script da etapa correspondente, com os mesmos
+argumentos. Este arquivo só importa a biblioteca padrão. Os scripts, por sua
+vez, só importam torch, transformers, peft, sentence_transformers e
+matplotlib depois de validar os argumentos, dentro das funções que os usam.
+Assim, o --help e os erros de digitação respondem na hora.
 
-tokenizer = AutoTokenizer.from_pretrained(adapters_path)
-print("Ajustando vocabulário do modelo para corresponder aos adaptadores...")
-if "<|msg_sep|>" not in tokenizer.get_vocab():
-    tokenizer.add_special_tokens({'additional_special_tokens': ['<|msg_sep|>']})
-model.resize_token_embeddings(len(tokenizer))
-
-model = PeftModel.from_pretrained(model, adapters_path)
-model = model.eval()
-
-# --- Monta o prompt de sistema com base na categoria ---
-categoria = input("Com quem o Doppelbot está falando? (ex: amigo, interesse romântico...): ").strip()
-if not categoria:
-    categoria = "amigo"
-
-system_prompt = prompt_template.format(categoria=categoria)
-
-print("\n=== Gerador de Respostas Isoladas ===")
-print("(Digite 'sair' para encerrar)\n")
+A forma antiga `python doppelbot.py descricao.txt [...]` continua abrindo o chat.
+"""
+import argparse
+import difflib
+import os
+import runpy
+import sys
 
-while True:
-    user_input = input("Você: ").strip()
-    if user_input.lower() in ["sair", "exit", "quit"]:
-        break
+# --- SUBCOMANDOS ---
+PASTA_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+SUBCOMANDOS = {
+    "normalize": ("name_normalize.py", "Etapa 1: padroniza os nomes nas conversas exportadas."),
+    "preprocess": ("pre_processing.py", "Etapa 2: gera os pares input/output (dataset_final)."),
+    "instruct": ("add_instruction.py", "Etapa 3: aplica a persona e formata as conversas (dataset_instruct)."),
+    "train": ("fine_tuning.py", "Etapa 4: fine-tuning QLoRA."),
+    "chat": ("chat.py", "Chat interativo com o Doppelbot."),
+    "eval": ("avaliar_personalidade.py", "Respostas do Doppelbot às perguntas de teste."),
+    "eval-baseline": ("avaliar_baseline.py", "Respostas do modelo base às perguntas de teste."),
+    "analyze": ("analise_quantitativa.py", "Métricas e similaridade: respostas humanas vs. Doppelbot."),
+    "tokens": ("analisys.py", "Distribuição do comprimento em tokens do dataset_instruct."),
+    "profile": ("perfil_estilometrico.py", "Perfil estilométrico do dataset e comparação com o bot."),
+    "bigfive": ("analise_big_five.py", "Relatório da análise Big Five."),
+    "plots": ("gerar_graficos.py", "Gráficos da análise Big Five."),
+    "pipeline": ("pipeline.py", "Pipeline completo e incremental."),
+}
 
-    # O histórico é criado do zero a cada pergunta
-    conversa_atual = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_input}
-    ]
+def criar_parser():
+    largura = max(len(nome) for nome in SUBCOMANDOS)
+    lista = "\n".join(f"  {nome:<{largura}}  {descricao}" for nome, (_, descricao) in SUBCOMANDOS.items())
+    parser = argparse.ArgumentParser(
+        prog="doppelbot.py",
+        description="Doppelbot: preparação dos dados, treino, chat e avaliação.",
+        epilog=f"subcomandos:\n{lista}\n\n'python doppelbot.py <subcomando> --help' mostra as opções de cada um.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("subcomando", help="Um dos subcomandos abaixo (ou o arquivo de descrição, para o chat).")
+    parser.add_argument("argumentos", nargs=argparse.REMAINDER, help="Argumentos repassados ao subcomando.")
+    return parser
 
-    # Usa o 'apply_chat_template' apenas com a conversa atual, sem histórico
-    input_ids = tokenizer.apply_chat_template(
-        conversa_atual,
-        add_generation_prompt=True,
-        return_tensors="pt"
-    ).to(model.device)
+def resolver_subcomando(nome, argumentos):
+    """(script, argumentos) do subcomando; um arquivo existente no lugar do nome abre o chat (uso antigo)."""
+    if nome in SUBCOMANDOS:
+        return SUBCOMANDOS[nome][0], argumentos
+    if os.path.isfile(nome):
+        return SUBCOMANDOS["chat"][0], [nome, *argumentos]
+    sugestoes = difflib.get_close_matches(nome, SUBCOMANDOS, n=1)
+    print(f"ERRO: Subcomando '{nome}' desconhecido." + (f" Você quis dizer '{sugestoes[0]}'?" if sugestoes else ""))
+    print(f"Subcomandos: {', '.join(SUBCOMANDOS)}.")
+    sys.exit(1)
 
-    # Gera a resposta
-    with torch.no_grad():
-        outputs = model.generate(
-                input_ids,
-                max_new_tokens=150,
-                do_sample=True,
-                temperature=0.3,
-                top_p=0.9,
-                top_k=50,
-                repetition_penalty=1.25,
-                no_repeat_ngram_size=3,
-                eos_token_id=[tokenizer.eos_token_id, tokenizer.convert_tokens_to_ids("<|eot_id|>")],
-                pad_token_id=tokenizer.eos_token_id
-            )
+def executar(script, argumentos):
+    """Roda o script como se fosse chamado direto (`python script ...`), no mesmo processo."""
+    caminho = os.path.join(PASTA_SCRIPTS, script)
+    sys.argv = [caminho, *argumentos]
+    runpy.run_path(caminho, run_name="__main__")
 
-    # Decodifica apenas a parte nova da resposta
-    resposta_ids = outputs[0][input_ids.shape[-1]:]
-    resposta_bruta = tokenizer.decode(resposta_ids, skip_special_tokens=True).strip()
-    resposta_formatada = re.sub(r'\n{2,}', '\n\n', resposta_bruta)
-    
-    print(f"Doppelbot:\n{resposta_formatada}\n")
\ No newline at end of file
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = criar_parser()
+    if len(sys.argv) < 2:
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+    executar(*resolver_subcomando(args.subcomando, args.argumentos))
@@ -1,19 +1,41 @@
-import torch
-from datasets import load_dataset
-from transformers import (
-    AutoModelForCausalLM,
-    AutoTokenizer,
-    BitsAndBytesConfig,
-)
-from peft import LoraConfig
-from trl import SFTTrainer, SFTConfig
+import argparse
 import os
 import json
+import time
+
+import instrumentacao
+from add_instruction import MAX_TOKENS_EXEMPLO, comprimentos_tokens, formatar_conversa_para_treino
+from formato_dados import formato, iterar_conversas, resolver_caminho
 
 # --- 1. Configurações ---
 MODELO_BASE = "meta-llama/Meta-Llama-3-8B-Instruct"
-NOME_DATASET = "dataset_instruct.jsonl"
+NOME_DATASET = resolver_caminho("dataset_instruct.jsonl") # Ou o .parquet, se for o mais recente.
+NOME_DATASET_VALIDACAO = resolver_caminho("dataset_instruct_validacao.jsonl")
 NOME_NOVO_MODELO = "doppelbot-llama3-8b-instruct-adapters"
+MAX_SEQ_LENGTH = MAX_TOKENS_EXEMPLO # O add_instruction.py já ajusta os exemplos a esse orçamento.
+
+parser = argparse.ArgumentParser(description="Fine-tuning QLoRA do Doppelbot.")
+parser.add_argument("--lote-efetivo", type=int, default=8,
+                    help="Exemplos por passo do otimizador (micro-lote x acúmulo de gradiente).")
+parser.add_argument("--autoajuste", action="store_true",
+                    help="Sonda micro-lotes e gradient checkpointing e usa a configuração mais rápida que cabe na memória.")
+parser.add_argument("--orcamento-mb", type=float, default=None,
+                    help="Memória disponível para o autoajuste (padrão: 90%% da memória da GPU).")
+parser.add_argument("--epocas", type=float, default=1, help="Limite de épocas (a parada antecipada pode encerrar antes).")
+parser.add_argument("--passos-avaliacao", type=int, default=50,
+                    help="Intervalo, em passos do otimizador, entre avaliações na validação.")
+parser.add_argument("--max-exemplos-validacao", type=int, default=256,
+                    help="Subamostra da validação usada em cada avaliação (0 = todos).")
+parser.add_argument("--paciencia", type=int, default=3,
+                    help="Avaliações seguidas sem melhora da loss de validação antes de parar.")
+parser.add_argument("--checkpoints-mantidos", type=int, default=2,
+                    help="Checkpoints mantidos em ./results durante o treino com validação; os mais antigos são "
+                         "apagados (além deles, o melhor é sempre mantido). 0 = mantém todos. O chat com "
+                         "--observar-checkpoints copia cada checkpoint antes de ler, mas um limite baixo com "
+                         "--passos-avaliacao curtos pode apagar um checkpoint antes de ele ser notado.")
+args = parser.parse_args()
+
+instrumentacao.iniciar("fine_tuning")
 
 # --- Validação de Arquivo ---
 if not os.path.exists(NOME_DATASET):
@@ -22,6 +44,19 @@ if not os.path.exists(NOME_DATASET):
         "Execute as etapas anteriores do pipeline primeiro."
     )
 
+# Bibliotecas pesadas só depois dos argumentos e do dataset: erros de uso e o --help saem na hora.
+import torch
+from datasets import Dataset, load_dataset
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+    EarlyStoppingCallback,
+    TrainerCallback,
+)
+from peft import LoraConfig
+from trl import SFTTrainer, SFTConfig
+
 # --- 2. Configuração de Quantização (QLoRA) ---
 bnb_config = BitsAndBytesConfig(
     load_in_4bit=True,
@@ -32,11 +67,12 @@ bnb_config = BitsAndBytesConfig(
 
 # --- 3. Carregamento do Modelo e Tokenizador ---
 print(f"Carregando modelo base: {MODELO_BASE}")
-model = AutoModelForCausalLM.from_pretrained(
-    MODELO_BASE,
-    quantization_config=bnb_config,
-    device_map="auto"
-)
+with instrumentacao.etapa("carregamento_modelo"):
+    model = AutoModelForCausalLM.from_pretrained(
+        MODELO_BASE,
+        quantization_config=bnb_config,
+        device_map="auto"
+    )
 model.config.use_cache = False
 model.config.pretraining_tp = 1
 
@@ -57,30 +93,109 @@ peft_config = LoraConfig(
     ],
 )
 
+# --- 4.1 Autoajuste do Lote (opcional) ---
+# Padrão histórico: micro-lote 1 com acúmulo até o lote efetivo, sem checkpointing.
+configuracao_lote = {
+    "per_device_train_batch_size": 1,
+    "gradient_accumulation_steps": args.lote_efetivo,
+    "gradient_checkpointing": False,
+}
+if args.autoajuste:
+    from peft import get_peft_model
+    from autoajuste_lote import escolher_configuracao
+
+    orcamento_mb = args.orcamento_mb
+    if orcamento_mb is None:
+        if not torch.cuda.is_available():
+            raise ValueError("ERRO: Sem GPU, informe --orcamento-mb para o autoajuste.")
+        orcamento_mb = 0.9 * torch.cuda.get_device_properties(0).total_memory / (1024 * 1024)
+
+    print(f"Autoajuste do lote com orçamento de {orcamento_mb:.0f} MB...")
+    with instrumentacao.etapa("autoajuste_lote"):
+        comprimentos = comprimentos_tokens(NOME_DATASET, tokenizer)
+        # Os adaptadores da sondagem são removidos depois; o SFTTrainer cria os definitivos.
+        modelo_sondagem = get_peft_model(model, peft_config)
+        melhor, _ = escolher_configuracao(modelo_sondagem, comprimentos, orcamento_mb, args.lote_efetivo,
+                                          MAX_SEQ_LENGTH, pad_id=tokenizer.pad_token_id)
+        model = modelo_sondagem.unload()
+
+    if melhor is None:
+        print("AVISO: Nenhuma configuração coube no orçamento; mantendo a configuração padrão.")
+    else:
+        configuracao_lote = {chave: melhor[chave] for chave in configuracao_lote}
+print(f"Lote: micro-lote {configuracao_lote['per_device_train_batch_size']} x acúmulo "
+      f"{configuracao_lote['gradient_accumulation_steps']}, gradient checkpointing "
+      f"{'ativado' if configuracao_lote['gradient_checkpointing'] else 'desativado'}.")
+
 # --- 5. Carregamento e Processamento do Dataset ---
 print(f"Carregando e processando dataset: {NOME_DATASET}")
-dataset = load_dataset("text", data_files={"train": NOME_DATASET}, split="train")
 
 def formatar_para_chat(linha):
     conversa = json.loads(linha["text"])
-    mensagens_formatadas = ""
-    for msg in conversa:
-        if msg["role"] == "user":
-            mensagens_formatadas += f"<|user|>\n{msg['content']}\n"
-        elif msg["role"] == "assistant":
-            mensagens_formatadas += f"<|assistant|>\n{msg['content']}\n"
-        else:
-            mensagens_formatadas += f"<|{msg['role']}|>\n{msg['content']}\n"
-    return {"messages": mensagens_formatadas.strip()}
-
-dataset = dataset.map(formatar_para_chat, remove_columns=["text"])
+    return {"messages": formatar_conversa_para_treino(conversa)}
+
+def carregar_dataset(caminho, divisao):
+    """Dataset com a coluna "messages" (texto de treino) a partir do JSONL ou do Parquet da Etapa 3."""
+    if formato(caminho) == "parquet":
+        return Dataset.from_dict({"messages": [formatar_conversa_para_treino(c) for c in iterar_conversas(caminho)]})
+    dataset = load_dataset("text", data_files={divisao: caminho}, split=divisao)
+    return dataset.map(formatar_para_chat, remove_columns=["text"])
+
+with instrumentacao.etapa("preparacao_dataset", unidade="exemplos") as registro:
+    dataset = carregar_dataset(NOME_DATASET, "train")
+    registro["itens"] = len(dataset)
+
+# Validação: separada na Etapa 2 e formatada na Etapa 3. Só a loss é calculada (sem geração).
+dataset_validacao = None
+if os.path.exists(NOME_DATASET_VALIDACAO):
+    dataset_validacao = carregar_dataset(NOME_DATASET_VALIDACAO, "validation")
+    if 0 < args.max_exemplos_validacao < len(dataset_validacao):
+        dataset_validacao = dataset_validacao.shuffle(seed=42).select(range(args.max_exemplos_validacao))
+    print(f"Validação: {len(dataset_validacao)} exemplos a cada {args.passos_avaliacao} passos "
+          f"(paciência de {args.paciencia} avaliações).")
+else:
+    print(f"AVISO: '{NOME_DATASET_VALIDACAO}' não encontrado; treinando sem validação nem parada antecipada.")
+
+if dataset_validacao is not None:
+    # O melhor checkpoint pela loss de validação é recarregado no fim e vira o adaptador salvo.
+    configuracao_avaliacao = dict(
+        eval_strategy="steps",
+        eval_steps=args.passos_avaliacao,
+        per_device_eval_batch_size=8,
+        prediction_loss_only=True,
+        save_steps=args.passos_avaliacao,
+        save_total_limit=args.checkpoints_mantidos or None,
+        load_best_model_at_end=True,
+        metric_for_best_model="eval_loss",
+        greater_is_better=False,
+    )
+else:
+    configuracao_avaliacao = dict(save_steps=500)
+
+class RelatorioParadaAntecipada(TrainerCallback):
+    """Mede quantos passos e quanto tempo a parada antecipada poupou em relação ao limite de épocas."""
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.inicio = time.perf_counter()
+
+    def on_train_end(self, args, state, control, **kwargs):
+        duracao = time.perf_counter() - self.inicio
+        passos_poupados = max(0, state.max_steps - state.global_step)
+        print("-" * 50)
+        print(f"Passos executados: {state.global_step} de {state.max_steps} previstos.")
+        if passos_poupados and state.global_step:
+            segundos_por_passo = duracao / state.global_step
+            print(f"Parada antecipada poupou {passos_poupados} passos "
+                  f"(~{passos_poupados * segundos_por_passo / 60:.1f} min a {segundos_por_passo:.2f}s/passo).")
+        if state.best_model_checkpoint:
+            print(f"Melhor loss de validação: {state.best_metric:.4f} em '{state.best_model_checkpoint}'.")
+        print("-" * 50)
 
 # --- 6. Configuração do SFT (substitui TrainingArguments) ---
 sft_config = SFTConfig(
     output_dir="./results",
-    num_train_epochs=1,
-    per_device_train_batch_size=1,
-    gradient_accumulation_steps=8,
+    num_train_epochs=args.epocas,
+    **configuracao_lote,
     optim="paged_adamw_32bit",
     learning_rate=2e-5,
     weight_decay=0.001,
@@ -92,10 +207,10 @@ sft_config = SFTConfig(
     lr_scheduler_type="cosine", # <-- MUDANÇA 2: Scheduler mais eficaz para convergência.
     report_to=None,
     dataset_text_field="messages",
-    max_seq_length=512,
+    max_seq_length=MAX_SEQ_LENGTH,
     packing=False,
-    save_steps=500,
     logging_steps=10,
+    **configuracao_avaliacao,
 )
 
 
@@ -103,17 +218,23 @@ sft_config = SFTConfig(
 trainer = SFTTrainer(
     model=model,
     train_dataset=dataset,
+    eval_dataset=dataset_validacao,
     peft_config=peft_config,
     args=sft_config,
+    callbacks=[RelatorioParadaAntecipada()] + (
+        [EarlyStoppingCallback(early_stopping_patience=args.paciencia)] if dataset_validacao is not None else []
+    ),
 )
 
 # --- 8. Iniciar Treinamento ---
 print("Iniciando o processo de fine-tuning com QLoRA...")
-trainer.train()
+with instrumentacao.etapa("treino", unidade="exemplos", itens=len(dataset) * sft_config.num_train_epochs):
+    trainer.train()
 print("Fine-tuning concluído!")
 
 # --- 9. Salvar os Adaptadores Treinados ---
 print(f"Salvando adaptadores do modelo em '{NOME_NOVO_MODELO}'...")
-trainer.save_model(NOME_NOVO_MODELO)
-tokenizer.save_pretrained(NOME_NOVO_MODELO)
+with instrumentacao.etapa("salvamento"):
+    trainer.save_model(NOME_NOVO_MODELO)
+    tokenizer.save_pretrained(NOME_NOVO_MODELO)
 print("Processo finalizado com sucesso!")
\ No newline at end of file
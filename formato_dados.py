@@ -0,0 +1,142 @@
+"""
+Leitura e escrita dos datasets entre as etapas, em JSONL ou Parquet.
+
+O formato é escolhido pela extensão do arquivo:
+
+  - .jsonl:   um objeto JSON por linha (o formato de sempre).
+  - .parquet: colunar com compressão zstd. `categoria` e o prompt de sistema
+              são colunas de dicionário (cada valor distinto é gravado uma vez,
+              e não uma vez por exemplo), e a leitura pode trazer só as
+              colunas pedidas.
+
+Dois tipos de dataset passam entre as etapas:
+
+  - pares (Etapa 2, dataset_final): {"input", "output", "categoria"[, "mensagens"]}
+  - conversas (Etapa 3, dataset_instruct): listas de mensagens {"role", "content"};
+    no Parquet o prompt de sistema vai para a coluna `sistema` e o resto para `mensagens`.
+
+Quando o caminho pedido não existe, `resolver_caminho` procura o mesmo nome
+com a outra extensão: as etapas seguintes encontram o dataset em qualquer formato.
+"""
+import json
+import os
+
+# --- CONFIGURAÇÕES ---
+EXTENSOES = {".jsonl": "jsonl", ".parquet": "parquet"}
+COMPRESSAO_PARQUET = "zstd"
+NIVEL_COMPRESSAO = 6
+LINHAS_POR_GRUPO = 10000
+COLUNAS_DICIONARIO = ("categoria", "sistema")
+
+def formato(caminho):
+    return EXTENSOES.get(os.path.splitext(caminho)[1].lower(), "jsonl")
+
+def com_formato(caminho, nome_formato):
+    """O mesmo caminho com a extensão do formato pedido ('jsonl' ou 'parquet')."""
+    return f"{os.path.splitext(caminho)[0]}.{nome_formato}"
+
+def resolver_caminho(caminho):
+    """
+    O caminho existente entre as variantes .jsonl/.parquet do nome pedido; se
+    as duas existirem, a mais recente. Sem nenhuma, devolve o caminho pedido.
+    """
+    existentes = [com_formato(caminho, nome) for nome in EXTENSOES.values()
+                  if os.path.exists(com_formato(caminho, nome))]
+    if not existentes:
+        return caminho
+    return max(existentes, key=lambda c: os.stat(c).st_mtime_ns)
+
+# --- Parquet ---
+
+def _tabela(registros):
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pylist(registros)
+    for coluna in COLUNAS_DICIONARIO:
+        if coluna in tabela.column_names and pa.types.is_string(tabela.schema.field(coluna).type):
+            indice = tabela.column_names.index(coluna)
+            tabela = tabela.set_column(indice, coluna, tabela.column(coluna).dictionary_encode())
+    return tabela
+
+def _escrever_parquet(caminho, registros):
+    import pyarrow.parquet as pq
+
+    pq.write_table(_tabela(registros), caminho, compression=COMPRESSAO_PARQUET,
+                   compression_level=NIVEL_COMPRESSAO, row_group_size=LINHAS_POR_GRUPO)
+
+def _iterar_parquet(caminho, colunas, omitir_nulos=False):
+    import pyarrow.parquet as pq
+
+    arquivo = pq.ParquetFile(caminho)
+    if colunas is not None:
+        colunas = [c for c in colunas if c in arquivo.schema_arrow.names]
+    for lote in arquivo.iter_batches(batch_size=LINHAS_POR_GRUPO, columns=colunas):
+        for registro in lote.to_pylist():
+            # Campos opcionais (ex: "mensagens" fora do modo de contexto) somem, como no JSONL.
+            yield {k: v for k, v in registro.items() if v is not None} if omitir_nulos else registro
+
+# --- JSONL ---
+
+def _escrever_jsonl(caminho, registros):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+def _iterar_jsonl(caminho, colunas):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                print(f"AVISO: Pulando linha mal formatada: {linha.strip()}")
+                continue
+            if colunas is not None and isinstance(registro, dict):
+                registro = {c: registro[c] for c in colunas if c in registro}
+            yield registro
+
+# --- Pares (dataset_final / dataset_validacao) ---
+
+def escrever_pares(caminho, pares):
+    """Grava os pares no formato da extensão de `caminho`."""
+    if formato(caminho) == "parquet":
+        _escrever_parquet(caminho, pares)
+    else:
+        _escrever_jsonl(caminho, pares)
+
+def iterar_pares(caminho, colunas=None):
+    """
+    Gera os pares um a um. Com `colunas`, só esses campos são lidos (no
+    Parquet as outras colunas nem saem do disco).
+    """
+    if formato(caminho) == "parquet":
+        return _iterar_parquet(caminho, colunas, omitir_nulos=True)
+    return _iterar_jsonl(caminho, colunas)
+
+def ler_pares(caminho, colunas=None):
+    return list(iterar_pares(caminho, colunas))
+
+# --- Conversas (dataset_instruct) ---
+
+def escrever_conversas(caminho, conversas):
+    """Grava as conversas formatadas; no Parquet o prompt de sistema fica em uma coluna de dicionário."""
+    if formato(caminho) != "parquet":
+        _escrever_jsonl(caminho, conversas)
+        return
+    registros = []
+    for conversa in conversas:
+        sistema = conversa[0]["content"] if conversa and conversa[0]["role"] == "system" else None
+        registros.append({"sistema": sistema, "mensagens": conversa[1:] if sistema is not None else conversa})
+    _escrever_parquet(caminho, registros)
+
+def iterar_conversas(caminho):
+    if formato(caminho) != "parquet":
+        yield from _iterar_jsonl(caminho, None)
+        return
+    for registro in _iterar_parquet(caminho, None):
+        sistema = [{"role": "system", "content": registro["sistema"]}] if registro["sistema"] is not None else []
+        yield sistema + registro["mensagens"]
+
+def ler_conversas(caminho):
+    return list(iterar_conversas(caminho))
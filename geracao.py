@@ -0,0 +1,140 @@
+import re
+
+import instrumentacao
+
+# --- HIPERPARÂMETROS DE AMOSTRAGEM ---
+# Os mesmos valores são usados pelo chat e pelos scripts de avaliação para
+# manter as comparações justas.
+PARAMETROS_AMOSTRAGEM = {
+    "do_sample": True,
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "top_k": 50,
+    "repetition_penalty": 1.25,
+    "no_repeat_ngram_size": 3,
+}
+
+MODOS_ESPECULACAO = ["ngram", "rascunho"]
+
+def ids_de_parada(tokenizer):
+    """Retorna os tokens que encerram a resposta do assistente no Llama 3."""
+    return [tokenizer.eos_token_id, tokenizer.convert_tokens_to_ids("<|eot_id|>")]
+
+def adicionar_argumentos_especulacao(parser):
+    """Registra no argparse as opções de decodificação especulativa."""
+    parser.add_argument("--especulacao", choices=MODOS_ESPECULACAO, default=None,
+                        help="Ativa a decodificação especulativa (ngram: histórico do usuário; rascunho: modelo pequeno).")
+    parser.add_argument("--modelo-rascunho", default="meta-llama/Llama-3.2-1B-Instruct",
+                        help="Modelo de rascunho usado no modo 'rascunho'.")
+    parser.add_argument("--historico", default="dataset_final.jsonl",
+                        help="Dataset com as mensagens reais do usuário, usado no modo 'ngram' (ou o .parquet de mesmo nome).")
+    parser.add_argument("--tokens-rascunho", type=int, default=5,
+                        help="Quantidade de tokens propostos por passo de verificação.")
+
+def criar_especulador(args, model, tokenizer):
+    """Cria o especulador escolhido na linha de comando (ou None se desativado)."""
+    if args.especulacao is None:
+        return None
+
+    # Importação tardia: o módulo só é necessário quando a especulação está ativa.
+    from decodificacao_especulativa import EspeculadorNgram, EspeculadorRascunho, IndiceNgram
+
+    if args.especulacao == "ngram":
+        print(f"Construindo índice de n-gramas a partir de '{args.historico}'...")
+        indice = IndiceNgram.de_dataset(args.historico, tokenizer)
+        print(f"Índice pronto com {len(indice)} n-gramas.")
+        return EspeculadorNgram(indice, args.tokens_rascunho)
+
+    print(f"Carregando modelo de rascunho '{args.modelo_rascunho}'...")
+    return EspeculadorRascunho.carregar(args.modelo_rascunho, tokenizer, args.tokens_rascunho,
+                                        cpu=model.device.type == "cpu")
+
+def gerar_ids(model, tokenizer, input_ids, max_new_tokens, especulador=None):
+    """Gera a continuação de `input_ids` com os parâmetros padrão do projeto."""
+    import torch
+
+    with instrumentacao.etapa("geracao", unidade="tokens") as registro:
+        if especulador is not None:
+            outputs = especulador.gerar(model, input_ids, max_new_tokens, ids_de_parada(tokenizer))
+        else:
+            with torch.no_grad():
+                outputs = model.generate(
+                    input_ids,
+                    max_new_tokens=max_new_tokens,
+                    eos_token_id=ids_de_parada(tokenizer),
+                    pad_token_id=tokenizer.eos_token_id,
+                    **PARAMETROS_AMOSTRAGEM
+                )
+        registro["itens"] = outputs.shape[-1] - input_ids.shape[-1]
+    return outputs
+
+def _contar_tokens_resposta(tokenizer, respostas_ids):
+    return [int(n) for n in (respostas_ids != tokenizer.eos_token_id).sum(dim=-1)]
+
+def gerar_resposta(model, tokenizer, conversa, max_new_tokens, especulador=None, contagens=None):
+    """
+    Aplica o template de chat, gera e decodifica apenas a parte nova da resposta.
+    Se `contagens` (dict) for passado, acumula nele os tokens do prompt e da resposta.
+    """
+    input_ids = tokenizer.apply_chat_template(
+        conversa,
+        add_generation_prompt=True,
+        return_tensors="pt",
+        return_dict=False # Só os ids: a partir do transformers 5 o padrão é devolver um dicionário.
+    ).to(model.device)
+
+    outputs = gerar_ids(model, tokenizer, input_ids, max_new_tokens, especulador)
+
+    resposta_ids = outputs[0][input_ids.shape[-1]:]
+    if contagens is not None:
+        contagens["tokens_prompt"] = input_ids.shape[-1]
+        contagens.setdefault("tokens_resposta", []).extend(_contar_tokens_resposta(tokenizer, resposta_ids[None]))
+    return tokenizer.decode(resposta_ids, skip_special_tokens=True).strip()
+
+def gerar_amostras(model, tokenizer, conversa, max_new_tokens, num_amostras=1, especulador=None, contagens=None):
+    """
+    Gera `num_amostras` respostas independentes para a mesma conversa. O prompt
+    passa pelo modelo uma única vez: o KV cache do prefill é replicado para as
+    K linhas do lote e só a decodificação é feita em paralelo. Com especulação,
+    as amostras são geradas em sequência (os especuladores trabalham com lote 1).
+    `contagens` funciona como no `gerar_resposta` (uma contagem por amostra).
+    """
+    if num_amostras == 1 or especulador is not None:
+        return [gerar_resposta(model, tokenizer, conversa, max_new_tokens, especulador, contagens)
+                for _ in range(num_amostras)]
+
+    import torch
+    from transformers import DynamicCache
+
+    input_ids = tokenizer.apply_chat_template(
+        conversa,
+        add_generation_prompt=True,
+        return_tensors="pt",
+        return_dict=False # Só os ids: a partir do transformers 5 o padrão é devolver um dicionário.
+    ).to(model.device)
+
+    with instrumentacao.etapa("geracao", unidade="tokens") as registro, torch.no_grad():
+        # Prefill de todos os tokens menos o último, que o generate usa para iniciar a decodificação.
+        cache = DynamicCache()
+        model(input_ids[:, :-1], past_key_values=cache, use_cache=True)
+        cache.batch_repeat_interleave(num_amostras)
+        outputs = model.generate(
+            input_ids.repeat(num_amostras, 1),
+            attention_mask=torch.ones((num_amostras, input_ids.shape[-1]), dtype=torch.long, device=model.device),
+            past_key_values=cache,
+            max_new_tokens=max_new_tokens,
+            eos_token_id=ids_de_parada(tokenizer),
+            pad_token_id=tokenizer.eos_token_id,
+            **PARAMETROS_AMOSTRAGEM
+        )
+        respostas_ids = outputs[:, input_ids.shape[-1]:]
+        registro["itens"] = int((respostas_ids != tokenizer.eos_token_id).sum())
+    if contagens is not None:
+        contagens["tokens_prompt"] = input_ids.shape[-1]
+        contagens.setdefault("tokens_resposta", []).extend(_contar_tokens_resposta(tokenizer, respostas_ids))
+
+    return [tokenizer.decode(ids, skip_special_tokens=True).strip() for ids in respostas_ids]
+
+def formatar_resposta(resposta_bruta):
+    """Normaliza quebras de linha excessivas para exibição no terminal."""
+    return re.sub(r'\n{2,}', '\n\n', resposta_bruta)
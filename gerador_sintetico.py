@@ -0,0 +1,150 @@
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from name_normalize import PREFIXO_NOME_ARQUIVO
+
+# --- VOCABULÁRIO SINTÉTICO ---
+# Nada aqui vem de conversas reais: o corpus é gerado apenas para testes e benchmarks.
+PALAVRAS = (
+    "oi tudo bem e vc sim nao talvez hoje amanha ontem agora depois cedo tarde noite "
+    "bora vamos sair comer pizza cinema praia trabalho reuniao prova aula faculdade "
+    "que isso kkkk kkkkkk hahaha blz beleza valeu tmj show top massa demais nossa "
+    "cara mano vei tipo entao ne pq porque quando onde quem como ta to tava vou vai "
+    "acho que sei la certeza claro obrigado de nada falou abraço bjs saudade"
+).split()
+EMOJIS = ["😂", "👍", "❤️", "🙏", "😅", "🔥", "😍", "🤔", "😭", "🎉"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Felipe", "Gabi", "Henrique", "Isa", "João",
+         "Karen", "Lucas", "Marina", "Nico", "Olga", "Paulo", "Rafa", "Sofia", "Tiago", "Vera"]
+MARCADORES = ["<Mídia oculta>", "<Mensagem editada>"]
+DESCARTES = ["Mensagem apagada", "Ligação de voz perdida", "documento.pdf (arquivo anexado)"]
+
+# Probabilidades de cada tipo de conteúdo em uma mensagem.
+PROB_EMOJI = 0.2
+PROB_MULTILINHA = 0.1
+PROB_MIDIA = 0.05
+PROB_DESCARTE = 0.02
+PROB_LINK = 0.03
+PROB_META_AI = 0.01
+PROB_TROCA_AUTOR = 0.55
+PROB_PAUSA_LONGA = 0.03
+
+def _frase(rng, min_palavras=1, max_palavras=12):
+    texto = " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(min_palavras, max_palavras)))
+    if rng.random() < PROB_EMOJI:
+        texto += " " + "".join(rng.choice(EMOJIS) for _ in range(rng.randint(1, 3)))
+    return texto
+
+def _texto_mensagem(rng):
+    sorteio = rng.random()
+    if sorteio < PROB_MIDIA:
+        return rng.choice(MARCADORES)
+    sorteio -= PROB_MIDIA
+    if sorteio < PROB_DESCARTE:
+        return rng.choice(DESCARTES)
+    sorteio -= PROB_DESCARTE
+    if sorteio < PROB_LINK:
+        return f"{_frase(rng)} https://exemplo.com/{rng.randint(1000, 9999)}"
+    if rng.random() < PROB_MULTILINHA:
+        return "\n".join(_frase(rng) for _ in range(rng.randint(2, 4)))
+    return _frase(rng)
+
+def _cabecalho(rng, momento):
+    # O WhatsApp exporta com ou sem vírgula entre data e hora, dependendo da versão.
+    separador = ", " if rng.random() < 0.5 else " "
+    return f"{momento:%d/%m/%Y}{separador}{momento:%H:%M} - "
+
+def gerar_conversa(rng, meu_nome, outro_nome, num_mensagens, inicio):
+    """Gera o texto de uma exportação de conversa com `num_mensagens` mensagens."""
+    linhas = []
+    momento = inicio
+    autor = rng.choice([meu_nome, outro_nome])
+    geradas = 0
+    while geradas < num_mensagens:
+        if rng.random() < PROB_PAUSA_LONGA:
+            momento += timedelta(hours=rng.randint(6, 48))
+        else:
+            momento += timedelta(minutes=rng.randint(0, 30))
+        if rng.random() < PROB_TROCA_AUTOR:
+            autor = outro_nome if autor == meu_nome else meu_nome
+
+        # Interação com a Meta AI: menção pelo usuário seguida da resposta do outro lado.
+        if autor == meu_nome and rng.random() < PROB_META_AI:
+            linhas.append(f"{_cabecalho(rng, momento)}{meu_nome}: @{rng.randint(10**11, 10**12 - 1)} {_frase(rng)}")
+            linhas.append(f"{_cabecalho(rng, momento)}{outro_nome}: {_frase(rng, 5, 20)}")
+            autor = meu_nome
+            geradas += 2
+            continue
+
+        linhas.append(f"{_cabecalho(rng, momento)}{autor}: {_texto_mensagem(rng)}")
+        geradas += 1
+    return "\n".join(linhas) + "\n"
+
+def gerar_conversa_grupo(rng, meu_nome, participantes, num_mensagens, inicio):
+    """Gera a exportação de um grupo: a cada troca de autor fala MeuNome ou outro participante qualquer."""
+    linhas = []
+    momento = inicio
+    autor = rng.choice(participantes)
+    for _ in range(num_mensagens):
+        if rng.random() < PROB_PAUSA_LONGA:
+            momento += timedelta(hours=rng.randint(6, 48))
+        else:
+            momento += timedelta(minutes=rng.randint(0, 10))
+        if rng.random() < PROB_TROCA_AUTOR:
+            autor = meu_nome if autor != meu_nome and rng.random() < 0.3 else rng.choice(participantes)
+        linhas.append(f"{_cabecalho(rng, momento)}{autor}: {_texto_mensagem(rng)}")
+    return "\n".join(linhas) + "\n"
+
+def gerar_corpus(pasta_saida, meu_nome="Fulano de Tal", categorias=("Amigo", "Trabalho"),
+                 arquivos_por_categoria=2, mensagens_por_arquivo=500, semente=42,
+                 grupos_por_categoria=0, participantes_por_grupo=20):
+    """
+    Cria uma estrutura igual à de 'conversas_originais/': uma subpasta por
+    categoria com arquivos 'Conversa do WhatsApp com <Nome>.txt' e, opcionalmente,
+    `grupos_por_categoria` conversas em grupo. O resultado é determinístico para
+    a mesma semente. Retorna a lista de arquivos criados.
+    """
+    rng = random.Random(semente)
+    criados = []
+    inicio = datetime(2023, 1, 1, 8, 0)
+    for categoria in categorias:
+        pasta_categoria = os.path.join(pasta_saida, categoria)
+        os.makedirs(pasta_categoria, exist_ok=True)
+        for i in range(arquivos_por_categoria):
+            outro_nome = f"{NOMES[i % len(NOMES)]} {categoria} {i // len(NOMES) + 1}"
+            conteudo = gerar_conversa(rng, meu_nome, outro_nome, mensagens_por_arquivo, inicio)
+            caminho = os.path.join(pasta_categoria, f"{PREFIXO_NOME_ARQUIVO}{outro_nome}.txt")
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+            criados.append(caminho)
+        for i in range(grupos_por_categoria):
+            nome_grupo = f"Grupo {categoria} {i + 1}"
+            participantes = [f"{NOMES[j % len(NOMES)]} {j // len(NOMES) + 1}" for j in range(participantes_por_grupo)]
+            conteudo = gerar_conversa_grupo(rng, meu_nome, participantes, mensagens_por_arquivo, inicio)
+            caminho = os.path.join(pasta_categoria, f"{PREFIXO_NOME_ARQUIVO}{nome_grupo}.txt")
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+            criados.append(caminho)
+    return criados
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gera exportações sintéticas do WhatsApp para testes e benchmarks do pipeline.",
+        epilog="Exemplo: python gerador_sintetico.py conversas_sinteticas --arquivos 5 --mensagens 20000"
+    )
+    parser.add_argument("pasta_saida")
+    parser.add_argument("--meu-nome", default="Fulano de Tal")
+    parser.add_argument("--categorias", nargs="+", default=["Amigo", "Trabalho"])
+    parser.add_argument("--arquivos", type=int, default=2, help="Arquivos por categoria.")
+    parser.add_argument("--mensagens", type=int, default=500, help="Mensagens por arquivo.")
+    parser.add_argument("--grupos", type=int, default=0, help="Conversas em grupo por categoria.")
+    parser.add_argument("--participantes", type=int, default=20, help="Participantes em cada grupo (além de você).")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    arquivos = gerar_corpus(args.pasta_saida, args.meu_nome, args.categorias, args.arquivos, args.mensagens, args.semente,
+                            args.grupos, args.participantes)
+    print(f"{len(arquivos)} arquivos sintéticos criados em '{args.pasta_saida}'.")
+    print(f"Para processá-los: python name_normalize.py \"{args.meu_nome}\" \"{args.pasta_saida}\"")
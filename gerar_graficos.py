@@ -1,60 +1,57 @@
+import argparse
+import hashlib
+import json
 import os
-import sys
-import pandas as pd
+import re
+import time
+
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pandas as pd
 
-def process_data_for_plotting(folder_path, human_baseline_col):
-    """Lê e processa os dados dos CSVs, retornando DataFrames prontos para plotagem."""
-    if not os.path.isdir(folder_path):
-        return None, None
+import instrumentacao
+from analise_comum import carregar_analise
 
-    csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
-    if not csv_files:
-        return None, None
+# --- CONFIGURAÇÕES ---
+ARQUIVO_HASHES = ".hashes_graficos.json" # Hash dos dados de cada gráfico já gerado, na pasta de saída.
+VERSAO_GRAFICOS = 1 # Incrementar ao mudar o visual: força a regeneração de todos os gráficos.
 
-    all_data = {}
-    persona_columns = []
-    
-    for filename in csv_files:
-        try:
-            category_name = os.path.splitext(filename)[0].replace(human_baseline_col, "").strip()
-            df = pd.read_csv(os.path.join(folder_path, filename))
-            
-            if not persona_columns:
-                persona_columns = [col for col in df.columns if col.lower() not in ['category', 'categoria', 'pergunta', 'texto']]
-            
-            all_data[category_name] = df[persona_columns]
-        except Exception:
-            continue
-            
-    if human_baseline_col not in persona_columns:
-        print(f"ERRO: Coluna baseline '{human_baseline_col}' não encontrada.")
-        sys.exit(1)
-
-    mean_scores_list = []
-    for category, df in all_data.items():
-        row = {'Traço': category}
-        for persona in persona_columns:
-            scores = pd.to_numeric(df[persona], errors='coerce').dropna()
-            row[persona] = scores.mean()
-        mean_scores_list.append(row)
-    
-    pivoted_means_df = pd.DataFrame(mean_scores_list).set_index('Traço').T
-    pivoted_means_df.index.name = "Persona"
-    
+@instrumentacao.cronometrar
+def process_data_for_plotting(folder_path, human_baseline_col):
+    """Médias, distâncias e intervalos de confiança prontos para plotagem, vindos da análise compartilhada (em cache)."""
+    analise = carregar_analise(folder_path, human_baseline_col)
     distance_results = {}
-    human_vector = pivoted_means_df.loc[human_baseline_col]
-    
-    for persona in persona_columns:
-        if persona != human_baseline_col:
-            persona_vector = pivoted_means_df.loc[persona]
-            abs_diff = (human_vector - persona_vector).abs()
-            euclidean_dist = np.linalg.norm(human_vector - persona_vector)
-            distance_results[persona] = {'diff_por_traco': abs_diff, 'distancia_total': euclidean_dist}
+    for persona in analise['diferencas'].index:
+        linha = analise['distancias'].loc[persona]
+        resultado = {'diff_por_traco': analise['diferencas'].loc[persona], 'distancia_total': linha['distancia_total']}
+        if 'dif_ic_inferior' in analise:
+            resultado['ic_diff'] = (analise['dif_ic_inferior'].loc[persona], analise['dif_ic_superior'].loc[persona])
+            resultado['ic_distancia'] = (linha['ic_inferior'], linha['ic_superior'])
+        distance_results[persona] = resultado
+    return analise['medias'], distance_results
+
+def _nova_figura(figsize):
+    """
+    (figura, eixo, seaborn), sem pyplot. O matplotlib e o seaborn só são importados aqui:
+    o --help e as execuções sem gráficos pendentes não pagam por eles.
+    """
+    import matplotlib
+    matplotlib.use("Agg") # Sem janelas: os gráficos só são salvos em arquivo (e podem ser gerados em subprocessos).
+    import seaborn as sns
+    from matplotlib.figure import Figure
 
-    return pivoted_means_df, distance_results
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots(), sns
+
+def _barras_de_erro(ax, valores, inferiores, superiores):
+    """Desenha intervalos assimétricos [inferior, superior] sobre as barras de `ax`."""
+    valores, inferiores, superiores = np.asarray(valores), np.asarray(inferiores), np.asarray(superiores)
+    erros = [np.maximum(valores - inferiores, 0), np.maximum(superiores - valores, 0)]
+    ax.errorbar(x=np.arange(len(valores)), y=valores, yerr=erros, fmt='none', ecolor='black', capsize=6)
+
+def _salvar(fig, ax, filepath):
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    fig.savefig(filepath)
 
 def plot_trait_comparison(df, filepath):
     """Gera um gráfico de barras agrupado comparando as pontuações médias por traço."""
@@ -62,61 +59,147 @@ def plot_trait_comparison(df, filepath):
     
     df_melted = df.reset_index().melt(id_vars='Persona', var_name='Traço', value_name='Pontuação Média')
     
-    plt.figure(figsize=(12, 7))
-    sns.barplot(data=df_melted, x='Traço', y='Pontuação Média', hue='Persona', palette='viridis')
+    fig, ax, sns = _nova_figura((12, 7))
+    sns.barplot(data=df_melted, x='Traço', y='Pontuação Média', hue='Persona', palette='viridis', ax=ax)
     
-    plt.title('Comparação de Pontuações Médias por Traço de Personalidade', fontsize=16)
-    plt.ylabel('Pontuação Média', fontsize=12)
-    plt.xlabel('Traço de Personalidade (Big Five)', fontsize=12)
-    plt.xticks(rotation=10)
-    plt.legend(title='Persona')
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(filepath)
-    plt.close()
-
-def plot_difference(diff_series, persona_name, human_name, filepath, y_limit=None):
-    """Gera um gráfico de barras mostrando a diferença de pontuação para uma IA."""
+    ax.set_title('Comparação de Pontuações Médias por Traço de Personalidade', fontsize=16)
+    ax.set_ylabel('Pontuação Média', fontsize=12)
+    ax.set_xlabel('Traço de Personalidade (Big Five)', fontsize=12)
+    ax.tick_params(axis='x', labelrotation=10)
+    ax.legend(title='Persona')
+    _salvar(fig, ax, filepath)
+
+def plot_difference(diff_series, persona_name, human_name, filepath, y_limit=None, intervalo=None):
+    """Gera um gráfico de barras mostrando a diferença de pontuação para uma IA (com o IC 95%, se houver)."""
     print(f"Gerando gráfico: {filepath}...")
     
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=diff_series.index, y=diff_series.values, palette='coolwarm_r')
+    fig, ax, sns = _nova_figura((10, 6))
+    sns.barplot(x=diff_series.index, y=diff_series.values, hue=diff_series.index, palette='coolwarm_r',
+                legend=False, ax=ax)
+    if intervalo is not None:
+        _barras_de_erro(ax, diff_series.values, *intervalo)
     
     if y_limit is not None:
-        plt.ylim(0, y_limit)
+        ax.set_ylim(0, y_limit)
     
-    plt.title(f'Diferença Absoluta de Pontuação: {human_name} vs. {persona_name}', fontsize=16)
-    plt.ylabel('Diferença Absoluta na Média', fontsize=12)
-    plt.xlabel('Traço de Personalidade', fontsize=12)
-    plt.xticks(rotation=10)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(filepath)
-    plt.close()
+    ax.set_title(f'Diferença Absoluta de Pontuação: {human_name} vs. {persona_name}', fontsize=16)
+    ax.set_ylabel('Diferença Absoluta na Média', fontsize=12)
+    ax.set_xlabel('Traço de Personalidade', fontsize=12)
+    ax.tick_params(axis='x', labelrotation=10)
+    _salvar(fig, ax, filepath)
 
 def plot_euclidean_distance(distances, filepath):
-    """Gera um gráfico de barras comparando a distância Euclidiana total de cada IA."""
+    """Gera um gráfico de barras comparando a distância Euclidiana total de cada IA (com o IC 95%, se houver)."""
     print(f"Gerando gráfico: {filepath}...")
     
     personas = list(distances.keys())
     dist_values = [d['distancia_total'] for d in distances.values()]
     
-    plt.figure(figsize=(8, 6))
-    sns.barplot(x=personas, y=dist_values, palette='magma')
+    fig, ax, sns = _nova_figura((max(8, 1.5 * len(personas)), 6))
+    sns.barplot(x=personas, y=dist_values, hue=personas, palette='magma', legend=False, ax=ax)
+    if all('ic_distancia' in d for d in distances.values()):
+        _barras_de_erro(ax, dist_values, *zip(*(d['ic_distancia'] for d in distances.values())))
     
-    plt.title('Dissimilaridade de Personalidade Geral (Distância Euclidiana)', fontsize=16)
-    plt.ylabel('Distância Total (Menor é Mais Similar)', fontsize=12)
-    plt.xlabel('Modelo de IA', fontsize=12)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(filepath)
-    plt.close()
+    ax.set_title('Dissimilaridade de Personalidade Geral (Distância Euclidiana)', fontsize=16)
+    ax.set_ylabel('Distância Total (Menor é Mais Similar)', fontsize=12)
+    ax.set_xlabel('Modelo de IA', fontsize=12)
+    _salvar(fig, ax, filepath)
+
+# --- Renderização Incremental e Paralela ---
+
+def _normalizar_para_hash(valor):
+    if isinstance(valor, (pd.Series, pd.DataFrame)):
+        return valor.to_json(orient='split', double_precision=15)
+    if isinstance(valor, dict):
+        return {str(chave): _normalizar_para_hash(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar_para_hash(v) for v in valor]
+    if isinstance(valor, (np.floating, np.integer)):
+        return valor.item()
+    return valor
 
+def hash_tarefa(funcao, argumentos):
+    """Hash dos dados de entrada de um gráfico (e da versão do código que o desenha)."""
+    conteudo = json.dumps([VERSAO_GRAFICOS, funcao.__name__, _normalizar_para_hash(argumentos)], sort_keys=True)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
 
-def main(folder_path, human_baseline_col, output_dir="graficos"):
+def _nome_arquivo(persona):
+    return re.sub(r'[^0-9a-z]+', '_', persona.lower()).strip('_')
+
+def montar_tarefas(pivoted_means, distance_results, human_baseline_col, output_dir):
+    """Lista (função, argumentos) de cada gráfico independente: médias, uma diferença por persona e distâncias."""
+    # Mesmo limite do eixo Y em todos os gráficos de diferença, para que sejam comparáveis.
+    max_diff = 0
+    for persona in distance_results:
+        max_diff = max(max_diff, distance_results[persona]['diff_por_traco'].max())
+        if 'ic_diff' in distance_results[persona]:
+            max_diff = max(max_diff, distance_results[persona]['ic_diff'][1].max())
+    y_limit_for_diff_plots = max_diff * 1.1 
+
+    tarefas = [(plot_trait_comparison, {'df': pivoted_means,
+                                        'filepath': os.path.join(output_dir, "1_comparacao_por_traco.png")})]
+    for persona, resultado in distance_results.items():
+        tarefas.append((plot_difference, {
+            'diff_series': resultado['diff_por_traco'], 'persona_name': persona, 'human_name': human_baseline_col,
+            'filepath': os.path.join(output_dir, f"2_diferenca_vs_{_nome_arquivo(persona)}.png"),
+            'y_limit': y_limit_for_diff_plots, 'intervalo': resultado.get('ic_diff'),
+        }))
+    tarefas.append((plot_euclidean_distance, {'distances': distance_results,
+                                              'filepath': os.path.join(output_dir, "4_comparacao_distancia_total.png")}))
+    return tarefas
+
+def _renderizar(tarefa):
+    """
+    Desenha um gráfico e devolve (nome da função, tempo de parede, tempo de CPU). Roda nos workers, cujas
+    medições não chegam ao coletor do processo principal: quem chama registra os tempos devolvidos.
+    A função vai pelo nome, resolvida neste módulo, e não como objeto: assim a tarefa também pode
+    ser serializada com o método spawn, mesmo quando o script roda como __main__ (direto ou via runpy).
+    """
+    nome, argumentos = tarefa
+    inicio_parede, inicio_cpu = time.perf_counter(), time.process_time()
+    globals()[nome](**argumentos)
+    return nome, time.perf_counter() - inicio_parede, time.process_time() - inicio_cpu
+
+def renderizar_tarefas(tarefas, output_dir, processos=None, forcar=False):
+    """
+    Renderiza os gráficos cujo hash de entrada mudou (ou cujo arquivo sumiu),
+    em paralelo em um pool de processos. Retorna (gerados, pulados).
+    """
+    caminho_hashes = os.path.join(output_dir, ARQUIVO_HASHES)
+    hashes_anteriores = {}
+    if os.path.exists(caminho_hashes) and not forcar:
+        with open(caminho_hashes, 'r', encoding='utf-8') as f:
+            hashes_anteriores = json.load(f)
+
+    hashes, pendentes = {}, []
+    for funcao, argumentos in tarefas:
+        nome = os.path.basename(argumentos['filepath'])
+        hashes[nome] = hash_tarefa(funcao, argumentos)
+        if hashes_anteriores.get(nome) != hashes[nome] or not os.path.exists(argumentos['filepath']):
+            pendentes.append((funcao.__name__, argumentos))
+
+    processos = min(processos or os.cpu_count() or 1, len(pendentes))
+    with instrumentacao.etapa("renderizacao", unidade="graficos", itens=len(pendentes)):
+        if processos > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            # O worker vem do módulo importável, não do __main__ que está rodando: com spawn, os
+            # filhos precisam encontrá-lo pelo nome "gerar_graficos._renderizar".
+            import gerar_graficos
+            with ProcessPoolExecutor(max_workers=processos) as pool:
+                medicoes = list(pool.map(gerar_graficos._renderizar, pendentes))
+        else:
+            medicoes = [_renderizar(tarefa) for tarefa in pendentes]
+        for medicao in medicoes:
+            instrumentacao.registrar(*medicao)
+
+    with open(caminho_hashes, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2)
+    return len(pendentes), len(tarefas) - len(pendentes)
+
+
+def main(folder_path, human_baseline_col, output_dir="graficos", processos=None, forcar=False):
     """Função principal para orquestrar a análise e a geração de gráficos."""
     
-    # --- ALTERAÇÃO PRINCIPAL AQUI ---
     # 1. Criar o diretório de saída se ele não existir
     if not os.path.exists(output_dir):
         print(f"Criando diretório de saída: '{output_dir}'")
@@ -124,41 +207,25 @@ def main(folder_path, human_baseline_col, output_dir="graficos"):
         
     print("Iniciando processamento de dados para os gráficos...")
     pivoted_means, distance_results = process_data_for_plotting(folder_path, human_baseline_col)
-    
-    if pivoted_means is None:
-        print("Não foi possível gerar os gráficos pois nenhum dado foi carregado.")
-        return
         
-    # 2. Determinar o limite máximo do eixo Y para os gráficos de diferença
-    max_diff = 0
-    for persona in distance_results:
-        max_diff = max(max_diff, distance_results[persona]['diff_por_traco'].max())
-    y_limit_for_diff_plots = max_diff * 1.1 
-
-    # 3. Gerar gráficos salvando na pasta especificada
-    plot_trait_comparison(pivoted_means, filepath=os.path.join(output_dir, "1_comparacao_por_traco.png"))
+    # 2. Montar a lista de gráficos e gerar só os que mudaram
+    tarefas = montar_tarefas(pivoted_means, distance_results, human_baseline_col, output_dir)
+    gerados, pulados = renderizar_tarefas(tarefas, output_dir, processos, forcar)
     
-    if 'Doppelbot' in distance_results:
-        plot_difference(distance_results['Doppelbot']['diff_por_traco'], 'Doppelbot', human_baseline_col,
-                        filepath=os.path.join(output_dir, "2_diferenca_vs_doppelbot.png"),
-                        y_limit=y_limit_for_diff_plots)
-        
-    if 'Llama' in distance_results:
-        plot_difference(distance_results['Llama']['diff_por_traco'], 'Llama', human_baseline_col,
-                        filepath=os.path.join(output_dir, "3_diferenca_vs_llama.png"),
-                        y_limit=y_limit_for_diff_plots)
-        
-    plot_euclidean_distance(distance_results, filepath=os.path.join(output_dir, "4_comparacao_distancia_total.png"))
-    
-    print(f"\nTodos os gráficos foram gerados com sucesso na pasta '{output_dir}'.")
+    print(f"\n{gerados} gráfico(s) gerado(s) e {pulados} sem alteração na pasta '{output_dir}'.")
 
 # --- Bloco Principal de Execução ---
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Uso: python3 gerar_graficos.py <caminho_para_a_pasta_com_csvs> <nome_da_coluna_humana>")
-        print("Exemplo: python3 gerar_graficos.py ./big_five_scores Augusto")
-        sys.exit(1)
-        
-    input_folder = sys.argv[1]
-    human_column = sys.argv[2]
-    main(input_folder, human_column)
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Gera os gráficos da análise Big Five (um gráfico de diferença por persona).",
+        epilog="Exemplo: python3 gerar_graficos.py ./big_five_scores Augusto --processos 4"
+    )
+    parser.add_argument("pasta_csvs", help="Pasta com os CSVs de pontuação.")
+    parser.add_argument("coluna_humana", help="Nome da coluna da baseline humana.")
+    parser.add_argument("--saida", default="graficos")
+    parser.add_argument("--processos", type=int, default=None, help="Processos de renderização (padrão: núcleos da CPU).")
+    parser.add_argument("--forcar", action="store_true", help="Regenera todos os gráficos, mesmo sem mudança nos dados.")
+    args = parser.parse_args()
+
+    instrumentacao.iniciar("gerar_graficos")
+    main(args.pasta_csvs, args.coluna_humana, args.saida, args.processos, args.forcar)
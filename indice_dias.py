@@ -0,0 +1,155 @@
+"""
+Índice de dias das exportações de conversa: data -> posição (em bytes) da
+primeira mensagem daquele dia no arquivo.
+
+As exportações do WhatsApp são cronológicas e cada mensagem começa com
+"dd/mm/aaaa". O índice é montado em uma única varredura e guardado em
+PASTA_INDICES, fora da pasta das conversas, para não mexer no hash de
+entrada do pipeline. Ele é refeito sozinho quando o arquivo muda (tamanho ou
+mtime). Com ele, ler um período é só um seek até o primeiro dia e uma leitura
+até o primeiro dia depois do fim, sem decodificar o resto do arquivo.
+
+    python indice_dias.py conversas_padronizadas   # monta (ou confere) os índices e mostra o período de cada arquivo
+"""
+import argparse
+import bisect
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from datetime import date, datetime
+
+# --- CONFIGURAÇÕES ---
+PASTA_INDICES = ".indices_dias"
+VERSAO_INDICE = 1
+# Início de mensagem: data e hora no começo da linha, como no parser do pre_processing.
+PADRAO_CABECALHO = re.compile(rb'^(\d{2})/(\d{2})/(\d{4}),? \d{2}:\d{2} - ', re.MULTILINE)
+
+@functools.lru_cache(maxsize=None)
+def data_do_prefixo(prefixo):
+    """
+    date de um prefixo "dd/mm/aaaa", decodificado uma vez por dia distinto:
+    as mensagens do mesmo dia reaproveitam o resultado. ValueError se inválido.
+    """
+    return datetime.strptime(prefixo, '%d/%m/%Y').date()
+
+def ler_data(texto):
+    """date de "aaaa-mm-dd" (usado por --since/--until); erro com mensagem clara se inválido."""
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida '{texto}' (use aaaa-mm-dd)")
+
+# --- Construção e Cache ---
+
+def construir_indice(caminho):
+    """
+    Varre o arquivo uma vez e devolve o índice: os dias em ordem de aparição
+    e a posição do primeiro cabeçalho de cada um. `ordenado` é falso se algum
+    dia aparecer fora de ordem. Nesse caso, quem lê precisa filtrar o arquivo inteiro.
+    """
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    dias, ordenado, anterior = [], True, None
+    for match in PADRAO_CABECALHO.finditer(conteudo):
+        dia, mes, ano = match.groups()
+        chave = (ano + b"-" + mes + b"-" + dia).decode("ascii")
+        if chave == anterior:
+            continue
+        if anterior is not None and chave < anterior:
+            ordenado = False
+        dias.append([chave, match.start()])
+        anterior = chave
+    estado = os.stat(caminho)
+    return {"versao": VERSAO_INDICE, "tamanho": estado.st_size, "mtime_ns": estado.st_mtime_ns,
+            "ordenado": ordenado, "dias": dias}
+
+def _caminho_indice(caminho):
+    chave = hashlib.sha1(os.path.abspath(caminho).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(PASTA_INDICES, f"{os.path.splitext(os.path.basename(caminho))[0]}_{chave}.json")
+
+def _valido(indice, caminho):
+    estado = os.stat(caminho)
+    return (indice.get("versao") == VERSAO_INDICE and indice["tamanho"] == estado.st_size
+            and indice["mtime_ns"] == estado.st_mtime_ns)
+
+def carregar_indice(caminho):
+    """Índice do arquivo, lido do cache ou (re)construído se o arquivo mudou."""
+    caminho_indice = _caminho_indice(caminho)
+    if os.path.exists(caminho_indice):
+        try:
+            with open(caminho_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+            if _valido(indice, caminho):
+                return indice
+        except (OSError, ValueError, KeyError):
+            pass # Índice corrompido: reconstruído abaixo.
+    indice = construir_indice(caminho)
+    os.makedirs(PASTA_INDICES, exist_ok=True)
+    with open(caminho_indice, 'w', encoding='utf-8') as f:
+        json.dump(indice, f)
+    return indice
+
+# --- Leitura de um Período ---
+
+def intervalo_bytes(indice, desde=None, ate=None):
+    """(início, fim) em bytes dos dias entre `desde` e `ate` (inclusive); fim None = até o final do arquivo."""
+    chaves = [dia for dia, _ in indice["dias"]]
+    posicoes = [posicao for _, posicao in indice["dias"]]
+    inicio_dia = bisect.bisect_left(chaves, desde.isoformat()) if desde is not None else 0
+    fim_dia = bisect.bisect_right(chaves, ate.isoformat()) if ate is not None else len(chaves)
+    if inicio_dia >= fim_dia:
+        return 0, 0
+    inicio = posicoes[inicio_dia] if inicio_dia else 0 # Do dia 0 em diante, inclui o que vier antes do 1º cabeçalho.
+    return inicio, posicoes[fim_dia] if fim_dia < len(posicoes) else None
+
+def ler_periodo(caminho, desde=None, ate=None):
+    """
+    Texto do arquivo restrito aos dias entre `desde` e `ate` (dates, inclusive).
+    Retorna (texto, filtrar): com `filtrar` verdadeiro o arquivo não está em
+    ordem cronológica, o texto é o arquivo inteiro e cabe a quem chama filtrar por data.
+    """
+    indice = carregar_indice(caminho)
+    if not indice["ordenado"]:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return f.read(), True
+    inicio, fim = intervalo_bytes(indice, desde, ate)
+    if fim is not None and fim <= inicio:
+        return "", False
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        trecho = f.read() if fim is None else f.read(fim - inicio)
+    # As posições são inícios de linha, então o trecho nunca corta um caractere UTF-8 ao meio. O
+    # TextIOWrapper decodifica como o open() em modo texto (\r\n -> \n), igual à leitura do arquivo inteiro.
+    return io.TextIOWrapper(io.BytesIO(trecho), encoding='utf-8').read(), False
+
+def arquivos_de_conversa(pasta):
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in sorted(arquivos):
+            if nome.endswith(".txt"):
+                yield os.path.join(raiz, nome)
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Monta (ou confere) o índice de dias de cada exportação e mostra o período coberto.",
+        epilog="Exemplo: python indice_dias.py conversas_padronizadas"
+    )
+    parser.add_argument("pasta", help="Pasta com as conversas (.txt), ex: conversas_padronizadas.")
+    args = parser.parse_args()
+    if not os.path.isdir(args.pasta):
+        print(f"ERRO: A pasta '{args.pasta}' não foi encontrada.")
+        sys.exit(1)
+
+    for caminho in arquivos_de_conversa(args.pasta):
+        inicio = time.perf_counter()
+        indice = carregar_indice(caminho)
+        duracao = (time.perf_counter() - inicio) * 1000
+        dias = indice["dias"]
+        periodo = f"{dias[0][0]} a {dias[-1][0]}" if dias else "sem mensagens"
+        aviso = "" if indice["ordenado"] else " [fora de ordem: será lido inteiro]"
+        print(f"  - {os.path.relpath(caminho, args.pasta)}: {len(dias)} dias, {periodo} ({duracao:.1f} ms){aviso}")
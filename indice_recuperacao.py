@@ -0,0 +1,384 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from formato_dados import iterar_pares, resolver_caminho
+
+# --- CONSTANTES DE CONFIGURAÇÃO ---
+ARQUIVO_DATASET = "dataset_final.jsonl"
+PASTA_INDICE = "indice_exemplos"
+EMBEDDING_MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Arquivos que compõem o índice dentro de PASTA_INDICE.
+ARQUIVO_EMBEDDINGS = "embeddings.npy"      # matriz float32 (N x D), linhas normalizadas
+ARQUIVO_EXEMPLOS = "exemplos.jsonl"        # input/output/categoria/hash de cada linha
+ARQUIVO_OFFSETS = "offsets.npy"            # offset em bytes de cada linha de exemplos.jsonl
+ARQUIVO_CENTROIDES = "centroides.npy"      # (opcional) centróides do IVF
+ARQUIVO_LISTAS = "listas_ivf.npy"          # (opcional) início de cada lista do IVF
+ARQUIVO_ATRIBUICOES = "atribuicoes_novas.npy"  # (opcional) lista IVF das linhas anexadas após o último agrupamento
+ARQUIVO_CATEGORIAS = "categorias.npy"      # código da categoria de cada linha (nomes em meta.json)
+ARQUIVO_META = "meta.json"
+
+TAMANHO_LOTE_EMBEDDINGS = 256
+ITERACOES_KMEANS = 20
+
+def hash_exemplo(exemplo):
+    """Identificador estável de um par, usado para reaproveitar embeddings já calculados."""
+    chave = f"{exemplo.get('categoria', '')}\x1f{exemplo['input']}\x1f{exemplo['output']}"
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+def normalizar_linhas(matriz):
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return (matriz / normas).astype(np.float32)
+
+def kmeans_esferico(vetores, k, semente=42, iteracoes=ITERACOES_KMEANS):
+    """K-means sobre vetores normalizados (similaridade de cosseno), usado no particionamento IVF."""
+    rng = np.random.default_rng(semente)
+    centroides = vetores[rng.choice(len(vetores), size=k, replace=False)].copy()
+    for _ in range(iteracoes):
+        atribuicoes = np.argmax(vetores @ centroides.T, axis=1)
+        for c in range(k):
+            membros = vetores[atribuicoes == c]
+            if len(membros):
+                centroides[c] = membros.sum(axis=0)
+        centroides = normalizar_linhas(centroides)
+    return centroides, np.argmax(vetores @ centroides.T, axis=1)
+
+# --- CONSTRUÇÃO DO ÍNDICE ---
+
+def ler_meta(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_META)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def hashes_indexados(pasta):
+    """Hash de cada linha do índice, na ordem em que estão gravadas."""
+    with open(os.path.join(pasta, ARQUIVO_EXEMPLOS), 'r', encoding='utf-8') as f:
+        return [json.loads(linha)["hash"] for linha in f]
+
+def calcular_embeddings(textos, model_id):
+    """Embeddings normalizados dos textos (o modelo só é carregado se houver o que calcular)."""
+    from sentence_transformers import SentenceTransformer
+    print(f"Calculando embeddings com '{model_id}'...")
+    modelo = SentenceTransformer(model_id)
+    return normalizar_linhas(modelo.encode(textos, batch_size=TAMANHO_LOTE_EMBEDDINGS,
+                                           show_progress_bar=True, convert_to_numpy=True))
+
+def anexar_npy(caminho, linhas):
+    """
+    Acrescenta linhas ao fim de um .npy. O numpy reserva espaço no cabeçalho para o eixo 0
+    crescer, então só o shape é reescrito no lugar; se não couber, o arquivo é regravado.
+    """
+    linhas = np.ascontiguousarray(linhas)
+    with open(caminho, 'r+b') as f:
+        versao = np.lib.format.read_magic(f)
+        if versao == (1, 0):
+            forma, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            inicio_dados = f.tell()
+            cabecalho = io.BytesIO()
+            np.lib.format.write_array_header_1_0(cabecalho, {
+                "descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran,
+                "shape": (forma[0] + len(linhas), *forma[1:])})
+            if (not fortran and dtype == linhas.dtype and forma[1:] == linhas.shape[1:]
+                    and len(cabecalho.getvalue()) == inicio_dados):
+                f.seek(0, os.SEEK_END)
+                f.write(linhas.tobytes())
+                f.seek(0)
+                f.write(cabecalho.getvalue())
+                return
+    np.save(caminho, np.concatenate([np.load(caminho), linhas]))
+
+def _codigos_categorias(exemplos, categorias):
+    """Código (posição em `categorias`) da categoria de cada exemplo; categorias novas entram no fim da lista."""
+    posicoes = {nome: i for i, nome in enumerate(categorias)}
+    for exemplo in exemplos:
+        nome = exemplo.get("categoria") or ""
+        if nome not in posicoes:
+            posicoes[nome] = len(categorias)
+            categorias.append(nome)
+    return np.asarray([posicoes[exemplo.get("categoria") or ""] for exemplo in exemplos], dtype=np.int32)
+
+def _gravar_exemplos(arquivo, exemplos):
+    offsets = []
+    for exemplo in exemplos:
+        offsets.append(arquivo.tell())
+        registro = {k: exemplo.get(k) for k in ("input", "output", "categoria", "hash")}
+        arquivo.write((json.dumps(registro, ensure_ascii=False) + '\n').encode('utf-8'))
+    return np.asarray(offsets, dtype=np.int64)
+
+def _completar_com_indexados(pasta, vetores, chaves):
+    """Copia para `vetores` os embeddings já gravados no índice das `chaves` que ainda faltam."""
+    faltando = set(chaves) - vetores.keys()
+    if not faltando:
+        return
+    # Cópia, não memory map: o arquivo pode ser sobrescrito logo depois.
+    anteriores = np.load(os.path.join(pasta, ARQUIVO_EMBEDDINGS), mmap_mode='r')
+    for i, chave in enumerate(hashes_indexados(pasta)):
+        if chave in faltando:
+            vetores.setdefault(chave, np.array(anteriores[i]))
+
+def _gravar_meta(pasta, meta):
+    with open(os.path.join(pasta, ARQUIVO_META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+def _remover(pasta, *nomes):
+    for nome in nomes:
+        if os.path.exists(os.path.join(pasta, nome)):
+            os.remove(os.path.join(pasta, nome))
+
+def construir_indice(caminho_dataset=ARQUIVO_DATASET, pasta=PASTA_INDICE, model_id=EMBEDDING_MODEL_ID, num_listas=0,
+                     reagrupar=False):
+    """
+    Constrói (ou atualiza) o índice de exemplos a partir da saída da Etapa 2.
+    Apenas os pares que ainda não estavam no índice têm o embedding calculado.
+
+    Se o dataset só ganhou pares, eles são anexados ao fim dos arquivos, e no
+    IVF cada um vai para a lista do centróide mais próximo (sem k-means). O
+    índice só é reescrito se pares saíram do dataset ou se o número de listas
+    mudou, e mesmo assim os centróides são mantidos. O k-means roda de novo só
+    com `reagrupar` (ou na primeira vez que o índice ganha listas).
+    """
+    caminho_dataset = resolver_caminho(caminho_dataset) # O .parquet, se a Etapa 2 gravou nesse formato.
+    if not os.path.exists(caminho_dataset):
+        print(f"ERRO: Arquivo de dataset '{caminho_dataset}' não encontrado.")
+        sys.exit(1)
+    os.makedirs(pasta, exist_ok=True)
+
+    exemplos = [e for e in iterar_pares(caminho_dataset, colunas=["input", "output", "categoria"])
+                if e.get("input") and e.get("output")]
+    if not exemplos:
+        print("ERRO: Nenhum par válido encontrado no dataset.")
+        sys.exit(1)
+    for exemplo in exemplos:
+        exemplo["hash"] = hash_exemplo(exemplo)
+
+    meta = ler_meta(pasta)
+    if meta is not None and meta.get("modelo") != model_id:
+        meta = None # Embeddings de outro modelo não servem: o índice é refeito do zero.
+    indexados = hashes_indexados(pasta) if meta is not None else []
+
+    # Diferença de multiconjuntos: o mesmo par pode aparecer mais de uma vez no dataset.
+    restantes = Counter(indexados)
+    novos = []
+    for exemplo in exemplos:
+        if restantes[exemplo["hash"]] > 0:
+            restantes[exemplo["hash"]] -= 1
+        else:
+            novos.append(exemplo)
+    removidos = sum(restantes.values())
+    print(f"Pares no dataset: {len(exemplos)} | já indexados: {len(exemplos) - len(novos)} | novos: {len(novos)} "
+          f"| removidos: {removidos}")
+
+    vetores = {}
+    ja_indexados = set(indexados)
+    pendentes = list({e["hash"]: e for e in novos if e["hash"] not in ja_indexados}.values())
+    if pendentes:
+        for exemplo, vetor in zip(pendentes, calcular_embeddings([e["input"] for e in pendentes], model_id)):
+            vetores[exemplo["hash"]] = vetor
+
+    listas_desejadas = num_listas if num_listas and num_listas < len(exemplos) else 0
+    if meta is not None and not removidos and not reagrupar and listas_desejadas == meta.get("listas_ivf", 0):
+        _anexar_ao_indice(pasta, meta, novos, vetores)
+    else:
+        _reescrever_indice(pasta, meta, exemplos, vetores, model_id, listas_desejadas, reagrupar)
+
+def _anexar_ao_indice(pasta, meta, novos, vetores):
+    """Acrescenta os pares novos ao fim de cada arquivo; os já indexados não são reescritos."""
+    if not novos:
+        print(f"Índice em '{pasta}' já está atualizado ({meta['total']} exemplos).")
+        return
+    _completar_com_indexados(pasta, vetores, (e["hash"] for e in novos)) # Cópias extras de pares já indexados.
+    embeddings = np.stack([vetores[e["hash"]] for e in novos])
+    categorias = meta.get("categorias")
+    with open(os.path.join(pasta, ARQUIVO_EXEMPLOS), 'ab') as f:
+        offsets = _gravar_exemplos(f, novos)
+    anexar_npy(os.path.join(pasta, ARQUIVO_EMBEDDINGS), embeddings)
+    anexar_npy(os.path.join(pasta, ARQUIVO_OFFSETS), offsets)
+    if categorias is not None:
+        anexar_npy(os.path.join(pasta, ARQUIVO_CATEGORIAS), _codigos_categorias(novos, categorias))
+
+    if meta.get("listas_ivf"):
+        # Fora das faixas contíguas das listas: a busca consulta estas linhas pela lista atribuída.
+        centroides = np.load(os.path.join(pasta, ARQUIVO_CENTROIDES))
+        atribuicoes = np.argmax(embeddings @ centroides.T, axis=1).astype(np.int32)
+        caminho_atribuicoes = os.path.join(pasta, ARQUIVO_ATRIBUICOES)
+        if os.path.exists(caminho_atribuicoes):
+            anexar_npy(caminho_atribuicoes, atribuicoes)
+        else:
+            np.save(caminho_atribuicoes, atribuicoes)
+        fora_das_listas = meta["total"] + len(novos) - int(np.load(os.path.join(pasta, ARQUIVO_LISTAS))[-1])
+        print(f"{fora_das_listas} exemplos anexados às listas IVF existentes desde o último agrupamento "
+              f"(use --reagrupar para recalcular os centróides e reorganizar o índice).")
+
+    meta["total"] += len(novos)
+    _gravar_meta(pasta, meta)
+    print(f"Índice atualizado em '{pasta}' ({len(novos)} exemplos anexados, {meta['total']} no total).")
+
+def _reescrever_indice(pasta, meta, exemplos, vetores, model_id, num_listas, reagrupar):
+    """Regrava o índice inteiro, reaproveitando os embeddings (e, no IVF, os centróides) já calculados."""
+    if meta is not None:
+        _completar_com_indexados(pasta, vetores, (e["hash"] for e in exemplos))
+    embeddings = np.stack([np.asarray(vetores[e["hash"]], dtype=np.float32) for e in exemplos])
+
+    # Com IVF, as linhas são reordenadas por lista para que cada lista seja contígua no arquivo.
+    listas = None
+    if num_listas:
+        if not reagrupar and meta is not None and meta.get("listas_ivf") == num_listas:
+            print(f"Distribuindo os exemplos nas {num_listas} listas IVF existentes...")
+            centroides = np.load(os.path.join(pasta, ARQUIVO_CENTROIDES))
+            atribuicoes = np.argmax(embeddings @ centroides.T, axis=1)
+        else:
+            print(f"Particionando o índice em {num_listas} listas (IVF)...")
+            centroides, atribuicoes = kmeans_esferico(embeddings, num_listas)
+        ordem = np.argsort(atribuicoes, kind='stable')
+        embeddings = embeddings[ordem]
+        exemplos = [exemplos[i] for i in ordem]
+        listas = np.searchsorted(atribuicoes[ordem], np.arange(num_listas + 1)).astype(np.int64)
+        np.save(os.path.join(pasta, ARQUIVO_CENTROIDES), centroides)
+        np.save(os.path.join(pasta, ARQUIVO_LISTAS), listas)
+    else:
+        _remover(pasta, ARQUIVO_CENTROIDES, ARQUIVO_LISTAS)
+    _remover(pasta, ARQUIVO_ATRIBUICOES)
+
+    with open(os.path.join(pasta, ARQUIVO_EXEMPLOS), 'wb') as f:
+        offsets = _gravar_exemplos(f, exemplos)
+    categorias = []
+    np.save(os.path.join(pasta, ARQUIVO_CATEGORIAS), _codigos_categorias(exemplos, categorias))
+    np.save(os.path.join(pasta, ARQUIVO_EMBEDDINGS), embeddings)
+    np.save(os.path.join(pasta, ARQUIVO_OFFSETS), offsets)
+    _gravar_meta(pasta, {"modelo": model_id, "total": len(exemplos), "dimensao": int(embeddings.shape[1]),
+                         "listas_ivf": int(num_listas) if listas is not None else 0, "categorias": categorias})
+
+    print(f"Índice salvo em '{pasta}' ({len(exemplos)} exemplos, dimensão {embeddings.shape[1]}).")
+
+# --- CONSULTA AO ÍNDICE ---
+
+class IndiceExemplos:
+    """
+    Índice de busca por similaridade sobre os inputs reais. As matrizes são
+    abertas por memory map, então carregar o índice não lê o arquivo inteiro;
+    os textos dos exemplos são lidos sob demanda pelos offsets.
+    """
+
+    def __init__(self, pasta=PASTA_INDICE):
+        caminho_meta = os.path.join(pasta, ARQUIVO_META)
+        if not os.path.exists(caminho_meta):
+            print(f"ERRO: Índice de exemplos não encontrado em '{pasta}'. Execute 'python indice_recuperacao.py' primeiro.")
+            sys.exit(1)
+        with open(caminho_meta, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.embeddings = np.load(os.path.join(pasta, ARQUIVO_EMBEDDINGS), mmap_mode='r')
+        self.offsets = np.load(os.path.join(pasta, ARQUIVO_OFFSETS), mmap_mode='r')
+        self.centroides = None
+        self.listas = None
+        self.atribuicoes_novas = None
+        if self.meta.get("listas_ivf"):
+            self.centroides = np.load(os.path.join(pasta, ARQUIVO_CENTROIDES))
+            self.listas = np.load(os.path.join(pasta, ARQUIVO_LISTAS))
+            if os.path.exists(os.path.join(pasta, ARQUIVO_ATRIBUICOES)):
+                self.atribuicoes_novas = np.load(os.path.join(pasta, ARQUIVO_ATRIBUICOES))
+        # Índices anteriores às categorias não têm o arquivo: nesse caso a busca não filtra.
+        self.categorias = None
+        if "categorias" in self.meta and os.path.exists(os.path.join(pasta, ARQUIVO_CATEGORIAS)):
+            self.categorias = np.load(os.path.join(pasta, ARQUIVO_CATEGORIAS), mmap_mode='r')
+        self._arquivo_exemplos = open(os.path.join(pasta, ARQUIVO_EXEMPLOS), 'rb')
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def exemplo(self, i):
+        self._arquivo_exemplos.seek(int(self.offsets[i]))
+        return json.loads(self._arquivo_exemplos.readline().decode('utf-8'))
+
+    def _candidatos(self, consulta, nprobe):
+        """Retorna (índices, scores) das linhas avaliadas: todas, ou só as das listas IVF mais próximas."""
+        if self.centroides is None:
+            return None, np.asarray(self.embeddings @ consulta)
+        listas_proximas = np.argsort(-(self.centroides @ consulta))[:max(nprobe, 1)]
+        faixas = [(int(self.listas[c]), int(self.listas[c + 1])) for c in listas_proximas]
+        indices = np.concatenate([np.arange(inicio, fim) for inicio, fim in faixas])
+        scores = np.concatenate([self.embeddings[inicio:fim] @ consulta for inicio, fim in faixas])
+        if self.atribuicoes_novas is not None:
+            # Linhas anexadas depois do último agrupamento ficam no fim do arquivo, fora das faixas.
+            anexadas = int(self.listas[-1]) + np.flatnonzero(np.isin(self.atribuicoes_novas, listas_proximas))
+            indices = np.concatenate([indices, anexadas])
+            scores = np.concatenate([scores, self.embeddings[anexadas] @ consulta])
+        return indices, scores
+
+    def categoria_no_indice(self, categoria):
+        """Nome da categoria como está no índice (sem diferenciar maiúsculas), ou None se não houver exemplos dela."""
+        if self.categorias is None or not categoria:
+            return None
+        procurada = categoria.strip().casefold()
+        return next((nome for nome in self.meta["categorias"] if nome.casefold() == procurada), None)
+
+    def buscar(self, vetor_consulta, k=3, nprobe=8, categoria=None):
+        """
+        Retorna os k exemplos mais similares como lista de (score, exemplo).
+        Com `categoria` (um nome de categoria_no_indice), só exemplos dela entram.
+        """
+        consulta = normalizar_linhas(np.asarray(vetor_consulta, dtype=np.float32).reshape(1, -1))[0]
+        indices, scores = self._candidatos(consulta, nprobe)
+        if categoria is not None and self.categorias is not None:
+            codigo = self.meta["categorias"].index(categoria)
+            if indices is None:
+                indices = np.arange(len(scores))
+            mantidos = np.asarray(self.categorias[indices]) == codigo
+            indices, scores = indices[mantidos], scores[mantidos]
+        if len(scores) == 0:
+            return []
+        k = min(k, len(scores))
+        melhores = np.argpartition(-scores, k - 1)[:k]
+        melhores = melhores[np.argsort(-scores[melhores])]
+        linhas = melhores if indices is None else indices[melhores]
+        return [(float(scores[m]), self.exemplo(int(linha))) for m, linha in zip(melhores, linhas)]
+
+def exemplos_como_mensagens(resultados):
+    """Converte exemplos recuperados em turnos user/assistant para o prompt few-shot."""
+    mensagens = []
+    for _, exemplo in resultados:
+        mensagens.append({"role": "user", "content": exemplo["input"]})
+        mensagens.append({"role": "assistant", "content": exemplo["output"]})
+    return mensagens
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Constrói o índice de recuperação de exemplos reais a partir do dataset da Etapa 2.",
+        epilog="Exemplo: python indice_recuperacao.py --ivf 64 --consulta \"bora sair hoje?\""
+    )
+    parser.add_argument("--dataset", default=ARQUIVO_DATASET)
+    parser.add_argument("--pasta", default=PASTA_INDICE)
+    parser.add_argument("--modelo", default=EMBEDDING_MODEL_ID)
+    parser.add_argument("--ivf", type=int, default=0, help="Número de listas IVF (0 = busca exaustiva).")
+    parser.add_argument("--reagrupar", action="store_true",
+                        help="Recalcula os centróides do IVF (k-means) e reorganiza as listas; sem isso, pares novos "
+                             "vão para a lista mais próxima.")
+    parser.add_argument("--consulta", help="Texto de teste para medir a latência da busca após a construção.")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    construir_indice(args.dataset, args.pasta, args.modelo, args.ivf, args.reagrupar)
+
+    if args.consulta:
+        from sentence_transformers import SentenceTransformer
+        modelo = SentenceTransformer(args.modelo)
+        indice = IndiceExemplos(args.pasta)
+        vetor = modelo.encode([args.consulta], convert_to_numpy=True)[0]
+        inicio = time.perf_counter()
+        resultados = indice.buscar(vetor, args.k)
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        print(f"\nTop-{args.k} para '{args.consulta}' (busca em {latencia_ms:.2f} ms):")
+        for score, exemplo in resultados:
+            print(f"  [{score:.3f}] {exemplo['input']!r} -> {exemplo['output']!r}")
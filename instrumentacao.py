@@ -0,0 +1,215 @@
+"""
+Instrumentação leve compartilhada pelos scripts do pipeline.
+
+Uso típico em um script:
+
+    import instrumentacao
+    instrumentacao.iniciar("pre_processing")
+
+    with instrumentacao.etapa("leitura", unidade="mensagens") as registro:
+        mensagens = ...
+        registro["itens"] = len(mensagens)
+
+    @instrumentacao.cronometrar
+    def funcao_quente(...): ...
+
+Ao final da execução (inclusive em saídas antecipadas) um relatório JSON é
+gravado em `relatorios_execucao/` com tempo de parede, tempo de CPU, pico de
+memória (RSS) e vazão de cada etapa e de cada função cronometrada.
+
+Perfis opcionais via variável de ambiente DOPPELBOT_PERFIL (valores separados
+por vírgula):
+  - cprofile:    perfila o código dentro das etapas e das funções decoradas com
+                 @cronometrar (e o que elas chamam) e salva um arquivo .prof ao
+                 lado do relatório.
+  - tracemalloc: mede o pico de memória alocada pelo Python em cada etapa e
+                 lista os maiores pontos de alocação.
+"""
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- CONFIGURAÇÕES ---
+PASTA_RELATORIOS = os.environ.get("DOPPELBOT_RELATORIOS", "relatorios_execucao")
+PERFIS_ATIVOS = {p.strip().lower() for p in os.environ.get("DOPPELBOT_PERFIL", "").split(",") if p.strip()}
+TOP_LINHAS_PERFIL = 25
+
+def pico_rss_mb():
+    """Pico de memória residente do processo até agora, em MB (None se indisponível)."""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta em KB, macOS em bytes.
+        return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+class Coletor:
+    """Acumula as medições da execução atual."""
+
+    def __init__(self):
+        self.nome_execucao = None
+        self.inicio_parede = time.perf_counter()
+        self.inicio_cpu = time.process_time()
+        self.iniciado_em = datetime.now()
+        self.etapas = {}
+        self.funcoes = {}
+        self.perfil = cProfile.Profile() if "cprofile" in PERFIS_ATIVOS else None
+        self._profundidade_perfil = 0
+        self._perfil_usado = False
+        self._relatorio_salvo = None
+
+    def _acumular(self, destino, nome, parede, cpu, itens, unidade):
+        registro = destino.setdefault(nome, {"chamadas": 0, "tempo_parede_s": 0.0, "tempo_cpu_s": 0.0})
+        registro["chamadas"] += 1
+        registro["tempo_parede_s"] += parede
+        registro["tempo_cpu_s"] += cpu
+        if unidade is not None:
+            registro["unidade"] = unidade
+            registro["itens"] = registro.get("itens", 0) + (itens or 0)
+        return registro
+
+    @contextmanager
+    def etapa(self, nome, unidade="itens", itens=None):
+        medicao = {"itens": itens}
+        usar_tracemalloc = "tracemalloc" in PERFIS_ATIVOS and tracemalloc.is_tracing()
+        if usar_tracemalloc:
+            tracemalloc.reset_peak()
+        self._ligar_perfil()
+        inicio_parede = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield medicao
+        finally:
+            registro = self._acumular(self.etapas, nome, time.perf_counter() - inicio_parede,
+                                      time.process_time() - inicio_cpu, medicao["itens"], unidade)
+            self._desligar_perfil()
+            registro["pico_rss_mb"] = pico_rss_mb()
+            if usar_tracemalloc:
+                pico_python = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                registro["pico_tracemalloc_mb"] = round(max(registro.get("pico_tracemalloc_mb", 0), pico_python), 2)
+
+    def _ligar_perfil(self):
+        # Etapas e funções cronometradas podem se aninhar: o perfil fica ligado até a mais externa terminar.
+        if self.perfil is not None:
+            if self._profundidade_perfil == 0:
+                self.perfil.enable()
+                self._perfil_usado = True
+            self._profundidade_perfil += 1
+
+    def _desligar_perfil(self):
+        if self.perfil is not None:
+            self._profundidade_perfil -= 1
+            if self._profundidade_perfil == 0:
+                self.perfil.disable()
+
+    def cronometrar(self, func, nome=None):
+        nome = nome or func.__qualname__
+
+        @functools.wraps(func)
+        def envoltorio(*args, **kwargs):
+            self._ligar_perfil()
+            inicio_parede = time.perf_counter()
+            inicio_cpu = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._acumular(self.funcoes, nome, time.perf_counter() - inicio_parede,
+                               time.process_time() - inicio_cpu, None, None)
+                self._desligar_perfil()
+        return envoltorio
+
+    def _com_vazao(self, registros):
+        resultado = {}
+        for nome, registro in registros.items():
+            registro = dict(registro)
+            registro["tempo_medio_ms"] = round(registro["tempo_parede_s"] * 1000 / registro["chamadas"], 4)
+            if registro.get("itens") and registro["tempo_parede_s"] > 0:
+                registro[f"{registro['unidade']}_por_s"] = round(registro["itens"] / registro["tempo_parede_s"], 2)
+            for chave in ("tempo_parede_s", "tempo_cpu_s"):
+                registro[chave] = round(registro[chave], 4)
+            resultado[nome] = registro
+        return resultado
+
+    def relatorio(self):
+        return {
+            "execucao": self.nome_execucao,
+            "iniciado_em": self.iniciado_em.isoformat(timespec="seconds"),
+            "argv": sys.argv,
+            "tempo_parede_total_s": round(time.perf_counter() - self.inicio_parede, 4),
+            "tempo_cpu_total_s": round(time.process_time() - self.inicio_cpu, 4),
+            "pico_rss_mb": pico_rss_mb(),
+            "perfis": sorted(PERFIS_ATIVOS),
+            "etapas": self._com_vazao(self.etapas),
+            "funcoes": self._com_vazao(self.funcoes),
+        }
+
+    def salvar_relatorio(self):
+        if self.nome_execucao is None or self._relatorio_salvo:
+            return self._relatorio_salvo
+        os.makedirs(PASTA_RELATORIOS, exist_ok=True)
+        base = os.path.join(PASTA_RELATORIOS, f"{self.nome_execucao}_{self.iniciado_em:%Y%m%d-%H%M%S}")
+        relatorio = self.relatorio()
+
+        if self.perfil is not None and self._perfil_usado:
+            self.perfil.dump_stats(f"{base}.prof")
+            saida = io.StringIO()
+            pstats.Stats(self.perfil, stream=saida).sort_stats("cumulative").print_stats(TOP_LINHAS_PERFIL)
+            relatorio["cprofile"] = {"arquivo": f"{base}.prof", "top_cumulativo": saida.getvalue().splitlines()}
+
+        if tracemalloc.is_tracing():
+            estatisticas = tracemalloc.take_snapshot().statistics("lineno")[:TOP_LINHAS_PERFIL]
+            relatorio["tracemalloc_top"] = [str(estatistica) for estatistica in estatisticas]
+
+        with open(f"{base}.json", 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        self._relatorio_salvo = f"{base}.json"
+        print(f"[instrumentação] Relatório de desempenho salvo em '{self._relatorio_salvo}'.")
+        return self._relatorio_salvo
+
+_coletor = Coletor()
+
+# --- API DO MÓDULO ---
+
+def iniciar(nome_execucao):
+    """Nomeia a execução e garante que o relatório seja salvo ao final do processo."""
+    _coletor.nome_execucao = nome_execucao
+    if "tracemalloc" in PERFIS_ATIVOS and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    atexit.register(_coletor.salvar_relatorio)
+
+def etapa(nome, unidade="itens", itens=None):
+    """Context manager que mede uma etapa; defina `registro["itens"]` dentro do bloco para a vazão."""
+    return _coletor.etapa(nome, unidade, itens)
+
+def cronometrar(func=None, *, nome=None):
+    """Decorador que acumula tempo e número de chamadas de uma função quente."""
+    if func is None:
+        return lambda f: _coletor.cronometrar(f, nome)
+    return _coletor.cronometrar(func, nome)
+
+def registrar(nome, parede, cpu):
+    """Acumula uma chamada medida fora deste processo (ex: em um worker de um pool) como função quente."""
+    _coletor._acumular(_coletor.funcoes, nome, parede, cpu, None, None)
+
+def salvar_relatorio():
+    return _coletor.salvar_relatorio()
+
+def relatorio():
+    return _coletor.relatorio()
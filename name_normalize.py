@@ -2,6 +2,8 @@ import os
 import re
 import sys
 
+import instrumentacao
+
 # --- CONSTANTES DE CONFIGURAÇÃO ---
 
 # Nome da pasta onde os novos arquivos padronizados serão criados.
@@ -10,6 +12,36 @@ PASTA_PADRONIZADA = "conversas_padronizadas"
 # O prefixo padrão dos arquivos de conversa do WhatsApp.
 PREFIXO_NOME_ARQUIVO = "Conversa do WhatsApp com "
 
+# Cabeçalho de cada mensagem ("dd/mm/aaaa hh:mm - Autor: "), o mesmo formato lido pelo pre_processing.py.
+PADRAO_CABECALHO = re.compile(r'^(\d{2}/\d{2}/\d{4},? \d{2}:\d{2} - )([^:\n]+):', re.MULTILINE)
+
+def anonimizar_autores(conteudo, meu_nome, nome_interlocutor, novo_rotulo):
+    """
+    Substitui os nomes reais por rótulos. MeuNome e o interlocutor do arquivo
+    têm rótulos fixos; os demais participantes (conversas em grupo) recebem
+    '<rótulo>_<n>' na ordem em que aparecem. Além do autor de cada mensagem,
+    qualquer menção a um desses nomes no corpo das mensagens (citações,
+    encaminhadas) também vira o rótulo. Retorna (conteudo_anonimizado, rotulos).
+    """
+    rotulos = {meu_nome: "MeuNome", nome_interlocutor: novo_rotulo}
+    # 1ª passada: todos os autores, para que menções anteriores à primeira mensagem de alguém também sejam cobertas.
+    for match in PADRAO_CABECALHO.finditer(conteudo):
+        autor = match.group(2).strip()
+        if autor not in rotulos:
+            rotulos[autor] = f"{novo_rotulo}_{len(rotulos) - 1}"
+
+    # 2ª passada: cabeçalhos e menções no mesmo regex; os nomes mais longos primeiro ("Ana Paula" antes de "Ana").
+    nomes = sorted((nome for nome in rotulos if nome), key=len, reverse=True)
+    mencoes = r'|(?<!\w)(' + '|'.join(map(re.escape, nomes)) + r')(?!\w)' if nomes else ''
+    padrao = re.compile(PADRAO_CABECALHO.pattern + mencoes, re.MULTILINE)
+
+    def substituir(match):
+        if match.group(1) is not None:
+            return f"{match.group(1)}{rotulos[match.group(2).strip()]}:"
+        return rotulos[match.group(3)]
+
+    return padrao.sub(substituir, conteudo), rotulos
+
 def padronizar_conversas(meu_nome, pasta_originais):
     """
     Lê arquivos de conversas de uma estrutura de pastas categorizadas,
@@ -43,19 +75,22 @@ def padronizar_conversas(meu_nome, pasta_originais):
                         nome_interlocutor = nome_arquivo.replace(PREFIXO_NOME_ARQUIVO, "").replace(".txt", "")
                         novo_rotulo = f"{categoria}{contador_categoria}"
 
-                        with open(caminho_arquivo_original, 'r', encoding='utf-8') as f_origem:
-                            conteudo = f_origem.read()
+                        with instrumentacao.etapa("anonimizacao", unidade="linhas") as registro:
+                            with open(caminho_arquivo_original, 'r', encoding='utf-8') as f_origem:
+                                conteudo = f_origem.read()
 
-                        conteudo_modificado = re.sub(rf'({re.escape(nome_interlocutor)}):', rf'{novo_rotulo}:', conteudo)
-                        conteudo_modificado = re.sub(rf'({re.escape(meu_nome)}):', r'MeuNome:', conteudo_modificado)
+                            conteudo_modificado, rotulos = anonimizar_autores(conteudo, meu_nome, nome_interlocutor, novo_rotulo)
 
-                        novo_nome_arquivo = f"{novo_rotulo}.txt"
-                        caminho_arquivo_novo = os.path.join(pasta_categoria_destino, novo_nome_arquivo)
+                            novo_nome_arquivo = f"{novo_rotulo}.txt"
+                            caminho_arquivo_novo = os.path.join(pasta_categoria_destino, novo_nome_arquivo)
 
-                        with open(caminho_arquivo_novo, 'w', encoding='utf-8') as f_destino:
-                            f_destino.write(conteudo_modificado)
+                            with open(caminho_arquivo_novo, 'w', encoding='utf-8') as f_destino:
+                                f_destino.write(conteudo_modificado)
+                            registro["itens"] = conteudo.count('\n') + 1
 
-                        print(f"  - '{nome_arquivo}' -> '{novo_nome_arquivo}'")
+                        participantes_grupo = len(rotulos) - 2
+                        sufixo = f" (grupo, {participantes_grupo} participantes anonimizados)" if participantes_grupo else ""
+                        print(f"  - '{nome_arquivo}' -> '{novo_nome_arquivo}'{sufixo}")
                         contador_categoria += 1
                     except Exception as e:
                         print(f"  - [ERRO] Falha ao processar o arquivo '{nome_arquivo}': {e}")
@@ -71,4 +106,5 @@ if __name__ == "__main__":
     MEU_NOME_ARG = sys.argv[1]
     PASTA_ORIGINAIS_ARG = sys.argv[2]
     
+    instrumentacao.iniciar("name_normalize")
     padronizar_conversas(MEU_NOME_ARG, PASTA_ORIGINAIS_ARG)
@@ -0,0 +1,270 @@
+"""
+Perfil estilométrico do dataset inteiro, calculado em uma única passada.
+
+Cada resposta humana (campo "output") atualiza, por categoria e no geral:
+  - média e variância (Welford) do tamanho em palavras e em caracteres, do
+    número de linhas e das palavras por linha;
+  - o vocabulário distinto, estimado por um HyperLogLog (memória fixa de
+    2^PRECISAO_HLL registradores, qualquer que seja o tamanho do corpus).
+
+O perfil resultante é um JSON de poucos KB. Respostas do bot são comparadas a
+ele também em fluxo, sem carregar o corpus:
+
+    python perfil_estilometrico.py dataset_final.jsonl --saida perfil_estilometrico.json
+    python perfil_estilometrico.py --perfil perfil_estilometrico.json --comparar respostas_bot.jsonl
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+
+import instrumentacao
+from formato_dados import iterar_pares
+
+# --- CONFIGURAÇÕES ---
+ARQUIVO_PERFIL = "perfil_estilometrico.json"
+PRECISAO_HLL = 12 # 4096 registradores: erro padrão de ~1,6% na contagem de palavras distintas.
+CATEGORIA_GERAL = "geral"
+PADRAO_PALAVRA = re.compile(r'\w+')
+
+# --- Estatísticas em Fluxo ---
+
+class Welford:
+    """Média e variância em uma passada (algoritmo de Welford), sem guardar os valores."""
+
+    def __init__(self, n=0, media=0.0, m2=0.0):
+        self.n, self.media, self.m2 = n, media, m2
+
+    def atualizar(self, valor):
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+
+    @property
+    def variancia(self):
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def desvio(self):
+        return math.sqrt(self.variancia)
+
+    def para_dict(self):
+        return {"n": self.n, "media": self.media, "m2": self.m2}
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(dados["n"], dados["media"], dados["m2"])
+
+class HyperLogLog:
+    """
+    Contador aproximado de elementos distintos. Cada palavra vira um hash de
+    64 bits: os PRECISAO_HLL primeiros bits escolhem o registrador e o
+    registrador guarda a maior posição do primeiro bit 1 no restante.
+    """
+
+    def __init__(self, precisao=PRECISAO_HLL, registradores=None):
+        self.precisao = precisao
+        self.m = 1 << precisao
+        self.registradores = registradores if registradores is not None else bytearray(self.m)
+        self._restante = 64 - precisao
+
+    def posicoes(self, elementos):
+        """(registrador, posição) de cada elemento; calculado uma vez e aplicável a vários contadores."""
+        resultado = []
+        mascara = (1 << self._restante) - 1
+        for elemento in elementos:
+            valor = int.from_bytes(hashlib.blake2b(elemento.encode("utf-8"), digest_size=8).digest(), "big")
+            resultado.append((valor >> self._restante, self._restante - (valor & mascara).bit_length() + 1))
+        return resultado
+
+    def registrar(self, posicoes):
+        registradores = self.registradores
+        for indice, posicao in posicoes:
+            if posicao > registradores[indice]:
+                registradores[indice] = posicao
+
+    def adicionar(self, elemento):
+        self.registrar(self.posicoes([elemento]))
+
+    def estimar(self):
+        alfa = 0.7213 / (1 + 1.079 / self.m)
+        estimativa = alfa * self.m * self.m / sum(2.0 ** -r for r in self.registradores)
+        vazios = self.registradores.count(0)
+        if estimativa <= 2.5 * self.m and vazios:
+            # Correção para poucos elementos: contagem linear sobre os registradores vazios.
+            return self.m * math.log(self.m / vazios)
+        return estimativa
+
+    def para_dict(self):
+        return {"precisao": self.precisao, "registradores": base64.b64encode(bytes(self.registradores)).decode("ascii")}
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(dados["precisao"], bytearray(base64.b64decode(dados["registradores"])))
+
+# --- Perfil de um Conjunto de Textos ---
+
+METRICAS = ["palavras", "caracteres", "linhas", "palavras_por_linha"]
+
+class PerfilTextos:
+    """Acumula as métricas de estilo de uma sequência de textos em memória constante."""
+
+    def __init__(self, precisao=PRECISAO_HLL):
+        self.metricas = {nome: Welford() for nome in METRICAS}
+        self.vocabulario = HyperLogLog(precisao)
+        self.total_palavras = 0
+
+    def medir(self, texto):
+        """Medidas de um texto, independentes do perfil: podem ser somadas a vários perfis."""
+        palavras = PADRAO_PALAVRA.findall(texto.lower())
+        return {
+            "palavras": len(palavras),
+            "caracteres": len(texto),
+            "linhas": texto.count('\n') + 1,
+            "palavras_por_linha": [len(PADRAO_PALAVRA.findall(linha)) for linha in texto.split('\n') if linha.strip()],
+            # Palavras repetidas no mesmo texto são hasheadas uma vez só.
+            "vocabulario": self.vocabulario.posicoes(set(palavras)),
+        }
+
+    def somar(self, medidas):
+        for nome in ("palavras", "caracteres", "linhas"):
+            self.metricas[nome].atualizar(medidas[nome])
+        for valor in medidas["palavras_por_linha"]:
+            self.metricas["palavras_por_linha"].atualizar(valor)
+        self.vocabulario.registrar(medidas["vocabulario"])
+        self.total_palavras += medidas["palavras"]
+
+    def adicionar(self, texto):
+        self.somar(self.medir(texto))
+
+    def resumo(self):
+        """
+        Médias, desvios e riqueza lexical. O C de Herdan (log V / log N) depende
+        pouco do tamanho do corpus, ao contrário do TTR.
+        """
+        vocabulario = self.vocabulario.estimar()
+        resumo = {"textos": self.metricas["palavras"].n, "total_palavras": self.total_palavras,
+                  "vocabulario_estimado": round(vocabulario)}
+        for nome, welford in self.metricas.items():
+            resumo[f"{nome}_media"] = welford.media
+            resumo[f"{nome}_desvio"] = welford.desvio
+        resumo["ttr"] = vocabulario / self.total_palavras if self.total_palavras else 0.0
+        resumo["herdan_c"] = (math.log(vocabulario) / math.log(self.total_palavras)
+                              if self.total_palavras > 1 and vocabulario > 1 else 0.0)
+        return resumo
+
+    def para_dict(self):
+        return {"metricas": {nome: w.para_dict() for nome, w in self.metricas.items()},
+                "vocabulario": self.vocabulario.para_dict(), "total_palavras": self.total_palavras}
+
+    @classmethod
+    def de_dict(cls, dados):
+        perfil = cls(dados["vocabulario"]["precisao"])
+        perfil.metricas = {nome: Welford.de_dict(w) for nome, w in dados["metricas"].items()}
+        perfil.vocabulario = HyperLogLog.de_dict(dados["vocabulario"])
+        perfil.total_palavras = dados["total_palavras"]
+        return perfil
+
+def ler_textos(caminho, campo):
+    """Gera (categoria, texto) de cada registro do JSONL/Parquet, sem carregar o arquivo inteiro."""
+    for registro in iterar_pares(caminho, colunas=["categoria", campo]):
+        yield registro.get("categoria"), registro[campo]
+
+@instrumentacao.cronometrar
+def perfilar(textos, precisao=PRECISAO_HLL):
+    """Constrói os perfis por categoria (e o geral) a partir de um iterável de (categoria, texto)."""
+    perfis = {CATEGORIA_GERAL: PerfilTextos(precisao)}
+    for categoria, texto in textos:
+        medidas = perfis[CATEGORIA_GERAL].medir(texto)
+        perfis[CATEGORIA_GERAL].somar(medidas)
+        if categoria is not None:
+            if categoria not in perfis:
+                perfis[categoria] = PerfilTextos(precisao)
+            perfis[categoria].somar(medidas)
+    return perfis
+
+def salvar_perfil(perfis, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({categoria: {"resumo": perfil.resumo(), "estado": perfil.para_dict()}
+                   for categoria, perfil in perfis.items()}, f, ensure_ascii=False, indent=2)
+
+def carregar_perfil(caminho):
+    if not os.path.exists(caminho):
+        print(f"ERRO: Arquivo de perfil '{caminho}' não encontrado.")
+        sys.exit(1)
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return {categoria: PerfilTextos.de_dict(dados["estado"]) for categoria, dados in json.load(f).items()}
+
+# --- Comparação com as Respostas do Bot ---
+
+def comparar(referencia, perfil_bot):
+    """
+    Compara o resumo do bot com o de referência. Para as métricas com média e
+    desvio, o z-score indica quantos desvios da referência separam as médias.
+    Retorna uma lista de (métrica, referência, bot, z-score ou None).
+    """
+    ref, bot = referencia.resumo(), perfil_bot.resumo()
+    linhas = []
+    for nome in METRICAS:
+        desvio = ref[f"{nome}_desvio"]
+        z = (bot[f"{nome}_media"] - ref[f"{nome}_media"]) / desvio if desvio else None
+        linhas.append((f"{nome} (média)", ref[f"{nome}_media"], bot[f"{nome}_media"], z))
+    linhas.append(("riqueza lexical (C de Herdan)", ref["herdan_c"], bot["herdan_c"], None))
+    return linhas
+
+def formatar_comparacao(linhas, rotulo_bot="Bot"):
+    saida = [f"{'Métrica':<32} {'Referência':>11} {rotulo_bot:>11} {'z':>7}"]
+    for nome, ref, bot, z in linhas:
+        saida.append(f"{nome:<32} {ref:>11.3f} {bot:>11.3f} {'' if z is None else f'{z:+.2f}':>7}")
+    return "\n".join(saida)
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Perfil estilométrico do dataset (Welford + HyperLogLog) e comparação com respostas do bot.",
+        epilog="Exemplo: python perfil_estilometrico.py dataset_final.jsonl --saida perfil_estilometrico.json"
+    )
+    parser.add_argument("dataset", nargs="?", default=None,
+                        help="JSONL ou Parquet com as respostas humanas (campo 'output').")
+    parser.add_argument("--saida", default=ARQUIVO_PERFIL)
+    parser.add_argument("--perfil", default=None, help="Perfil já salvo; dispensa reler o dataset.")
+    parser.add_argument("--comparar", default=None,
+                        help="Registros de respostas do bot (registro_geracoes: campo 'texto') a comparar com o perfil.")
+    parser.add_argument("--categoria", default=CATEGORIA_GERAL, help="Categoria do perfil usada na comparação.")
+    args = parser.parse_args()
+
+    if args.dataset is None and args.perfil is None:
+        print("ERRO: Informe o dataset ou um --perfil já salvo.")
+        sys.exit(1)
+    for caminho in (args.dataset, args.comparar):
+        if caminho is not None and not os.path.exists(caminho):
+            print(f"ERRO: Arquivo '{caminho}' não encontrado.")
+            sys.exit(1)
+
+    instrumentacao.iniciar("perfil_estilometrico")
+    if args.perfil is not None:
+        perfis = carregar_perfil(args.perfil)
+    else:
+        with instrumentacao.etapa("perfil_dataset", unidade="textos") as registro:
+            perfis = perfilar(ler_textos(args.dataset, "output"))
+            registro["itens"] = perfis[CATEGORIA_GERAL].metricas["palavras"].n
+        salvar_perfil(perfis, args.saida)
+        print(f"Perfil de {perfis[CATEGORIA_GERAL].metricas['palavras'].n} respostas "
+              f"({len(perfis) - 1} categorias) salvo em '{args.saida}'.")
+        for categoria, perfil in perfis.items():
+            resumo = perfil.resumo()
+            print(f"  - {categoria}: {resumo['textos']} respostas, {resumo['palavras_media']:.1f} palavras "
+                  f"(dp {resumo['palavras_desvio']:.1f}), vocabulário ~{resumo['vocabulario_estimado']}")
+
+    if args.comparar is not None:
+        if args.categoria not in perfis:
+            print(f"ERRO: Categoria '{args.categoria}' não existe no perfil ({', '.join(perfis)}).")
+            sys.exit(1)
+        bot = perfilar((None, texto) for _, texto in ler_textos(args.comparar, "texto"))[CATEGORIA_GERAL]
+        print(f"\nComparação com '{args.comparar}' (categoria '{args.categoria}'):")
+        print(formatar_comparacao(comparar(perfis[args.categoria], bot)))
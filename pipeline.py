@@ -0,0 +1,304 @@
+"""
+Executor do pipeline Doppelbot (substitui a lógica do run_pipeline.sh/.bat).
+
+Cada etapa declara o comando, os arquivos/pastas de entrada, os scripts de
+que depende e as saídas. A chave de uma etapa é o hash do conteúdo das
+entradas, do código e dos argumentos: se a chave não mudou desde a última
+execução bem-sucedida e as saídas existem, a etapa é pulada. Como as entradas
+de uma etapa são as saídas da anterior, uma etapa que roda de novo mas gera o
+mesmo conteúdo não invalida as seguintes.
+
+As dependências saem das próprias declarações (a etapa que produz um arquivo
+roda antes das que o leem). Etapas independentes, como as avaliações, rodam
+em paralelo. No fim é mostrado um resumo com o tempo de cada etapa.
+
+    python pipeline.py "Seu Nome" conversas_originais descricao.txt
+    python pipeline.py "Seu Nome" conversas_originais descricao.txt --perguntas perguntas_teste.txt
+"""
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# --- CONFIGURAÇÕES ---
+ARQUIVO_ESTADO = ".pipeline_estado.json"
+TAMANHO_BLOCO_HASH = 1 << 20
+ETAPAS_PARALELAS = 2
+
+class Etapa:
+    def __init__(self, nome, script, argumentos=(), entradas=(), saidas=(), codigo=(), descricao=""):
+        self.nome = nome
+        self.script = script
+        self.argumentos = list(argumentos)
+        self.entradas = list(entradas)
+        self.saidas = list(saidas)
+        self.codigo = [script, *codigo]
+        self.descricao = descricao
+
+    def comando(self):
+        return [sys.executable, self.script, *self.argumentos]
+
+def montar_etapas(nome, pasta_origem, descricao, perguntas=None, argumentos_extras=None, formato="jsonl"):
+    """
+    Declara as etapas do pipeline. As de avaliação só entram se houver um
+    arquivo de perguntas. `formato` (jsonl ou parquet) vale para os datasets entre as etapas.
+    """
+    extras = argumentos_extras or {}
+    adaptadores = "doppelbot-llama3-8b-instruct-adapters"
+    final, validacao = f"dataset_final.{formato}", f"dataset_validacao.{formato}"
+    instruct, instruct_validacao = f"dataset_instruct.{formato}", f"dataset_instruct_validacao.{formato}"
+    etapas = [
+        Etapa("normalizacao", "name_normalize.py", [nome, pasta_origem],
+              entradas=[pasta_origem], saidas=["conversas_padronizadas"],
+              codigo=["instrumentacao.py"], descricao="Normalizando nomes e anonimizando"),
+        Etapa("pre_processamento", "pre_processing.py", ["--formato", formato, *extras.get("pre_processamento", [])],
+              entradas=["conversas_padronizadas"], saidas=[final, validacao],
+              codigo=["deduplicacao.py", "formato_dados.py", "indice_dias.py", "instrumentacao.py"],
+              descricao="Gerando o dataset base"),
+        Etapa("instrucoes", "add_instruction.py", [descricao, "--formato", formato, *extras.get("instrucoes", [])],
+              entradas=[descricao, final, validacao], saidas=[instruct, instruct_validacao],
+              codigo=["formato_dados.py", "instrumentacao.py"], descricao="Injetando a persona"),
+        Etapa("fine_tuning", "fine_tuning.py", extras.get("fine_tuning", []),
+              entradas=[instruct, instruct_validacao], saidas=[adaptadores],
+              codigo=["add_instruction.py", "autoajuste_lote.py", "formato_dados.py", "instrumentacao.py"],
+              descricao="Fine-tuning do modelo (pode levar horas)"),
+        Etapa("perfil_estilometrico", "perfil_estilometrico.py", [final],
+              entradas=[final], saidas=["perfil_estilometrico.json"],
+              codigo=["formato_dados.py", "instrumentacao.py"], descricao="Perfil estilométrico do dataset"),
+    ]
+    if perguntas:
+        codigo_geracao = ["backend_inferencia.py", "decodificacao_especulativa.py", "formato_dados.py", "geracao.py",
+                          "registro_geracoes.py",
+                          "instrumentacao.py"]
+        etapas += [
+            Etapa("avaliacao_doppelbot", "avaliar_personalidade.py",
+                  [descricao, perguntas, "respostas_bot.jsonl", "--semente", "42", *extras.get("avaliacao", [])],
+                  entradas=[descricao, perguntas, adaptadores], saidas=["respostas_bot.jsonl"],
+                  codigo=codigo_geracao, descricao="Respostas do Doppelbot ao teste de personalidade"),
+            Etapa("avaliacao_baseline", "avaliar_baseline.py",
+                  [perguntas, "respostas_baseline.jsonl", "--semente", "42", *extras.get("avaliacao", [])],
+                  entradas=[perguntas], saidas=["respostas_baseline.jsonl"],
+                  codigo=codigo_geracao, descricao="Respostas do modelo base ao teste de personalidade"),
+        ]
+    return etapas
+
+# --- Hash de Conteúdo ---
+
+class HashesConteudo:
+    """
+    Hash SHA-256 de arquivos e pastas. O hash de cada arquivo é memorizado
+    pelo (tamanho, data de modificação): arquivos grandes que não mudaram
+    (como os pesos dos adaptadores) não são relidos a cada execução.
+    """
+
+    def __init__(self, memoria=None):
+        self.memoria = memoria or {}
+        self._trava = threading.Lock()
+
+    def _arquivo(self, caminho):
+        info = os.stat(caminho)
+        assinatura = [info.st_size, info.st_mtime_ns]
+        with self._trava:
+            anterior = self.memoria.get(caminho)
+        if anterior and anterior[:2] == assinatura:
+            return anterior[2]
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            while bloco := f.read(TAMANHO_BLOCO_HASH):
+                sha.update(bloco)
+        with self._trava:
+            self.memoria[caminho] = [*assinatura, sha.hexdigest()]
+        return sha.hexdigest()
+
+    def hash(self, caminho):
+        """Hash do conteúdo de um arquivo, ou dos caminhos relativos e conteúdos de uma pasta (None se não existir)."""
+        if os.path.isfile(caminho):
+            return self._arquivo(caminho)
+        if not os.path.isdir(caminho):
+            return None
+        sha = hashlib.sha256()
+        for raiz, pastas, arquivos in os.walk(caminho):
+            pastas.sort()
+            for nome in sorted(arquivos):
+                completo = os.path.join(raiz, nome)
+                sha.update(os.path.relpath(completo, caminho).encode("utf-8"))
+                sha.update(self._arquivo(completo).encode("ascii"))
+        return sha.hexdigest()
+
+    def chave(self, etapa):
+        conteudo = {
+            "comando": etapa.argumentos,
+            "entradas": {caminho: self.hash(caminho) for caminho in etapa.entradas},
+            "codigo": {caminho: self.hash(caminho) for caminho in etapa.codigo},
+        }
+        return hashlib.sha256(json.dumps(conteudo, sort_keys=True).encode("utf-8")).hexdigest()
+
+def carregar_estado(caminho=ARQUIVO_ESTADO):
+    if os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"etapas": {}, "hashes": {}}
+
+def salvar_estado(estado, caminho=ARQUIVO_ESTADO):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+
+# --- Execução do Grafo ---
+
+def dependencias(etapas):
+    """Para cada etapa, as etapas que produzem alguma das suas entradas."""
+    produtor = {saida: etapa.nome for etapa in etapas for saida in etapa.saidas}
+    return {etapa.nome: {produtor[e] for e in etapa.entradas if e in produtor and produtor[e] != etapa.nome}
+            for etapa in etapas}
+
+def _executar(etapa, trava_saida):
+    """Roda a etapa em um subprocesso, prefixando cada linha da saída com o nome da etapa."""
+    for saida in etapa.saidas:
+        # Registros .jsonl são acrescentados: a saída antiga é removida para não misturar execuções.
+        if os.path.isfile(saida):
+            os.remove(saida)
+    processo = subprocess.Popen(etapa.comando(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, encoding='utf-8', errors='replace', bufsize=1,
+                                env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    for linha in processo.stdout:
+        with trava_saida:
+            print(f"[{etapa.nome}] {linha}", end="")
+    return processo.wait()
+
+def executar_pipeline(etapas, paralelas=ETAPAS_PARALELAS, forcar=(), caminho_estado=ARQUIVO_ESTADO):
+    """
+    Executa as etapas em ordem topológica, com até `paralelas` etapas
+    independentes ao mesmo tempo. Retorna o resumo (nome -> {situacao, tempo_s}).
+    """
+    estado = carregar_estado(caminho_estado)
+    hashes = HashesConteudo(estado.get("hashes"))
+    deps = dependencias(etapas)
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    pendentes = [etapa.nome for etapa in etapas]
+    resumo, em_execucao = {}, {}
+    trava_saida = threading.Lock()
+
+    def concluida(nome):
+        return resumo.get(nome, {}).get("situacao") in ("executada", "pulada")
+
+    with ThreadPoolExecutor(max_workers=max(1, paralelas)) as pool:
+        while pendentes or em_execucao:
+            restantes = len(pendentes)
+            for nome in list(pendentes):
+                if any(resumo.get(dep, {}).get("situacao") in ("falhou", "cancelada") for dep in deps[nome]):
+                    resumo[nome] = {"situacao": "cancelada", "tempo_s": 0.0}
+                    pendentes.remove(nome)
+                elif all(concluida(dep) for dep in deps[nome]) and len(em_execucao) < max(1, paralelas):
+                    pendentes.remove(nome)
+                    etapa = por_nome[nome]
+                    chave = hashes.chave(etapa)
+                    atualizada = all(hashes.hash(saida) is not None for saida in etapa.saidas)
+                    if nome not in forcar and estado["etapas"].get(nome) == chave and atualizada:
+                        with trava_saida:
+                            print(f">>> {nome}: entradas sem mudança, pulando.")
+                        resumo[nome] = {"situacao": "pulada", "tempo_s": 0.0}
+                        continue
+                    with trava_saida:
+                        print(f">>> {nome}: {etapa.descricao}...")
+                    em_execucao[pool.submit(_executar, etapa, trava_saida)] = (nome, chave, time.perf_counter())
+            if not em_execucao:
+                if len(pendentes) == restantes:
+                    # Nada ficou pronto e nada está rodando: sobrou um ciclo nas declarações.
+                    for nome in pendentes:
+                        resumo[nome] = {"situacao": "cancelada", "tempo_s": 0.0}
+                    break
+                continue
+
+            terminadas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                nome, chave, inicio = em_execucao.pop(futuro)
+                duracao = time.perf_counter() - inicio
+                try:
+                    codigo = futuro.result()
+                except OSError as e:
+                    print(f"ERRO: Não foi possível iniciar a etapa '{nome}': {e}")
+                    codigo = 1
+                if codigo == 0:
+                    resumo[nome] = {"situacao": "executada", "tempo_s": duracao}
+                    estado["etapas"][nome] = chave
+                else:
+                    resumo[nome] = {"situacao": "falhou", "tempo_s": duracao}
+                    estado["etapas"].pop(nome, None)
+                print(f">>> {nome}: {resumo[nome]['situacao']} em {duracao:.1f}s.")
+                estado["hashes"] = hashes.memoria
+                salvar_estado(estado, caminho_estado)
+    return resumo
+
+def imprimir_resumo(resumo, duracao_total):
+    print("\n" + "-" * 50)
+    print(f"{'Etapa':<24} {'Situação':<12} {'Tempo':>10}")
+    for nome, info in resumo.items():
+        print(f"{nome:<24} {info['situacao']:<12} {info['tempo_s']:>9.1f}s")
+    print(f"{'Total (parede)':<24} {'':<12} {duracao_total:>9.1f}s")
+    print("Relatórios de desempenho de cada etapa em 'relatorios_execucao/'.")
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pipeline Doppelbot: normalização, pré-processamento, persona, fine-tuning e avaliações. "
+                    "Etapas cujas entradas não mudaram são puladas.",
+        epilog="Exemplo: python pipeline.py \"Augusto\" conversas_originais descricao.txt --perguntas perguntas_teste.txt"
+    )
+    parser.add_argument("nome", help="Seu nome, como aparece nas conversas.")
+    parser.add_argument("pasta_origem", help="Pasta com as conversas originais exportadas do WhatsApp.")
+    parser.add_argument("descricao", help="Arquivo de descrição da persona.")
+    parser.add_argument("--perguntas", default=None,
+                        help="Arquivo de perguntas do teste de personalidade; ativa as etapas de avaliação.")
+    parser.add_argument("--formato", choices=["jsonl", "parquet"], default="jsonl",
+                        help="Formato dos datasets entre as etapas (parquet: colunar com zstd).")
+    parser.add_argument("--paralelas", type=int, default=ETAPAS_PARALELAS,
+                        help="Etapas independentes executadas ao mesmo tempo.")
+    parser.add_argument("--forcar", nargs="*", default=None, metavar="ETAPA",
+                        help="Executa as etapas indicadas (ou todas, sem nomes) mesmo sem mudança nas entradas.")
+    parser.add_argument("--argumentos", nargs=2, action="append", default=[], metavar=("ETAPA", "ARGS"),
+                        help="Argumentos extras de uma etapa (pre_processamento, instrucoes, fine_tuning ou "
+                             "avaliacao), ex: --argumentos fine_tuning \"--autoajuste\".")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pasta_origem):
+        print(f"ERRO: A pasta de origem '{args.pasta_origem}' não foi encontrada.")
+        sys.exit(1)
+    for caminho in (args.descricao, args.perguntas):
+        if caminho is not None and not os.path.isfile(caminho):
+            print(f"ERRO: O arquivo '{caminho}' não foi encontrado.")
+            sys.exit(1)
+
+    extras = {}
+    for etapa, argumentos in args.argumentos:
+        extras.setdefault(etapa, []).extend(shlex.split(argumentos))
+    etapas = montar_etapas(args.nome, args.pasta_origem, args.descricao, args.perguntas, extras, args.formato)
+    nomes = {etapa.nome for etapa in etapas}
+    desconhecidas = (set(extras) - nomes - {"avaliacao"}) | (set(args.forcar or []) - nomes)
+    if desconhecidas:
+        print(f"ERRO: Etapa(s) desconhecida(s): {', '.join(sorted(desconhecidas))}. Etapas: {', '.join(nomes)}.")
+        sys.exit(1)
+    forcar = nomes if args.forcar == [] else set(args.forcar or [])
+
+    print("=================================================")
+    print("  PIPELINE COMPLETO DOPPELBOT")
+    print("=================================================")
+    print(f"Usuário a ser imitado: {args.nome}")
+    print(f"Pasta de origem: {args.pasta_origem}")
+    print(f"Arquivo de Persona: {args.descricao}")
+    print("-------------------------------------------------")
+
+    inicio = time.perf_counter()
+    resumo = executar_pipeline(etapas, args.paralelas, forcar)
+    imprimir_resumo(resumo, time.perf_counter() - inicio)
+
+    if any(info["situacao"] in ("falhou", "cancelada") for info in resumo.values()):
+        print("ERRO FATAL: o pipeline não foi concluído.")
+        sys.exit(1)
+    print("PIPELINE CONCLUÍDO COM SUCESSO!")
+    print("Os adaptadores do seu Doppelbot estão na pasta 'doppelbot-llama3-8b-instruct-adapters'.")
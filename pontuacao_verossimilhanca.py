@@ -0,0 +1,264 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+import torch
+import torch.nn.functional as F
+
+import instrumentacao
+from add_instruction import carregar_template_de_arquivo, formatar_conversa_para_treino
+from formato_dados import iterar_pares, resolver_caminho
+
+# --- CONFIGURAÇÕES ---
+BASE_MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
+ADAPTERS_PATH = "doppelbot-llama3-8b-instruct-adapters"
+DATASET_FILE = "dataset_validacao.jsonl" # Pares separados pelo pre_processing.py, nunca vistos no treino
+OUTPUT_FILE = "pontuacao_resultados.txt"
+OUTPUT_EXEMPLOS = "pontuacao_exemplos.jsonl"
+NOME_BASE = "base"
+
+# --- Preparação dos Exemplos ---
+
+def carregar_amostras(caminho, n, semente):
+    """Carrega os pares do dataset e sorteia `n` deles (0 = todos) de forma reprodutível."""
+    caminho = resolver_caminho(caminho) # O .parquet, se a Etapa 2 gravou nesse formato.
+    if not os.path.exists(caminho):
+        print(f"ERRO: Arquivo de dataset '{caminho}' não encontrado.")
+        sys.exit(1)
+    dados = [d for d in iterar_pares(caminho) if d.get("input") and d.get("output")]
+    if n and n < len(dados):
+        dados = random.Random(semente).sample(dados, n)
+    return dados
+
+def tokenizar_exemplos(exemplos, tokenizer, template):
+    """
+    Tokeniza cada par no mesmo formato de texto usado no fine-tuning. Apenas os
+    tokens da resposta humana ('output') entram na pontuação; o prompt serve de
+    contexto.
+    """
+    tokenizados = []
+    for i, exemplo in enumerate(exemplos):
+        categoria = exemplo.get("categoria", "desconhecido")
+        # No modo de contexto do pre_processing.py o prompt inclui as mensagens anteriores.
+        contexto = exemplo["mensagens"][:-1] if exemplo.get("mensagens") else [{"role": "user", "content": exemplo["input"]}]
+        conversa = [{"role": "system", "content": template.format(categoria=categoria)}] + contexto
+        prompt = formatar_conversa_para_treino(conversa) + "\n<|assistant|>\n"
+        ids_prompt = tokenizer(prompt, add_special_tokens=True)["input_ids"]
+        ids_resposta = tokenizer(exemplo["output"], add_special_tokens=False)["input_ids"]
+        if not ids_resposta:
+            continue
+        tokenizados.append({
+            "indice": i,
+            "categoria": categoria,
+            "ids": ids_prompt + ids_resposta,
+            "inicio_resposta": len(ids_prompt),
+        })
+    return tokenizados
+
+def montar_lotes(tokenizados, tokens_por_lote, lote_maximo):
+    """
+    Agrupa os exemplos ordenados por comprimento em lotes dinâmicos: cada lote
+    cresce enquanto (exemplos x maior comprimento) couber em `tokens_por_lote`,
+    o que reduz o padding ao mínimo. Os lotes mais longos vêm primeiro para que
+    uma falta de memória apareça logo no início.
+    """
+    ordenados = sorted(tokenizados, key=lambda t: len(t["ids"]), reverse=True)
+    lotes, atual = [], []
+    for item in ordenados:
+        maior = len(atual[0]["ids"]) if atual else len(item["ids"])
+        if atual and ((len(atual) + 1) * maior > tokens_por_lote or len(atual) >= lote_maximo):
+            lotes.append(atual)
+            atual = []
+        atual.append(item)
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+# --- Pontuação ---
+
+def pontuar_lote(model, lote, pad_id):
+    """
+    Uma única passada forward (teacher forcing) por lote. Retorna, para cada
+    exemplo, a soma do log-negativo da verossimilhança dos tokens da resposta.
+    Só os logits a partir do primeiro token de resposta do lote são calculados
+    (logits_to_keep), evitando projetar o prompt inteiro no vocabulário.
+    """
+    comprimento = max(len(item["ids"]) for item in lote)
+    ids = torch.full((len(lote), comprimento), pad_id, dtype=torch.long)
+    mascara = torch.zeros((len(lote), comprimento), dtype=torch.long)
+    for linha, item in enumerate(lote):
+        ids[linha, :len(item["ids"])] = torch.tensor(item["ids"])
+        mascara[linha, :len(item["ids"])] = 1
+    ids, mascara = ids.to(model.device), mascara.to(model.device)
+
+    # O logit da posição p prevê o token p + 1; o primeiro token de resposta do lote
+    # é previsto pela posição (menor início de resposta - 1).
+    primeira_posicao = min(item["inicio_resposta"] for item in lote) - 1
+    manter = comprimento - primeira_posicao
+    with torch.no_grad():
+        logits = model(input_ids=ids, attention_mask=mascara, logits_to_keep=manter).logits
+
+    alvos = ids[:, primeira_posicao + 1:]
+    nll = F.cross_entropy(logits[:, :-1].float().transpose(1, 2), alvos, reduction="none")
+
+    posicoes = torch.arange(primeira_posicao + 1, comprimento, device=ids.device)
+    inicios = torch.tensor([item["inicio_resposta"] for item in lote], device=ids.device)
+    pontuados = (posicoes[None, :] >= inicios[:, None]) & mascara[:, primeira_posicao + 1:].bool()
+
+    somas = (nll * pontuados).sum(dim=1).tolist()
+    contagens = pontuados.sum(dim=1).tolist()
+    return list(zip(somas, contagens))
+
+def pontuar_modelo(model, lotes, pad_id, rotulo):
+    """Pontua todos os lotes com o modelo no estado atual; retorna {indice: (nll, tokens)}."""
+    resultados = {}
+    with instrumentacao.etapa(f"pontuacao_{rotulo}", unidade="tokens") as registro:
+        inicio = time.perf_counter()
+        for num, lote in enumerate(lotes, start=1):
+            for item, resultado in zip(lote, pontuar_lote(model, lote, pad_id)):
+                resultados[item["indice"]] = resultado
+            print(f"\r[{rotulo}] Lote {num}/{len(lotes)}", end="", flush=True)
+        registro["itens"] = sum(tokens for _, tokens in resultados.values())
+        print(f" — {time.perf_counter() - inicio:.1f}s")
+    return resultados
+
+def perplexidade(nll_total, tokens):
+    return math.exp(nll_total / tokens) if tokens else float("nan")
+
+# --- Carregamento do Modelo ---
+
+def nomes_adaptadores(caminhos):
+    """Nome curto e único para cada pasta de adaptadores (ex: 'checkpoint-500')."""
+    nomes = []
+    for caminho in caminhos:
+        nome = os.path.basename(os.path.normpath(caminho)) or "adaptador"
+        while nome in nomes or nome == NOME_BASE:
+            nome += "_"
+        nomes.append(nome)
+    return nomes
+
+def carregar_modelo_com_adaptadores(caminhos, nomes):
+    """Carrega o modelo base uma única vez e anexa todos os adaptadores a ele."""
+    from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+    from peft import PeftModel
+
+    for caminho in caminhos:
+        if not os.path.isdir(caminho):
+            print(f"ERRO: Pasta de adaptadores '{caminho}' não encontrada.")
+            sys.exit(1)
+
+    print("Carregando modelo e tokenizador...")
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16
+    )
+    model = AutoModelForCausalLM.from_pretrained(
+        BASE_MODEL_ID,
+        quantization_config=bnb_config,
+        device_map="auto",
+        torch_dtype=torch.bfloat16
+    )
+    tokenizer = AutoTokenizer.from_pretrained(caminhos[0])
+    if "<|msg_sep|>" not in tokenizer.get_vocab():
+        tokenizer.add_special_tokens({'additional_special_tokens': ['<|msg_sep|>']})
+    if len(tokenizer) != model.get_input_embeddings().weight.shape[0]:
+        model.resize_token_embeddings(len(tokenizer))
+
+    print(f"Carregando adaptadores LoRA: {', '.join(caminhos)}")
+    model = PeftModel.from_pretrained(model, caminhos[0], adapter_name=nomes[0])
+    for caminho, nome in zip(caminhos[1:], nomes[1:]):
+        model.load_adapter(caminho, adapter_name=nome)
+    return model.eval(), tokenizer
+
+# --- Relatório ---
+
+def montar_tabela(exemplos, resultados, rotulos):
+    """Perplexidade por categoria e total, agregada sobre tokens (exp da NLL média)."""
+    linhas = []
+    categorias = sorted({exemplos[i].get("categoria", "desconhecido") for i in resultados[rotulos[0]]})
+    for categoria in categorias + ["TOTAL"]:
+        indices = [i for i in resultados[rotulos[0]]
+                   if categoria == "TOTAL" or exemplos[i].get("categoria", "desconhecido") == categoria]
+        linha = {"Categoria": categoria, "Exemplos": len(indices),
+                 "Tokens": sum(resultados[rotulos[0]][i][1] for i in indices)}
+        for rotulo in rotulos:
+            nll = sum(resultados[rotulo][i][0] for i in indices)
+            linha[f"PPL {rotulo}"] = perplexidade(nll, linha["Tokens"])
+        linhas.append(linha)
+    return pd.DataFrame(linhas).round(3)
+
+def salvar_exemplos(caminho, exemplos, resultados, rotulos):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for i in sorted(resultados[rotulos[0]]):
+            registro = {"categoria": exemplos[i].get("categoria", "desconhecido"),
+                        "input": exemplos[i]["input"], "output": exemplos[i]["output"],
+                        "tokens": resultados[rotulos[0]][i][1]}
+            for rotulo in rotulos:
+                nll, tokens = resultados[rotulo][i]
+                registro[f"nll_{rotulo}"] = round(nll, 4)
+                registro[f"ppl_{rotulo}"] = round(perplexidade(nll, tokens), 4)
+            f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede a perplexidade das respostas humanas reais (teacher forcing) com o modelo base e com os adaptadores.",
+        epilog="Exemplo: python pontuacao_verossimilhanca.py descricao.txt --amostras 500 "
+               "--adaptadores results/checkpoint-500 doppelbot-llama3-8b-instruct-adapters"
+    )
+    parser.add_argument("caminho_descricao", help="Template do prompt de sistema usado no treino.")
+    parser.add_argument("--dataset", default=DATASET_FILE)
+    parser.add_argument("--amostras", type=int, default=500, help="Pares sorteados do dataset (0 = todos).")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--adaptadores", nargs="+", default=[ADAPTERS_PATH],
+                        help="Uma ou mais pastas de adaptadores/checkpoints, pontuadas na mesma carga do modelo.")
+    parser.add_argument("--sem-base", action="store_true", help="Não pontua o modelo base sem adaptadores.")
+    parser.add_argument("--tokens-por-lote", type=int, default=4096,
+                        help="Limite de tokens (com padding) por lote dinâmico.")
+    parser.add_argument("--lote-maximo", type=int, default=64)
+    parser.add_argument("--saida", default=OUTPUT_FILE)
+    parser.add_argument("--saida-exemplos", default=OUTPUT_EXEMPLOS)
+    args = parser.parse_args()
+    instrumentacao.iniciar("pontuacao_verossimilhanca")
+
+    template = carregar_template_de_arquivo(args.caminho_descricao)
+    exemplos = carregar_amostras(args.dataset, args.amostras, args.semente)
+    print(f"{len(exemplos)} pares selecionados de '{args.dataset}'.")
+
+    nomes = nomes_adaptadores(args.adaptadores)
+    with instrumentacao.etapa("carregamento_modelo"):
+        model, tokenizer = carregar_modelo_com_adaptadores(args.adaptadores, nomes)
+
+    with instrumentacao.etapa("tokenizacao", unidade="exemplos") as registro:
+        tokenizados = tokenizar_exemplos(exemplos, tokenizer, template)
+        lotes = montar_lotes(tokenizados, args.tokens_por_lote, args.lote_maximo)
+        registro["itens"] = len(tokenizados)
+    print(f"{len(tokenizados)} exemplos em {len(lotes)} lotes dinâmicos.")
+
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    resultados = {}
+    if not args.sem_base:
+        with model.disable_adapter():
+            resultados[NOME_BASE] = pontuar_modelo(model, lotes, pad_id, NOME_BASE)
+    for nome in nomes:
+        model.set_adapter(nome)
+        resultados[nome] = pontuar_modelo(model, lotes, pad_id, nome)
+
+    rotulos = list(resultados)
+    tabela = montar_tabela(exemplos, resultados, rotulos)
+    salvar_exemplos(args.saida_exemplos, exemplos, resultados, rotulos)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        f.write("--- PERPLEXIDADE DAS RESPOSTAS HUMANAS (TEACHER FORCING) ---\n\n")
+        f.write(f"Dataset: {args.dataset} ({len(tokenizados)} pares, semente {args.semente})\n\n")
+        f.write(tabela.to_string(index=False))
+        f.write("\n\n(Valores menores indicam que o modelo considera as respostas reais mais prováveis.)\n")
+
+    print("\n" + tabela.to_string(index=False))
+    print(f"\nResultados salvos em '{args.saida}' e detalhes por exemplo em '{args.saida_exemplos}'.")
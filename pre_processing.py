@@ -1,26 +1,52 @@
 import re
 import os
-import json
-import emoji
-from datetime import datetime, timedelta
+import sys
+import argparse
+import hashlib
+from collections import deque
+from datetime import datetime, time, timedelta
+
+import instrumentacao
+from indice_dias import data_do_prefixo, ler_data, ler_periodo
+from deduplicacao import LIMIAR_SIMILARIDADE, MAX_POR_PADRAO, deduplicar, imprimir_relatorio
+from formato_dados import com_formato, escrever_pares
 
 #CONSTANTES DE CONFIGURAÇÃO
 #Nome (padronizado pelo normalize)
 MEU_NOME_PADRONIZADO = "MeuNome"
 
+# Ids fixos na tabela de autores de cada arquivo; participantes de grupos recebem os ids seguintes.
+ID_MEU_NOME = 0
+ID_INTERLOCUTOR = 1
+
 # Nome da pasta que contém os arquivos já padronizados e anonimizados.
 PASTA_ENTRADA = "conversas_padronizadas"
 
 # Nome do arquivo final que conterá o dataset completo para o fine-tuning.
 ARQUIVO_SAIDA_JSONL = "dataset_final.jsonl"
 
+# Pares separados para validação (avaliação durante o treino e métricas sem vazamento).
+ARQUIVO_VALIDACAO_JSONL = "dataset_validacao.jsonl"
+FRACAO_VALIDACAO = 0.1
+MIN_PARES_PARA_VALIDACAO = 10 # Categorias menores ficam inteiras no treino.
+
 # Hiperparâmetros de filtragem (validados anteriormente).
 THRESHOLD_RESPOSTA_HORAS = 5
 MAX_LEN_INPUT = 2000
 
+# Modo de contexto (multi-turno): cada exemplo leva os blocos anteriores da conversa.
+CONTEXTO_BLOCOS = 1 # 1 = só o bloco imediatamente anterior (pares input/output simples).
+JANELA_CONTEXTO_HORAS = THRESHOLD_RESPOSTA_HORAS # Blocos mais antigos que isso (em relação à resposta) ficam de fora.
+CARACTERES_POR_TOKEN = 4 # Estimativa sem tokenizador; o ajuste exato é feito pelo add_instruction.py.
+
+# Deduplicação de pares quase iguais (deduplicacao.py): desligada por padrão, pois muda o dataset gerado.
+# Para ligar, use --max-por-padrao N (sugestão: MAX_POR_PADRAO do deduplicacao.py).
+MAX_POR_PADRAO_PADRAO = 0
+
 # --- DICIONÁRIO GLOBAL DE ESTATÍSTICAS ---
 stats_global = {
     "total_arquivos_processados": 0,
+    "total_arquivos_grupo": 0,
     "total_linhas_lidas": 0,
     "total_blocos_criados": 0,
     "total_sequencias_ai_descartadas": 0,
@@ -28,35 +54,92 @@ stats_global = {
     "total_pares_descartados_tempo": 0,
     "total_pares_descartados_tamanho": 0,
     "total_pares_descartados_conteudo": 0,
-    "total_pares_finais": 0
+    "total_pares_finais": 0,
+    "total_mensagens_contexto": 0,
+    "total_pares_validacao": 0
 }
 
 # --- FUNÇÕES DE PRÉ-PROCESSAMENTO ---
 
-def parsear_conversa_bruta(caminho_arquivo, meu_nome, outro_nome):
+class TabelaAutores:
+    """
+    Tabela de participantes de um arquivo: cada nome vira um id inteiro
+    compacto na primeira aparição, e o resto do pipeline compara só ids.
+    MeuNome e o interlocutor do arquivo ocupam os ids 0 e 1.
+    """
+
+    def __init__(self, meu_nome, outro_nome):
+        self.ids = {}
+        self.nomes = []
+        self.id(meu_nome)
+        self.id(outro_nome)
+
+    def id(self, nome):
+        autor_id = self.ids.get(nome)
+        if autor_id is None:
+            autor_id = self.ids[nome] = len(self.nomes)
+            self.nomes.append(nome)
+        return autor_id
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def e_grupo(self):
+        return len(self.nomes) > 2
+
+def decodificar_timestamp(timestamp_str):
+    """
+    datetime de "dd/mm/aaaa[,] hh:mm". A data passa pelo strptime uma vez por
+    dia distinto (memoizada); a hora é lida direto dos dígitos. ValueError se inválido.
+    """
+    hora = timestamp_str[-5:]
+    return datetime.combine(data_do_prefixo(timestamp_str[:10]), time(int(hora[:2]), int(hora[3:])))
+
+def parsear_conversa_bruta(caminho_arquivo, meu_nome, outro_nome, autores=None, aceitar_grupo=False,
+                           desde=None, ate=None):
+    """
+    Lê a exportação e devolve as mensagens com o autor já convertido para o
+    id de `autores` (uma TabelaAutores). Por padrão só entram MeuNome e o
+    interlocutor, como em conversas individuais; com `aceitar_grupo`, qualquer
+    participante é incluído (conversas em grupo). Com `desde`/`ate` (dates,
+    inclusive), só o trecho desses dias é lido, pelo índice de dias.
+    """
     mensagens_brutas = []
+    if autores is None:
+        autores = TabelaAutores(meu_nome, outro_nome)
     padrao_regex = re.compile(
         r'^(\d{2}/\d{2}/\d{4},? \d{2}:\d{2}) - ([^:]+): (.*?)(?=(?:\r?\n)?^\d{2}/\d{2}/\d{4},? \d{2}:\d{2} - |\Z)',
         re.DOTALL | re.MULTILINE
     )
+    filtrar_datas = False
     try:
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            conteudo = f.read()
-            stats_global["total_linhas_lidas"] += len(conteudo.split('\n'))
+        if desde is None and ate is None:
+            with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+                conteudo = f.read()
+        else:
+            conteudo, filtrar_datas = ler_periodo(caminho_arquivo, desde, ate)
+        stats_global["total_linhas_lidas"] += len(conteudo.split('\n'))
     except Exception as e:
         print(f"  [AVISO] Erro ao ler o arquivo {os.path.basename(caminho_arquivo)}: {e}")
         return []
 
+    ids_conhecidos = autores.ids
     matches = padrao_regex.finditer(conteudo)
     for match in matches:
         timestamp_str, autor, texto_bruto = match.groups() 
         texto_bruto = texto_bruto.strip()
         autor_limpo = autor.strip()
-        if autor_limpo not in [meu_nome, outro_nome]:
-            continue
+        autor_id = ids_conhecidos.get(autor_limpo)
+        if autor_id is None:
+            if not aceitar_grupo:
+                continue
+            autor_id = autores.id(autor_limpo)
         try:
-            timestamp = datetime.strptime(timestamp_str.replace(',', ''), '%d/%m/%Y %H:%M')
-            mensagens_brutas.append({"timestamp": timestamp, "autor": autor_limpo, "texto_bruto": texto_bruto})
+            timestamp = decodificar_timestamp(timestamp_str)
+            if filtrar_datas and not ((desde is None or timestamp.date() >= desde)
+                                      and (ate is None or timestamp.date() <= ate)):
+                continue
+            mensagens_brutas.append({"timestamp": timestamp, "autor": autor_id, "texto_bruto": texto_bruto})
         except ValueError:
             continue
     return mensagens_brutas
@@ -80,7 +163,11 @@ def agrupar_mensagens(mensagens_brutas):
     stats_global["total_blocos_criados"] += len(blocos)
     return blocos
 
-def filtrar_blocos_ai(blocos_brutos, meu_nome, outro_nome):
+def filtrar_blocos_ai(blocos_brutos, meu_id, outro_id=None):
+    """
+    Remove as interações com a Meta AI (minha menção @número seguida da
+    resposta). Em grupos (`outro_id` None) a resposta pode vir de qualquer outro participante.
+    """
     blocos_filtrados = []
     # Usamos um iterador para poder avançar ele manualmente quando necessário
     iter_blocos = iter(enumerate(blocos_brutos)) 
@@ -93,9 +180,10 @@ def filtrar_blocos_ai(blocos_brutos, meu_nome, outro_nome):
             bloco_seguinte = blocos_brutos[i+1]
             
             # Condição de descarte
-            if (bloco_atual["autor"] == meu_nome and 
+            if (bloco_atual["autor"] == meu_id and 
                 padrao_ai.search(bloco_atual["texto_completo_bruto"]) and 
-                bloco_seguinte["autor"] == outro_nome):
+                bloco_seguinte["autor"] != meu_id and
+                (outro_id is None or bloco_seguinte["autor"] == outro_id)):
                 
                 stats_global["total_sequencias_ai_descartadas"] += 1
                 # Pula o próximo bloco no iterador, efetivamente descartando ambos
@@ -108,6 +196,9 @@ def filtrar_blocos_ai(blocos_brutos, meu_nome, outro_nome):
     return blocos_filtrados
 
 def limpar_texto_e_validar(texto_bruto):
+    # Importação tardia: o --help e os erros de argumento não pagam pelo carregamento do emoji.
+    import emoji
+
     # 1. Quebra o bloco em mensagens individuais usando o separador
     mensagens_individuais = texto_bruto.split("\n")
     
@@ -148,20 +239,73 @@ def limpar_texto_e_validar(texto_bruto):
     return "\n".join(mensagens_limpas)
 
 
-def criar_e_validar_pares(blocos_filtrados, meu_nome):
+def estimar_tokens(texto):
+    """Estimativa barata do número de tokens, usada só para limitar o contexto."""
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+def _montar_mensagens(blocos_contexto, meu_id, output_limpo):
+    """
+    Converte os blocos de contexto (bloco, texto_limpo) na conversa
+    user/assistant. Blocos vazios após a limpeza são ignorados, blocos
+    seguidos do mesmo papel são unidos e a conversa sempre começa pelo usuário.
+    """
+    mensagens = []
+    for bloco, texto in blocos_contexto:
+        if not texto:
+            continue
+        papel = "assistant" if bloco["autor"] == meu_id else "user"
+        if mensagens and mensagens[-1]["role"] == papel:
+            mensagens[-1]["content"] += "\n" + texto
+        elif mensagens or papel == "user":
+            mensagens.append({"role": papel, "content": texto})
+    mensagens.append({"role": "assistant", "content": output_limpo})
+    return mensagens
+
+def criar_e_validar_pares(blocos_filtrados, meu_id, contexto_blocos=CONTEXTO_BLOCOS,
+                          janela_contexto_horas=JANELA_CONTEXTO_HORAS, orcamento_tokens_contexto=None):
+    """
+    Cria os pares (bloco de outra pessoa -> minha resposta), comparando os
+    ids de autor. Com
+    `contexto_blocos` > 1 ou `orcamento_tokens_contexto`, cada par também
+    recebe em "mensagens" a conversa user/assistant formada pelos até
+    `contexto_blocos` blocos anteriores dentro de `janela_contexto_horas`,
+    descartando os mais antigos até caber no orçamento (estimado) de tokens.
+    A janela desliza junto com a conversa e cada bloco é limpo no máximo uma
+    vez, então o custo continua linear no número de blocos.
+    """
+    modo_contexto = contexto_blocos > 1 or orcamento_tokens_contexto is not None
     pares_finais = []
+    janela = deque() # Índices dos blocos de contexto, do mais antigo ao mais recente.
+    limpos, tokens = {}, {}
+    tokens_janela = 0
+
+    def texto_limpo(indice):
+        if indice not in limpos:
+            limpos[indice] = limpar_texto_e_validar(blocos_filtrados[indice]["texto_completo_bruto"])
+        return limpos[indice]
+
+    def sair_da_janela():
+        nonlocal tokens_janela
+        indice = janela.popleft()
+        limpos.pop(indice, None)
+        tokens_janela -= tokens.pop(indice, 0)
+
     for i in range(1, len(blocos_filtrados)):
+        janela.append(i - 1)
+        while len(janela) > contexto_blocos:
+            sair_da_janela()
+
         bloco_anterior = blocos_filtrados[i-1]
         bloco_atual = blocos_filtrados[i]
-        if bloco_anterior["autor"] != meu_nome and bloco_atual["autor"] == meu_nome:
+        if bloco_anterior["autor"] != meu_id and bloco_atual["autor"] == meu_id:
             stats_global["total_pares_potenciais"] += 1
             delta_tempo = bloco_atual["timestamp"] - bloco_anterior["timestamp"]
             if delta_tempo > timedelta(hours=THRESHOLD_RESPOSTA_HORAS):
                 stats_global["total_pares_descartados_tempo"] += 1
                 continue
 
-            input_limpo = limpar_texto_e_validar(bloco_anterior["texto_completo_bruto"])
-            output_limpo = limpar_texto_e_validar(bloco_atual["texto_completo_bruto"])
+            input_limpo = texto_limpo(i - 1)
+            output_limpo = texto_limpo(i)
 
             if not input_limpo or not output_limpo:
                 stats_global["total_pares_descartados_conteudo"] += 1
@@ -169,18 +313,66 @@ def criar_e_validar_pares(blocos_filtrados, meu_nome):
             if len(input_limpo) > MAX_LEN_INPUT:
                 stats_global["total_pares_descartados_tamanho"] += 1
                 continue
-            
-            pares_finais.append({"input": input_limpo, "output": output_limpo})
+
+            if not modo_contexto:
+                pares_finais.append({"input": input_limpo, "output": output_limpo})
+                continue
+
+            limite = bloco_atual["timestamp"] - timedelta(hours=janela_contexto_horas)
+            while len(janela) > 1 and blocos_filtrados[janela[0]]["timestamp"] < limite:
+                sair_da_janela()
+            # Só os blocos que entraram desde o último par ainda não têm a contagem de tokens.
+            for indice in reversed(janela):
+                if indice in tokens:
+                    break
+                tokens[indice] = estimar_tokens(texto_limpo(indice))
+                tokens_janela += tokens[indice]
+            if orcamento_tokens_contexto is not None:
+                while len(janela) > 1 and tokens_janela > orcamento_tokens_contexto:
+                    sair_da_janela()
+
+            mensagens = _montar_mensagens(((blocos_filtrados[j], limpos[j]) for j in janela), meu_id, output_limpo)
+            stats_global["total_mensagens_contexto"] += len(mensagens) - 2
+            pares_finais.append({"input": input_limpo, "output": output_limpo, "mensagens": mensagens})
     return pares_finais
 
+def separar_validacao(pares, fracao=FRACAO_VALIDACAO):
+    """
+    Divide os pares em treino e validação de forma determinística e
+    estratificada por categoria: dentro de cada categoria os pares são
+    ordenados pelo hash do conteúdo e os primeiros `fracao` vão para validação.
+    O mesmo par cai sempre no mesmo lado, mesmo se o dataset crescer.
+    """
+    por_categoria = {}
+    for indice, par in enumerate(pares):
+        por_categoria.setdefault(par.get("categoria"), []).append(indice)
+
+    indices_validacao = set()
+    for indices in por_categoria.values():
+        if len(indices) < MIN_PARES_PARA_VALIDACAO:
+            continue
+        quantidade = max(1, round(len(indices) * fracao))
+        ordenados = sorted(indices, key=lambda i: hashlib.sha1(
+            f"{pares[i]['input']}\x00{pares[i]['output']}".encode("utf-8")).hexdigest())
+        indices_validacao.update(ordenados[:quantidade])
+
+    treino = [par for i, par in enumerate(pares) if i not in indices_validacao]
+    validacao = [par for i, par in enumerate(pares) if i in indices_validacao]
+    return treino, validacao
+
 # --- ORQUESTRADOR PRINCIPAL ---
-def processar_conversas_padronizadas():
+def processar_conversas_padronizadas(contexto_blocos=CONTEXTO_BLOCOS, janela_contexto_horas=JANELA_CONTEXTO_HORAS,
+                                     orcamento_tokens_contexto=None, aceitar_grupos=False,
+                                     limiar_similaridade=LIMIAR_SIMILARIDADE, max_por_padrao=MAX_POR_PADRAO_PADRAO,
+                                     formato="jsonl", desde=None, ate=None):
     if not os.path.isdir(PASTA_ENTRADA):
         print(f"ERRO: A pasta de entrada '{PASTA_ENTRADA}' não foi encontrada.")
         return
 
     dataset_completo = []
     print(f"Iniciando pré-processamento final a partir da pasta '{PASTA_ENTRADA}'...")
+    if desde is not None or ate is not None:
+        print(f"Período: de {desde or 'o início'} até {ate or 'o fim'} (pelo índice de dias de cada arquivo).")
     print("-" * 50)
 
     for categoria in os.listdir(PASTA_ENTRADA):
@@ -195,21 +387,45 @@ def processar_conversas_padronizadas():
                     
                     print(f"  - Lendo arquivo: '{nome_arquivo}' (Interlocutor: {outro_nome})")
 
-                    mensagens = parsear_conversa_bruta(caminho_arquivo, MEU_NOME_PADRONIZADO, outro_nome)
-                    blocos = agrupar_mensagens(mensagens)
-                    blocos_sem_ai = filtrar_blocos_ai(blocos, MEU_NOME_PADRONIZADO, outro_nome)
-                    pares_processados = criar_e_validar_pares(blocos_sem_ai, MEU_NOME_PADRONIZADO)
+                    autores = TabelaAutores(MEU_NOME_PADRONIZADO, outro_nome)
+                    with instrumentacao.etapa("leitura_e_parse", unidade="mensagens") as registro:
+                        mensagens = parsear_conversa_bruta(caminho_arquivo, MEU_NOME_PADRONIZADO, outro_nome,
+                                                           autores, aceitar_grupos, desde, ate)
+                        registro["itens"] = len(mensagens)
+                    grupo = autores.e_grupo()
+                    if grupo:
+                        stats_global["total_arquivos_grupo"] += 1
+                        participantes = len({msg["autor"] for msg in mensagens} - {ID_MEU_NOME})
+                        print(f"    Conversa em grupo: {participantes} participantes além de você.")
+                    with instrumentacao.etapa("agrupamento_e_filtro_ai", unidade="mensagens") as registro:
+                        blocos = agrupar_mensagens(mensagens)
+                        blocos_sem_ai = filtrar_blocos_ai(blocos, ID_MEU_NOME, None if grupo else ID_INTERLOCUTOR)
+                        registro["itens"] = len(mensagens)
+                    with instrumentacao.etapa("criacao_de_pares", unidade="pares") as registro:
+                        pares_processados = criar_e_validar_pares(blocos_sem_ai, ID_MEU_NOME, contexto_blocos,
+                                                                  janela_contexto_horas, orcamento_tokens_contexto)
+                        registro["itens"] = len(pares_processados)
                     
                     for par in pares_processados:
                         par['categoria'] = categoria
                         dataset_completo.append(par)
 
-    stats_global["total_pares_finais"] = len(dataset_completo)
+    # Deduplica antes da divisão: cópias do mesmo padrão não vazam entre treino e validação.
+    relatorio_deduplicacao = None
+    if max_por_padrao > 0:
+        with instrumentacao.etapa("deduplicacao", unidade="pares", itens=len(dataset_completo)):
+            dataset_completo, relatorio_deduplicacao = deduplicar(dataset_completo, limiar_similaridade, max_por_padrao)
+
+    dataset_treino, dataset_validacao = separar_validacao(dataset_completo)
+    stats_global["total_pares_finais"] = len(dataset_treino)
+    stats_global["total_pares_validacao"] = len(dataset_validacao)
 
+    arquivo_saida = com_formato(ARQUIVO_SAIDA_JSONL, formato)
+    arquivo_validacao = com_formato(ARQUIVO_VALIDACAO_JSONL, formato)
     try:
-        with open(ARQUIVO_SAIDA_JSONL, 'w', encoding='utf-8') as f:
-            for par in dataset_completo:
-                f.write(json.dumps(par, ensure_ascii=False) + '\n')
+        with instrumentacao.etapa("escrita", unidade="pares", itens=len(dataset_completo)):
+            escrever_pares(arquivo_saida, dataset_treino)
+            escrever_pares(arquivo_validacao, dataset_validacao)
     except Exception as e:
         print(f"\n[ERRO FATAL] Ocorreu um erro ao salvar o arquivo final: {e}")
         return
@@ -217,16 +433,61 @@ def processar_conversas_padronizadas():
     print("-" * 50)
     print("Processamento e unificação concluídos com sucesso!")
     print(f"\n--- ESTATÍSTICAS GLOBAIS ---")
-    print(f"Arquivos processados: {stats_global['total_arquivos_processados']}")
+    print(f"Arquivos processados: {stats_global['total_arquivos_processados']} "
+          f"({stats_global['total_arquivos_grupo']} conversas em grupo)")
     print(f"Pares de treino finais gerados: {stats_global['total_pares_finais']}")
+    print(f"Pares separados para validação: {stats_global['total_pares_validacao']} (~{FRACAO_VALIDACAO:.0%} por categoria)")
     print(f"Pares potenciais encontrados: {stats_global['total_pares_potenciais']}")
     print(f"  - Descartados por tempo (> {THRESHOLD_RESPOSTA_HORAS}h): {stats_global['total_pares_descartados_tempo']}")
     print(f"  - Descartados por conteúdo inválido: {stats_global['total_pares_descartados_conteudo']}")
     print(f"  - Descartados por tamanho do input (> {MAX_LEN_INPUT} chars): {stats_global['total_pares_descartados_tamanho']}")
     print(f"  - Interações com Meta AI removidas: {stats_global['total_sequencias_ai_descartadas']}")
+    if contexto_blocos > 1 or orcamento_tokens_contexto is not None:
+        total_pares = len(dataset_completo)
+        media = stats_global['total_mensagens_contexto'] / total_pares if total_pares else 0
+        print(f"Modo de contexto: até {contexto_blocos} blocos em {janela_contexto_horas}h"
+              + (f", ~{orcamento_tokens_contexto} tokens" if orcamento_tokens_contexto is not None else "")
+              + f" (média de {media:.1f} mensagens anteriores por exemplo)")
+    if relatorio_deduplicacao is not None:
+        imprimir_relatorio(relatorio_deduplicacao, limiar_similaridade, max_por_padrao)
     print("-" * 50)
-    print(f"Seu dataset final está pronto em '{ARQUIVO_SAIDA_JSONL}'.")
+    print(f"Seu dataset final está pronto em '{arquivo_saida}' (validação em '{arquivo_validacao}').")
 
 
 if __name__ == "__main__":
-    processar_conversas_padronizadas()
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Gera o dataset base (pares input/output) a partir das conversas padronizadas.",
+        epilog="Exemplo: python pre_processing.py --contexto 6 --orcamento-tokens-contexto 384"
+    )
+    parser.add_argument("--contexto", type=int, default=CONTEXTO_BLOCOS,
+                        help="Blocos anteriores incluídos em cada exemplo (1 = só o bloco respondido).")
+    parser.add_argument("--janela-contexto-horas", type=float, default=JANELA_CONTEXTO_HORAS,
+                        help="Idade máxima, em relação à resposta, dos blocos usados como contexto.")
+    parser.add_argument("--orcamento-tokens-contexto", type=int, default=None,
+                        help="Tokens (estimados) máximos do contexto; os blocos mais antigos saem primeiro.")
+    parser.add_argument("--grupos", action="store_true",
+                        help="Modo de grupo: inclui as mensagens de todos os participantes, não só de MeuNome e do "
+                             "interlocutor do arquivo.")
+    parser.add_argument("--limiar-similaridade", type=float, default=LIMIAR_SIMILARIDADE,
+                        help="Similaridade (Jaccard estimada) a partir da qual dois pares contam como o mesmo padrão.")
+    parser.add_argument("--max-por-padrao", type=int, default=MAX_POR_PADRAO_PADRAO,
+                        help=f"Cópias mantidas de cada padrão quase duplicado (padrão: 0, deduplicação desligada; "
+                             f"sugestão: {MAX_POR_PADRAO}).")
+    parser.add_argument("--formato", choices=["jsonl", "parquet"], default="jsonl",
+                        help="Formato do dataset gerado (parquet: colunar com zstd, veja formato_dados.py).")
+    parser.add_argument("--since", type=ler_data, default=None, metavar="AAAA-MM-DD",
+                        help="Usa só as mensagens a partir deste dia (inclusive).")
+    parser.add_argument("--until", type=ler_data, default=None, metavar="AAAA-MM-DD",
+                        help="Usa só as mensagens até este dia (inclusive).")
+    args = parser.parse_args()
+    if args.contexto < 1:
+        print("ERRO: --contexto deve ser pelo menos 1.")
+        sys.exit(1)
+    if args.since is not None and args.until is not None and args.since > args.until:
+        print("ERRO: --since deve ser anterior ou igual a --until.")
+        sys.exit(1)
+
+    instrumentacao.iniciar("pre_processing")
+    processar_conversas_padronizadas(args.contexto, args.janela_contexto_horas, args.orcamento_tokens_contexto,
+                                     args.grupos, args.limiar_similaridade, args.max_por_padrao,
+                                     args.formato, args.since, args.until)
\ No newline at end of file
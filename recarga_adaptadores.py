@@ -0,0 +1,232 @@
+"""
+Recarga dos adaptadores LoRA a partir dos checkpoints do treino, com o bot rodando.
+
+O SFTTrainer grava `results/checkpoint-<passo>/` a cada `save_steps`. Uma
+thread em segundo plano observa essa pasta e, quando surge um checkpoint
+completo mais novo, carrega os pesos dele em um segundo slot de adaptador
+(o "reserva"), que não participa das gerações. O modelo base não é
+recarregado.
+
+A troca é só um `set_adapter` do slot reserva para ativo. Ela acontece
+entre requisições. As gerações em andamento terminam com os pesos antigos,
+e as novas esperam apenas a troca, não a carga.
+
+    recarga = RecargaAdaptadores(model, "./results")
+    recarga.iniciar()
+    with recarga.uso():
+        resposta = gerar_resposta(model, ...)
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import instrumentacao
+
+# --- CONFIGURAÇÕES ---
+PASTA_CHECKPOINTS = "./results"
+INTERVALO_SEGUNDOS = 30.0
+PADRAO_CHECKPOINT = re.compile(r"^checkpoint-(\d+)$")
+ARQUIVOS_PESOS = ("adapter_model.safetensors", "adapter_model.bin")
+# O Trainer grava o trainer_state.json depois dos pesos: a presença dele marca o checkpoint como completo.
+MARCADOR_COMPLETO = "trainer_state.json"
+SLOT_RESERVA = "reserva"
+
+def _arquivo_pesos(pasta):
+    for arquivo in ARQUIVOS_PESOS:
+        if os.path.exists(os.path.join(pasta, arquivo)):
+            return os.path.join(pasta, arquivo)
+    return None
+
+def checkpoint_mais_recente(pasta):
+    """(passo, caminho) do checkpoint completo de maior passo em `pasta`, ou None."""
+    if not os.path.isdir(pasta):
+        return None
+    candidatos = []
+    for nome in os.listdir(pasta):
+        encontrado = PADRAO_CHECKPOINT.match(nome)
+        caminho = os.path.join(pasta, nome)
+        if encontrado and os.path.exists(os.path.join(caminho, MARCADOR_COMPLETO)) and _arquivo_pesos(caminho):
+            candidatos.append((int(encontrado.group(1)), caminho))
+    return max(candidatos) if candidatos else None
+
+def copiar_checkpoint(caminho, destino):
+    """
+    Copia os pesos do adaptador de um checkpoint para `destino`. O Trainer
+    apaga os checkpoints antigos (save_total_limit) enquanto treina: a carga
+    lê a cópia, e o checkpoint só fica aberto durante a cópia.
+    """
+    pesos = _arquivo_pesos(caminho)
+    if pesos is None:
+        raise FileNotFoundError(f"pesos do adaptador não encontrados em '{caminho}'")
+    shutil.copy2(pesos, destino)
+    return destino
+
+def _megabytes(tensores):
+    return sum(t.numel() * t.element_size() for t in tensores) / (1024 * 1024)
+
+class RecargaAdaptadores:
+    """
+    Observa uma pasta de checkpoints e troca os adaptadores do PeftModel sem
+    reiniciar o processo. As gerações devem rodar dentro de `uso()`. Várias
+    podem rodar ao mesmo tempo, e a troca espera todas terminarem.
+
+    Com `adaptadores_iniciais` (a pasta carregada na inicialização), só os
+    checkpoints gravados depois dela são considerados. Assim, checkpoints
+    antigos de um treino já concluído não substituem os adaptadores finais.
+
+    `ao_trocar` (opcional) é chamado a cada troca, ainda com as gerações
+    bloqueadas: é onde quem guarda respostas do modelo antigo (ex: o cache do
+    chat) as descarta.
+    """
+
+    def __init__(self, model, pasta=PASTA_CHECKPOINTS, intervalo=INTERVALO_SEGUNDOS, adaptadores_iniciais=None,
+                 ao_trocar=None):
+        if not hasattr(model, "peft_config"):
+            print("ERRO: A recarga de checkpoints precisa dos adaptadores LoRA separados do modelo base "
+                  "(use o backend cuda; o backend cpu mescla os adaptadores aos pesos).")
+            sys.exit(1)
+        self.model = model
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.ao_trocar = ao_trocar
+        self.trocas = []
+        self.checkpoint_atual = None
+        self._incompativeis = set()
+        pesos_iniciais = _arquivo_pesos(adaptadores_iniciais) if adaptadores_iniciais else None
+        self._gravado_apos = os.stat(pesos_iniciais).st_mtime_ns if pesos_iniciais else 0
+
+        self._condicao = threading.Condition()
+        self._em_uso = 0
+        self._trocando = False
+        self._parar = threading.Event()
+        self._thread = None
+
+        # O adaptador carregado na inicialização vira o slot ativo, e uma cópia da configuração dele vira o
+        # reserva. Os dois slots são criados uma única vez. Depois disso, recarregar só copia pesos.
+        self._ativo, self._reserva = model.active_adapter, SLOT_RESERVA
+        model.add_adapter(self._reserva, model.peft_config[self._ativo])
+        model.set_adapter(self._ativo)
+        model.eval() # O add_adapter cria o dropout do slot novo em modo de treino.
+        self.memoria_reserva_mb = _megabytes(self._parametros(self._reserva).values())
+
+    def _parametros(self, slot):
+        marcador = f".{slot}."
+        return {nome: p for nome, p in self.model.named_parameters() if marcador in nome}
+
+    # --- Uso pelas gerações ---
+
+    @contextmanager
+    def uso(self):
+        """Envolve uma geração: garante que os adaptadores não mudem no meio dela."""
+        with self._condicao:
+            while self._trocando:
+                self._condicao.wait()
+            self._em_uso += 1
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._em_uso -= 1
+                self._condicao.notify_all()
+
+    # --- Carga e troca ---
+
+    def carregar(self, caminho):
+        """
+        Copia os pesos do checkpoint para o slot reserva e o torna ativo.
+        Retorna o registro da troca, ou None se o checkpoint não for compatível.
+        """
+        from peft.utils import load_peft_weights, set_peft_model_state_dict
+
+        inicio = time.perf_counter()
+        with instrumentacao.etapa("recarga_adaptador"), tempfile.TemporaryDirectory(prefix="recarga_") as copia:
+            dispositivo = next(iter(self._parametros(self._reserva).values())).device
+            pesos = load_peft_weights(copiar_checkpoint(caminho, copia), device=str(dispositivo))
+            tamanho_mb = _megabytes(pesos.values())
+            # O slot reserva não participa das gerações: os pesos são copiados nele sem travar nada.
+            resultado = set_peft_model_state_dict(self.model, pesos, adapter_name=self._reserva)
+            del pesos
+        faltando = [chave for chave in resultado.missing_keys if f".{self._reserva}." in chave]
+        if faltando or resultado.unexpected_keys:
+            print(f"AVISO: Checkpoint '{caminho}' incompatível com os adaptadores carregados "
+                  f"({len(faltando)} pesos faltando, {len(resultado.unexpected_keys)} inesperados); ignorado.")
+            self._incompativeis.add(caminho)
+            return None
+        carga = time.perf_counter() - inicio
+
+        with instrumentacao.etapa("troca_adaptador"):
+            inicio_espera = time.perf_counter()
+            with self._condicao:
+                self._trocando = True
+                while self._em_uso:
+                    self._condicao.wait()
+                inicio_troca = time.perf_counter()
+                self.model.set_adapter(self._reserva)
+                self.model.eval()
+                self._ativo, self._reserva = self._reserva, self._ativo
+                if self.ao_trocar is not None:
+                    self.ao_trocar(caminho)
+                self._trocando = False
+                self._condicao.notify_all()
+            fim = time.perf_counter()
+
+        troca = {
+            "checkpoint": caminho,
+            "carga_s": carga,
+            "espera_s": inicio_troca - inicio_espera,
+            "troca_ms": (fim - inicio_troca) * 1000,
+            "pesos_mb": tamanho_mb,
+        }
+        self.trocas.append(troca)
+        self.checkpoint_atual = caminho
+        return troca
+
+    def verificar(self):
+        """Carrega o checkpoint mais novo, se houver um diferente do atual. Retorna o registro da troca ou None."""
+        encontrado = checkpoint_mais_recente(self.pasta)
+        if encontrado is None or encontrado[1] == self.checkpoint_atual or encontrado[1] in self._incompativeis:
+            return None
+        try:
+            if os.stat(os.path.join(encontrado[1], MARCADOR_COMPLETO)).st_mtime_ns <= self._gravado_apos:
+                return None
+            return self.carregar(encontrado[1])
+        except (OSError, RuntimeError, ValueError) as e:
+            # O save_total_limit pode apagar o checkpoint antes ou durante a cópia; a próxima verificação tenta de novo.
+            print(f"AVISO: Falha ao carregar '{encontrado[1]}': {e}")
+            return None
+
+    # --- Thread de observação ---
+
+    def _observar(self):
+        while not self._parar.wait(self.intervalo):
+            troca = self.verificar()
+            if troca is not None:
+                print(f"\n[recarga] {os.path.basename(troca['checkpoint'])} ativo: carga em {troca['carga_s']:.2f}s, "
+                      f"troca em {troca['troca_ms']:.2f} ms (esperou {troca['espera_s'] * 1000:.0f} ms "
+                      f"por gerações em andamento).")
+
+    def iniciar(self):
+        print(f"Observando checkpoints em '{self.pasta}' a cada {self.intervalo:g}s "
+              f"(slot reserva: {self.memoria_reserva_mb:.1f} MB).")
+        self._thread = threading.Thread(target=self._observar, name="recarga_adaptadores", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def resumo(self):
+        if not self.trocas:
+            return f"Recarga de adaptadores: nenhum checkpoint novo (slot reserva: {self.memoria_reserva_mb:.1f} MB)."
+        cargas = [t["carga_s"] for t in self.trocas]
+        trocas_ms = [t["troca_ms"] for t in self.trocas]
+        return (f"Recarga de adaptadores: {len(self.trocas)} trocas (último: "
+                f"{os.path.basename(self.checkpoint_atual)}); carga média {sum(cargas) / len(cargas):.2f}s, "
+                f"troca máxima {max(trocas_ms):.2f} ms; memória extra: slot reserva de "
+                f"{self.memoria_reserva_mb:.1f} MB + {self.trocas[-1]['pesos_mb']:.1f} MB temporários por carga.")
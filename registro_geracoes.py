@@ -0,0 +1,177 @@
+"""
+Registro estruturado das gerações dos scripts de avaliação.
+
+Cada resposta gerada vira um registro (uma linha) com a pergunta, o hash do
+prompt, o modelo/adaptador, os parâmetros de amostragem, a semente, o texto,
+as contagens de tokens e a latência. O formato é escolhido pela extensão:
+
+  - .jsonl:   uma linha JSON por registro, acrescentada (e descarregada) assim
+              que a resposta sai; execuções sucessivas acumulam no mesmo arquivo.
+  - .parquet: colunar, escrito em row groups de TAMANHO_LOTE_PARQUET registros
+              enquanto a geração avança (um arquivo por execução).
+
+Uso:
+
+    with RegistroGeracoes("respostas_bot.jsonl", modelo=..., adaptador=...) as registro:
+        registro.adicionar(pergunta_id=1, pergunta=..., conversa=..., texto=..., ...)
+
+    df = ler_registros(["respostas_bot.jsonl", "respostas_baseline.parquet"])
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+# --- CONFIGURAÇÕES ---
+EXTENSOES = (".jsonl", ".parquet")
+TAMANHO_LOTE_PARQUET = 64 # Registros por row group.
+
+# Ordem e tipo das colunas de cada registro (o schema do Parquet sai daqui).
+COLUNAS = {
+    "execucao": "string",
+    "data_hora": "string",
+    "pergunta_id": "int64",
+    "pergunta": "string",
+    "amostra": "int64",
+    "hash_prompt": "string",
+    "modelo": "string",
+    "adaptador": "string",
+    "parametros": "string", # JSON: hiperparâmetros de amostragem, max_new_tokens e especulação.
+    "semente": "int64",
+    "texto": "string",
+    "tokens_prompt": "int64",
+    "tokens_resposta": "int64",
+    "latencia_s": "float64",
+}
+
+def e_registro_estruturado(caminho):
+    return os.path.splitext(caminho)[1].lower() in EXTENSOES
+
+def hash_prompt(conversa):
+    """Hash estável da conversa enviada ao modelo (prompt de sistema incluído)."""
+    conteudo = json.dumps(conversa, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+
+class RegistroGeracoes:
+    """Grava registros de geração em JSONL ou Parquet, em fluxo, conforme a extensão do caminho."""
+
+    def __init__(self, caminho, modelo, adaptador=None, parametros=None, semente=None):
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao not in EXTENSOES:
+            print(f"ERRO: Formato de registro '{extensao}' não suportado (use {' ou '.join(EXTENSOES)}).")
+            sys.exit(1)
+        self.caminho = caminho
+        self.parquet = extensao == ".parquet"
+        self.fixos = {
+            "execucao": uuid.uuid4().hex[:12],
+            "modelo": modelo,
+            "adaptador": adaptador,
+            "parametros": json.dumps(parametros or {}, sort_keys=True),
+            "semente": semente,
+        }
+        self.total = 0
+        self._pendentes = []
+        self._arquivo = None
+        self._escritor = None
+
+    def __enter__(self):
+        if not self.parquet:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
+
+    def adicionar(self, pergunta_id, pergunta, conversa, texto, amostra=1, tokens_prompt=None,
+                  tokens_resposta=None, latencia_s=None):
+        registro = {
+            **self.fixos,
+            "data_hora": datetime.now().isoformat(timespec="seconds"),
+            "pergunta_id": pergunta_id,
+            "pergunta": pergunta,
+            "amostra": amostra,
+            "hash_prompt": hash_prompt(conversa),
+            "texto": texto,
+            "tokens_prompt": tokens_prompt,
+            "tokens_resposta": tokens_resposta,
+            "latencia_s": latencia_s,
+        }
+        registro = {coluna: registro[coluna] for coluna in COLUNAS}
+        self.total += 1
+        if self.parquet:
+            self._pendentes.append(registro)
+            if len(self._pendentes) >= TAMANHO_LOTE_PARQUET:
+                self._descarregar_parquet()
+        else:
+            self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            self._arquivo.flush()
+
+    def _descarregar_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._pendentes:
+            return
+        schema = pa.schema([(coluna, pa.type_for_alias(tipo)) for coluna, tipo in COLUNAS.items()])
+        tabela = pa.Table.from_pylist(self._pendentes, schema=schema)
+        if self._escritor is None:
+            self._escritor = pq.ParquetWriter(self.caminho, schema)
+        self._escritor.write_table(tabela)
+        self._pendentes = []
+
+    def fechar(self):
+        if self.parquet:
+            self._descarregar_parquet()
+            if self._escritor is not None:
+                self._escritor.close()
+                self._escritor = None
+        elif self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+def ler_registros(caminhos):
+    """Carrega um ou mais arquivos de registro (.jsonl/.parquet) em um único DataFrame."""
+    import pandas as pd
+
+    if isinstance(caminhos, str):
+        caminhos = [caminhos]
+    tabelas = []
+    for caminho in caminhos:
+        if caminho.lower().endswith(".parquet"):
+            tabelas.append(pd.read_parquet(caminho))
+        else:
+            tabelas.append(pd.read_json(caminho, lines=True, dtype=False))
+    # Inteiros anuláveis: a semente e as contagens podem faltar.
+    tipos = {coluna: "Int64" if tipo == "int64" else tipo for coluna, tipo in COLUNAS.items()}
+    if not tabelas:
+        return pd.DataFrame(columns=list(COLUNAS)).astype(tipos)
+    return pd.concat(tabelas, ignore_index=True)[list(COLUNAS)].astype(tipos)
+
+# --- Geração com Registro ---
+
+def adicionar_argumentos_registro(parser):
+    """Registra no argparse as opções de semente e de registro estruturado."""
+    parser.add_argument("--semente", type=int, default=None,
+                        help="Semente do torch para a amostragem (fica gravada em cada registro).")
+    parser.add_argument("--registro", default=None,
+                        help="Arquivo .jsonl ou .parquet com um registro por resposta (além da saída principal).")
+
+def gerar_e_registrar(model, tokenizer, conversa, max_new_tokens, num_amostras=1, especulador=None):
+    """
+    Gera como o `gerar_amostras` e devolve (respostas, medidas), com as
+    contagens de tokens e a latência de cada resposta (com K amostras em lote,
+    o tempo total dividido por K).
+    """
+    from geracao import gerar_amostras
+
+    contagens = {}
+    inicio = time.perf_counter()
+    respostas = gerar_amostras(model, tokenizer, conversa, max_new_tokens, num_amostras, especulador, contagens)
+    latencia = (time.perf_counter() - inicio) / len(respostas)
+    medidas = [{"tokens_prompt": contagens.get("tokens_prompt"), "tokens_resposta": tokens, "latencia_s": latencia}
+               for tokens in contagens.get("tokens_resposta", [None] * len(respostas))]
+    return respostas, medidas
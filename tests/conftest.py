@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# Os scripts do projeto ficam na raiz: os testes os importam como módulos.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def modelo_sintetico(tmp_path_factory):
+    """(base, adaptadores): um Llama minúsculo com LoRA, salvo em disco (ver benchmark_cpu.criar_modelo_sintetico)."""
+    pytest.importorskip("peft")
+    from benchmark_cpu import criar_modelo_sintetico
+    return criar_modelo_sintetico(str(tmp_path_factory.mktemp("modelo")), vocab=32, dimensao=64, camadas=1, semente=0)
+
+@pytest.fixture(scope="session")
+def modelo_e_tokenizador(modelo_sintetico):
+    """
+    O modelo base sintético, com logits concentrados em poucos tokens (como os de um modelo treinado) e sem
+    os tokens de parada, para que as gerações usem todos os max_new_tokens. O tokenizador ganha um chat
+    template simples: as mensagens em sequência e "t3" como início da resposta.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from geracao import ids_de_parada
+
+    base, _ = modelo_sintetico
+    model = AutoModelForCausalLM.from_pretrained(base).eval()
+    tokenizer = AutoTokenizer.from_pretrained(base)
+    tokenizer.chat_template = ("{% for m in messages %}{{ m['content'] }} {% endfor %}"
+                               "{% if add_generation_prompt %}t3{% endif %}")
+    with torch.no_grad():
+        model.lm_head.weight.mul_(40)
+        model.lm_head.weight[ids_de_parada(tokenizer)] = 0
+    return model, tokenizer
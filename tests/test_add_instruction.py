@@ -0,0 +1,30 @@
+import re
+
+from add_instruction import aplicar_orcamento_tokens
+
+class TokenizadorPalavras:
+    """Um token por palavra, com os offsets de caractere que o aparo usa; conta os textos tokenizados."""
+
+    def __init__(self):
+        self.textos = 0
+
+    def __call__(self, textos, return_offsets_mapping=True):
+        self.textos += len(textos)
+        offsets = [[m.span() for m in re.finditer(r'\S+', texto)] for texto in textos]
+        return {"input_ids": [list(range(len(o))) for o in offsets], "offset_mapping": offsets}
+
+def _conversa(texto):
+    return [{"role": "system", "content": "persona"}, {"role": "user", "content": texto},
+            {"role": "assistant", "content": "ok"}]
+
+def test_cache_guarda_so_os_textos_da_execucao_atual():
+    tokenizador = TokenizadorPalavras()
+    primeira = {}
+    aplicar_orcamento_tokens([_conversa("bom dia"), _conversa("e aí")], tokenizador, 512, primeira)
+    assert len(primeira) == 2 and tokenizador.textos == 2
+
+    segunda = {}
+    ajustadas, _ = aplicar_orcamento_tokens([_conversa("bom dia")], tokenizador, 512, segunda, primeira)
+    assert tokenizador.textos == 2 # Veio do cache anterior, sem tokenizar de novo.
+    assert len(ajustadas) == 1
+    assert segunda == {chave: primeira[chave] for chave in segunda} and len(segunda) == 1
@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("peft")
+
+from autoajuste_lote import MedidorMemoria, escolher_configuracao, sondar_configuracao
+
+COMPRIMENTOS = [12, 20, 28, 40]
+LOTE_EFETIVO = 4
+
+@pytest.fixture(scope="module")
+def modelo():
+    from peft import LoraConfig, get_peft_model
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=2, num_key_value_heads=1, use_cache=False)
+    return get_peft_model(LlamaForCausalLM(config), LoraConfig(r=4, task_type="CAUSAL_LM",
+                                                               target_modules=["q_proj", "v_proj"]))
+
+def _escolher(modelo, orcamento_mb):
+    return escolher_configuracao(modelo, COMPRIMENTOS, orcamento_mb, LOTE_EFETIVO, max_seq_length=32, passos=1)
+
+def _chave(resultado):
+    return resultado["per_device_train_batch_size"], resultado["gradient_checkpointing"]
+
+def test_memoria_cresce_com_o_micro_lote_e_cai_com_checkpointing(modelo):
+    import random
+
+    medir = lambda micro_lote, checkpointing: sondar_configuracao(
+        modelo, COMPRIMENTOS, micro_lote, checkpointing, 1, 64, 0, random.Random(0))["memoria_mb"]
+    assert medir(1, False) < medir(2, False) < medir(4, False)
+    assert medir(4, True) < medir(4, False)
+    assert medir(1, False) == medir(1, False) # Na CPU a estimativa não depende de ruído de medição.
+
+def test_medidor_conta_cada_armazenamento_uma_vez():
+    x = torch.randn(8, 8, requires_grad=True)
+    with MedidorMemoria(torch.device("cpu")) as medidor:
+        (x * x).sum().backward() # x é guardado duas vezes para o backward, mas ocupa a memória uma vez.
+    assert medidor.bytes_ativacoes == x.numel() * x.element_size()
+
+def test_orcamento_menor_escolhe_micro_lote_menor_ou_checkpointing(modelo):
+    _, resultados = _escolher(modelo, math.inf)
+    memoria = {_chave(r): r["memoria_mb"] for r in resultados}
+    assert len(memoria) == 6 and all(r["cabe"] for r in resultados)
+    assert not modelo.is_gradient_checkpointing # O estado do modelo é restaurado depois da sondagem.
+
+    maior = memoria[(LOTE_EFETIVO, False)]
+    melhor, resultados = _escolher(modelo, maior - 1e-3)
+    assert _chave(melhor) != (LOTE_EFETIVO, False) and melhor["memoria_mb"] < maior
+    assert melhor["per_device_train_batch_size"] < LOTE_EFETIVO or melhor["gradient_checkpointing"]
+    assert melhor["per_device_train_batch_size"] * melhor["gradient_accumulation_steps"] == LOTE_EFETIVO
+    assert [_chave(r) for r in resultados if not r["cabe"]] == [(LOTE_EFETIVO, False)]
+
+    # No menor orçamento possível só sobra micro-lote 1 com checkpointing, e abaixo dele nada cabe.
+    menor = memoria[(1, True)]
+    assert menor == min(memoria.values())
+    melhor, _ = _escolher(modelo, menor)
+    assert _chave(melhor) == (1, True) and melhor["gradient_accumulation_steps"] == LOTE_EFETIVO
+    assert _escolher(modelo, menor - 1e-3)[0] is None
@@ -0,0 +1,105 @@
+import pytest
+
+import cache_respostas
+from cache_respostas import CacheRespostas, ngramas_caracteres, normalizar_entrada
+
+def _jaccard(a, b):
+    ngramas_a, ngramas_b = ngramas_caracteres(normalizar_entrada(a)), ngramas_caracteres(normalizar_entrada(b))
+    return len(ngramas_a & ngramas_b) / len(ngramas_a | ngramas_b)
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado pelo teste para o TTL (o cache usa time.time)."""
+    agora = [1000.0]
+    monkeypatch.setattr(cache_respostas.time, "time", lambda: agora[0])
+    return agora
+
+def test_limpar_descarta_respostas_e_indice():
+    cache = CacheRespostas(min_variantes=1, semente=0)
+    cache.adicionar("amigo", "bom dia", "bom diaa")
+    assert cache.buscar("amigo", "bom dia!!") == "bom diaa"
+    cache.limpar()
+    assert len(cache) == 0 and not cache.indice_ngramas
+    assert cache.buscar("amigo", "bom dia") is None
+    assert cache.metricas()["acertos_exatos"] == 1 and cache.metricas()["remocoes"] == 1
+
+def test_entradas_expiram_pelo_ttl(relogio):
+    cache = CacheRespostas(ttl_segundos=60, min_variantes=1)
+    cache.adicionar("amigo", "bora?", "bora")
+    relogio[0] += 60
+    assert cache.buscar("amigo", "bora?") == "bora"
+    relogio[0] += 1
+    assert cache.buscar("amigo", "bora?") is None
+    assert len(cache) == 0 and not cache.indice_ngramas
+
+def test_resposta_nova_em_entrada_expirada_recomeca_as_variantes(relogio):
+    cache = CacheRespostas(ttl_segundos=60, min_variantes=1)
+    cache.adicionar("amigo", "bora?", "bora")
+    relogio[0] += 61
+    cache.adicionar("amigo", "bora?", "partiu")
+    assert cache.entradas[("amigo", "bora")]["variantes"] == ["partiu"]
+
+def test_acima_da_capacidade_remove_a_menos_usada():
+    cache = CacheRespostas(max_entradas=2, min_variantes=1)
+    cache.adicionar("amigo", "primeira mensagem", "um")
+    cache.adicionar("amigo", "segunda mensagem", "dois")
+    assert cache.buscar("amigo", "primeira mensagem") == "um" # Passa a ser a mais recente.
+    cache.adicionar("amigo", "terceira pergunta", "tres")
+    assert list(cache.entradas) == [("amigo", "primeira mensagem"), ("amigo", "terceira pergunta")]
+    assert not any(("amigo", "segunda mensagem") in chaves for chaves in cache.indice_ngramas.values())
+    assert cache.metricas()["remocoes"] == 1
+
+def test_busca_aproximada_respeita_o_limiar():
+    guardada, consulta = "vamos sair hoje a noite", "vamos sair hoje de noite"
+    similaridade = _jaccard(guardada, consulta)
+    assert 0.3 < similaridade < 0.9
+
+    aceita = CacheRespostas(limiar_similaridade=similaridade - 0.01, min_variantes=1)
+    aceita.adicionar("amigo", guardada, "bora")
+    assert aceita.buscar("amigo", consulta) == "bora"
+    assert aceita.metricas()["acertos_aproximados"] == 1
+
+    rejeita = CacheRespostas(limiar_similaridade=similaridade + 0.01, min_variantes=1)
+    rejeita.adicionar("amigo", guardada, "bora")
+    assert rejeita.buscar("amigo", consulta) is None
+    assert rejeita.metricas()["falhas"] == 1
+
+def test_chave_normalizada_separa_as_categorias():
+    cache = CacheRespostas(min_variantes=1)
+    cache.adicionar("Amigo", "E aí, tudo bem???", "tudo e vc")
+    cache.adicionar("Trabalho", "e ai tudo bem", "Tudo certo, e com você?")
+    assert cache.buscar("Amigo", "e aí tudo bem") == "tudo e vc"
+    assert cache.buscar("Trabalho", "E AÍ, TUDO BEM!") == "Tudo certo, e com você?"
+    assert cache.buscar("Familia", "e ai tudo bem") is None
+    assert cache.buscar("Familia", "e ai tudo bem?? kkk") is None # Nem pela busca aproximada.
+    assert len(cache) == 2
+
+def test_so_serve_com_variantes_suficientes_e_sorteia_entre_elas():
+    cache = CacheRespostas(min_variantes=3, max_variantes=3, semente=0)
+    cache.adicionar("amigo", "bora?", "bora")
+    cache.adicionar("amigo", "bora?", "partiu")
+    cache.adicionar("amigo", "bora?", "partiu") # Repetida: não conta como variante.
+    assert cache.buscar("amigo", "bora?") is None
+    cache.adicionar("amigo", "bora?", "vamo")
+    assert {cache.buscar("amigo", "bora?") for _ in range(50)} == {"bora", "partiu", "vamo"}
+
+    cache.adicionar("amigo", "bora?", "só se for agora") # Acima de max_variantes sai a mais antiga.
+    assert cache.entradas[("amigo", "bora")]["variantes"] == ["partiu", "vamo", "só se for agora"]
+
+def test_metricas_de_acerto_e_latencia():
+    cache = CacheRespostas(min_variantes=1)
+    cache.adicionar("amigo", "vamos sair hoje a noite", "bora")
+    cache.buscar("amigo", "vamos sair hoje a noite")    # exato
+    cache.buscar("amigo", "vamos sair hoje à noite!!")  # exato após normalizar
+    cache.buscar("amigo", "vamos sair hoje a noitee")   # aproximado
+    cache.buscar("amigo", "que horas é a reunião")      # falha
+    cache.registrar_geracao(0.2)
+    cache.registrar_geracao(0.4)
+
+    metricas = cache.metricas()
+    assert (metricas["consultas"], metricas["acertos_exatos"], metricas["acertos_aproximados"],
+            metricas["falhas"]) == (4, 2, 1, 1)
+    assert metricas["taxa_acerto"] == pytest.approx(0.75)
+    assert 0 < metricas["latencia_media_ms"] and 0 < metricas["latencia_p95_ms"]
+    assert metricas["latencia_media_geracao_ms"] == pytest.approx(300)
+    assert "taxa de acerto 75.0%" in cache.resumo()
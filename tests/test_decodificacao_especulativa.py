@@ -0,0 +1,60 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from decodificacao_especulativa import EspeculadorNgram, EspeculadorRascunho, IndiceNgram, criar_processadores
+from geracao import PARAMETROS_AMOSTRAGEM, gerar_ids
+
+PROMPT = [0, 5, 9, 12, 7, 20]
+AMOSTRAS = 3000
+
+def _distribuicao_primeiro_token(model, prompt):
+    with torch.no_grad():
+        logits = model(torch.tensor([prompt])).logits[0, -1]
+    return torch.softmax(criar_processadores()(torch.tensor([prompt]), logits[None].float()), dim=-1)[0]
+
+def test_processadores_reproduzem_o_generate(modelo_e_tokenizador):
+    model, tokenizer = modelo_e_tokenizador
+    saida = model.generate(torch.tensor([PROMPT]), max_new_tokens=1, output_scores=True, return_dict_in_generate=True,
+                           pad_token_id=tokenizer.eos_token_id, **PARAMETROS_AMOSTRAGEM)
+    torch.testing.assert_close(torch.softmax(saida.scores[0][0], dim=-1), _distribuicao_primeiro_token(model, PROMPT))
+
+def test_marginal_do_primeiro_token_igual_a_da_amostragem(modelo_e_tokenizador):
+    model, tokenizer = modelo_e_tokenizador
+    esperada = _distribuicao_primeiro_token(model, PROMPT)
+    # Rascunho no token mais provável: exercita tanto a aceitação quanto a rejeição com reamostragem.
+    indice = IndiceNgram()
+    indice.tabela[(PROMPT[-1],)] = (int(torch.argmax(esperada)), 3)
+    especulador = EspeculadorNgram(indice, num_tokens_rascunho=1)
+
+    torch.manual_seed(0)
+    contagens = torch.zeros_like(esperada)
+    for _ in range(AMOSTRAS):
+        saida = especulador.gerar(model, torch.tensor([PROMPT]), 2, [tokenizer.eos_token_id])
+        contagens[saida[0, len(PROMPT)]] += 1
+    frequencias = contagens / AMOSTRAS
+
+    assert 0.05 < especulador.taxa_aceitacao() < 0.95
+    tolerancia = 5 * torch.sqrt(esperada * (1 - esperada) / AMOSTRAS) + 1e-3
+    assert torch.all((frequencias - esperada).abs() <= tolerancia)
+
+def test_gulosa_identica_com_e_sem_especulacao(modelo_e_tokenizador, monkeypatch):
+    model, tokenizer = modelo_e_tokenizador
+    monkeypatch.setitem(PARAMETROS_AMOSTRAGEM, "do_sample", False)
+    entrada = torch.tensor([PROMPT])
+    referencia = gerar_ids(model, tokenizer, entrada, 24)
+
+    # Um índice com a própria resposta (rascunhos aceitos) e um com tokens aleatórios (rascunhos rejeitados).
+    certeiro, aleatorio = IndiceNgram(), IndiceNgram()
+    certeiro.adicionar(referencia[0].tolist())
+    aleatorio.adicionar(torch.randint(3, 32, (200,), generator=torch.Generator().manual_seed(0)).tolist())
+    taxas = []
+    for indice in (certeiro, aleatorio):
+        especulador = EspeculadorNgram(indice, num_tokens_rascunho=4)
+        assert torch.equal(gerar_ids(model, tokenizer, entrada, 24, especulador), referencia)
+        taxas.append(especulador.taxa_aceitacao())
+    assert referencia.shape[-1] == len(PROMPT) + 24
+    assert taxas[0] > 0.5 and taxas[1] < 0.5
+
+    rascunho = EspeculadorRascunho(model, num_tokens_rascunho=3)
+    assert torch.equal(gerar_ids(model, tokenizer, entrada, 24, rascunho), referencia)
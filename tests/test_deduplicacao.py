@@ -0,0 +1,82 @@
+import numpy as np
+
+from deduplicacao import agrupar_similares, deduplicar, escolher_bandas
+
+def _par(input_, output, mensagens=None):
+    par = {"input": input_, "output": output, "categoria": "amigo"}
+    if mensagens is not None:
+        par["mensagens"] = mensagens
+    return par
+
+def test_pares_simples_repetidos_sao_removidos():
+    pares = [_par("bom dia", "bom diaaa"), _par("Bom  dia", "bom diaaa"), _par("bom dia", "bom diaaa")]
+    mantidos, relatorio = deduplicar(pares, max_por_padrao=1)
+    assert len(mantidos) == 1 and relatorio["padroes_repetidos"] == 1
+
+def test_contexto_diferente_nao_e_o_mesmo_padrao():
+    contextos = ["vamos no cinema hoje a noite depois do trabalho?",
+                 "a reunião de amanhã foi cancelada pelo chefe, acredita?"]
+    pares = [_par("bom dia", "bom diaaa", [{"role": "user", "content": contexto},
+                                           {"role": "assistant", "content": "pode ser"},
+                                           {"role": "user", "content": "bom dia"},
+                                           {"role": "assistant", "content": "bom diaaa"}])
+             for contexto in contextos]
+    mantidos, _ = deduplicar(pares, max_por_padrao=1)
+    assert len(mantidos) == 2
+    mantidos, _ = deduplicar(pares + [dict(pares[0])], max_por_padrao=1)
+    assert len(mantidos) == 2
+
+def _assinaturas_com_diferencas(base, diferencas):
+    """Cópias de `base` com as colunas de cada lista trocadas por valores que não aparecem em nenhuma outra."""
+    assinaturas = np.tile(base, (len(diferencas), 1))
+    for linha, colunas in enumerate(diferencas):
+        assinaturas[linha, colunas] = 10_000 + 100 * linha + np.arange(len(colunas))
+    return assinaturas
+
+def test_membros_parecidos_entre_si_mas_nao_com_o_primeiro_do_balde_sao_agrupados():
+    bandas, linhas = escolher_bandas(64, 0.8)
+    base = np.arange(64, dtype=np.uint32)
+    # Os três só dividem o balde da banda 0. x e y diferem do primeiro em 3 colunas de cada outra banda
+    # (Jaccard ~0.72), mas entre si em só uma coluna por banda (~0.91).
+    colunas = [[b * linhas + i for i in range(3)] for b in range(1, bandas)]
+    assinaturas = np.tile(base, (3, 1))
+    assinaturas[1:, sum(colunas, [])] += 10_000
+    assinaturas[2, [terceira for _, _, terceira in colunas]] += 10_000
+    similaridade = lambda i, j: (assinaturas[i] == assinaturas[j]).mean()
+    assert similaridade(0, 1) < 0.8 and similaridade(0, 2) < 0.8 <= similaridade(1, 2)
+
+    grupos, _ = agrupar_similares(assinaturas, 0.8)
+    assert grupos == [0, 1, 1]
+
+def test_limiar_inclusivo_na_jaccard_estimada():
+    limiar = 0.75 # 48 de 64 colunas iguais.
+    _, linhas = escolher_bandas(64, limiar)
+    base = np.arange(64, dtype=np.uint32)
+    diferentes = lambda n: list(range(linhas, linhas + n)) # Fora da banda 0, que fica em comum.
+    no_limiar = _assinaturas_com_diferencas(base, [[], diferentes(16)])
+    abaixo = _assinaturas_com_diferencas(base, [[], diferentes(17)])
+    assert agrupar_similares(no_limiar, limiar)[0] == [0, 0]
+    assert agrupar_similares(abaixo, limiar)[0] == [0, 1]
+
+def test_max_por_padrao_mantem_as_primeiras_ocorrencias():
+    pares = [_par("bom dia", "bom diaaa"), _par("oi", "opa"), _par("bom dia", "bom diaaa"),
+             _par("bom dia", "bom diaaa"), _par("bom dia", "bom diaaa")]
+    mantidos, relatorio = deduplicar(pares, max_por_padrao=2)
+    assert mantidos == [pares[0], pares[1], pares[2]]
+    assert relatorio["pares_antes"] == 5 and relatorio["pares_depois"] == 3
+    assert relatorio["maiores_padroes"] == [{"ocorrencias": 4, "input": "bom dia", "output": "bom diaaa"}]
+
+    mantidos, relatorio = deduplicar(pares, max_por_padrao=4)
+    assert mantidos == pares and relatorio["padroes_repetidos"] == 1
+
+def test_categorias_diferentes_nunca_sao_agrupadas():
+    pares = [_par("bom dia", "bom diaaa"), dict(_par("bom dia", "bom diaaa"), categoria="trabalho")]
+    mantidos, relatorio = deduplicar(pares, max_por_padrao=1)
+    assert mantidos == pares and relatorio["padroes_repetidos"] == 0
+
+def test_textos_diferentes_nao_sao_agrupados():
+    pares = [_par("vamos no cinema hoje?", "bora, que horas?"),
+             _par("a reunião foi cancelada", "que ótimo, menos uma"),
+             _par("vamos no cinema hoje??", "bora, que horas?")]
+    mantidos, _ = deduplicar(pares, max_por_padrao=1)
+    assert mantidos == pares[:2]
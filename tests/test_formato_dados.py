@@ -0,0 +1,44 @@
+import pytest
+
+from formato_dados import escrever_conversas, escrever_pares
+
+pytest.importorskip("pyarrow")
+
+PARES = [
+    {"input": "bora sair hoje?", "output": "bora sim", "categoria": "Amigo"},
+    {"input": "reunião amanhã", "output": "ok, anotado", "categoria": "Trabalho"},
+    {"input": "sem resposta", "output": "", "categoria": "Amigo"},
+]
+CONVERSAS = [
+    [{"role": "system", "content": "Você é o Doppelbot."}, {"role": "user", "content": "oi"},
+     {"role": "assistant", "content": "opa"}],
+    [{"role": "system", "content": "Você é o Doppelbot."}, {"role": "user", "content": "tudo bem?"},
+     {"role": "assistant", "content": "tudo"}],
+]
+
+def test_leitores_encontram_os_pares_em_parquet_pelo_nome_jsonl(tmp_path):
+    from decodificacao_especulativa import IndiceNgram
+    from pontuacao_verossimilhanca import carregar_amostras
+
+    escrever_pares(str(tmp_path / "dataset_final.parquet"), PARES)
+    pedido = str(tmp_path / "dataset_final.jsonl")
+
+    assert [d["output"] for d in carregar_amostras(pedido, 0, 0)] == ["bora sim", "ok, anotado"]
+
+    class Tokenizador:
+        def __call__(self, textos, add_special_tokens=False):
+            return {"input_ids": [[len(palavra) for palavra in texto.split()] for texto in textos]}
+    indice = IndiceNgram.de_dataset(pedido, Tokenizador())
+    assert indice.propor([4], 1) == [3] # "bora" -> "sim"
+
+def test_pretokenizar_le_as_conversas_em_parquet(tmp_path):
+    from add_instruction import formatar_conversa_para_treino
+    from treino_distribuido import pretokenizar
+
+    caminho = str(tmp_path / "dataset_instruct.parquet")
+    escrever_conversas(caminho, CONVERSAS)
+
+    class Tokenizador:
+        def __call__(self, textos, truncation, max_length):
+            return {"input_ids": textos}
+    assert pretokenizar(caminho, Tokenizador()) == [formatar_conversa_para_treino(c) for c in CONVERSAS]
@@ -0,0 +1,39 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from geracao import PARAMETROS_AMOSTRAGEM, gerar_amostras, gerar_resposta
+
+# Só tokens que não começam por um token especial (t0, t1, t2): "t15" viraria "t1" + "5".
+CONVERSA = [{"role": "system", "content": "t4 t8 t9"}, {"role": "user", "content": "t5 t9 t6 t7 t30"}]
+
+def _contar_prefills(model):
+    """Conta os forwards que recebem mais de um token por linha (o prompt), e não a decodificação."""
+    contagem = []
+    gancho = model.model.register_forward_hook(lambda _, args, kwargs, saida: contagem.append(
+        kwargs["input_ids"].shape[-1] if kwargs.get("input_ids") is not None else 0), with_kwargs=True)
+    return contagem, gancho
+
+def test_amostras_compartilham_um_unico_prefill(modelo_e_tokenizador, monkeypatch):
+    model, tokenizer = modelo_e_tokenizador
+    monkeypatch.setitem(PARAMETROS_AMOSTRAGEM, "do_sample", False)
+    referencia = gerar_resposta(model, tokenizer, CONVERSA, max_new_tokens=12)
+
+    contagens = {}
+    tamanhos, gancho = _contar_prefills(model)
+    try:
+        respostas = gerar_amostras(model, tokenizer, CONVERSA, max_new_tokens=12, num_amostras=3, contagens=contagens)
+    finally:
+        gancho.remove()
+
+    # Com o cache replicado, cada linha do lote continua exatamente como a geração isolada.
+    assert respostas == [referencia] * 3
+    assert sum(1 for tamanho in tamanhos if tamanho > 1) == 1
+    assert contagens["tokens_prompt"] == 9
+    assert contagens["tokens_resposta"] == [12, 12, 12]
+
+def test_amostras_sorteadas_sao_independentes(modelo_e_tokenizador):
+    model, tokenizer = modelo_e_tokenizador
+    torch.manual_seed(0)
+    respostas = gerar_amostras(model, tokenizer, CONVERSA, max_new_tokens=12, num_amostras=8)
+    assert len(respostas) == 8 and len(set(respostas)) > 1
@@ -0,0 +1,90 @@
+import argparse
+import os
+from datetime import date
+
+import pytest
+
+import indice_dias
+from indice_dias import carregar_indice, construir_indice, data_do_prefixo, ler_data, ler_periodo
+
+# Exportação com quebras de linha do Windows, mensagem multilinha, cabeçalho com vírgula e dias faltando.
+DIAS = {
+    "2024-02-01": "01/02/2024 10:00 - Ana: oi\r\n01/02/2024 10:05 - MeuNome: olá\r\ntudo bem?\r\n",
+    "2024-02-03": "03/02/2024, 09:00 - Ana: bom dia\r\n03/02/2024, 09:01 - Ana: acordou?\r\n",
+    "2024-02-05": "05/02/2024 22:00 - MeuNome: boa noite, até amanhã\r\n",
+}
+
+@pytest.fixture
+def exportacao(tmp_path, monkeypatch):
+    monkeypatch.setattr(indice_dias, "PASTA_INDICES", str(tmp_path / "indices"))
+    caminho = tmp_path / "Conversa do WhatsApp com Ana.txt"
+    caminho.write_bytes("".join(DIAS.values()).encode("utf-8"))
+    return str(caminho)
+
+def _texto(*dias):
+    return "".join(DIAS[dia] for dia in dias).replace("\r\n", "\n")
+
+def test_construir_indice_guarda_o_primeiro_byte_de_cada_dia(exportacao):
+    indice = construir_indice(exportacao)
+    conteudo = "".join(DIAS.values()).encode("utf-8")
+    assert indice["ordenado"]
+    assert indice["dias"] == [[dia, conteudo.index(texto.encode("utf-8"))] for dia, texto in DIAS.items()]
+    assert indice["tamanho"] == len(conteudo)
+
+def test_dias_fora_de_ordem_marcam_o_indice(tmp_path):
+    caminho = tmp_path / "fora_de_ordem.txt"
+    caminho.write_text(DIAS["2024-02-03"] + DIAS["2024-02-01"], encoding="utf-8", newline="")
+    assert not construir_indice(str(caminho))["ordenado"]
+
+def test_ler_periodo_nos_limites(exportacao):
+    assert ler_periodo(exportacao, date(2024, 2, 1), date(2024, 2, 1)) == (_texto("2024-02-01"), False)
+    assert ler_periodo(exportacao, date(2024, 2, 5), date(2024, 2, 5)) == (_texto("2024-02-05"), False)
+    assert ler_periodo(exportacao, date(2024, 2, 1)) == (_texto(*DIAS), False)
+    assert ler_periodo(exportacao, ate=date(2024, 2, 3)) == (_texto("2024-02-01", "2024-02-03"), False)
+
+def test_ler_periodo_com_dias_faltando(exportacao):
+    # Limites em dias sem mensagens pegam os dias existentes de dentro do intervalo.
+    assert ler_periodo(exportacao, date(2024, 2, 2), date(2024, 2, 4)) == (_texto("2024-02-03"), False)
+    assert ler_periodo(exportacao, date(2024, 2, 4), date(2024, 2, 4)) == ("", False)
+    assert ler_periodo(exportacao, date(2024, 2, 6)) == ("", False)
+    assert ler_periodo(exportacao, ate=date(2024, 1, 31)) == ("", False)
+
+def test_ler_periodo_normaliza_as_quebras_de_linha_como_o_modo_texto(exportacao):
+    with open(exportacao, 'r', encoding='utf-8') as f:
+        assert ler_periodo(exportacao, date(2024, 1, 1), date(2024, 12, 31))[0] == f.read()
+
+def test_periodo_gera_as_mesmas_mensagens_que_o_arquivo_inteiro(exportacao):
+    from pre_processing import parsear_conversa_bruta
+
+    inteiro = parsear_conversa_bruta(exportacao, "MeuNome", "Ana")
+    periodo = parsear_conversa_bruta(exportacao, "MeuNome", "Ana", desde=date(2024, 2, 1), ate=date(2024, 2, 5))
+    assert periodo == inteiro
+    assert inteiro[1]["texto_bruto"] == "olá\ntudo bem?"
+
+def test_arquivo_fora_de_ordem_e_lido_inteiro_para_filtrar(tmp_path, monkeypatch):
+    monkeypatch.setattr(indice_dias, "PASTA_INDICES", str(tmp_path / "indices"))
+    caminho = tmp_path / "fora_de_ordem.txt"
+    caminho.write_text(DIAS["2024-02-03"] + DIAS["2024-02-01"], encoding="utf-8", newline="")
+    assert ler_periodo(str(caminho), date(2024, 2, 1), date(2024, 2, 1)) == (_texto("2024-02-03", "2024-02-01"), True)
+
+def test_indice_em_cache_e_refeito_quando_o_arquivo_muda(exportacao):
+    primeiro = carregar_indice(exportacao)
+    assert len(os.listdir(indice_dias.PASTA_INDICES)) == 1
+    assert carregar_indice(exportacao) == primeiro
+
+    with open(exportacao, 'ab') as f:
+        f.write("07/02/2024 08:00 - Ana: e aí?\r\n".encode("utf-8"))
+    assert [dia for dia, _ in carregar_indice(exportacao)["dias"]][-1] == "2024-02-07"
+
+def test_data_do_prefixo():
+    assert data_do_prefixo("29/02/2024") == date(2024, 2, 29)
+    assert data_do_prefixo("29/02/2024") is data_do_prefixo("29/02/2024") # Decodificado uma vez por dia.
+    with pytest.raises(ValueError):
+        data_do_prefixo("30/02/2024")
+    with pytest.raises(ValueError):
+        data_do_prefixo("2024-02-01")
+
+def test_ler_data():
+    assert ler_data("2024-02-01") == date(2024, 2, 1)
+    with pytest.raises(argparse.ArgumentTypeError):
+        ler_data("01/02/2024")
@@ -0,0 +1,93 @@
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+import indice_recuperacao
+from indice_recuperacao import IndiceExemplos, anexar_npy, construir_indice
+
+DIMENSAO = 16
+
+@pytest.fixture
+def codificados(monkeypatch):
+    """Substitui o modelo de embeddings por vetores determinísticos e registra o que foi calculado."""
+    textos_calculados = []
+    def calcular(textos, model_id):
+        textos_calculados.extend(textos)
+        vetores = [np.random.default_rng(zlib.crc32(t.encode())).normal(size=DIMENSAO) for t in textos]
+        return indice_recuperacao.normalizar_linhas(np.array(vetores))
+    monkeypatch.setattr(indice_recuperacao, "calcular_embeddings", calcular)
+    return textos_calculados
+
+def _gravar_dataset(caminho, n, inicio=0):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for i in range(inicio, n):
+            categoria = "Amigo" if i % 2 else "Trabalho"
+            f.write(json.dumps({"input": f"mensagem {i}", "output": f"resposta {i}", "categoria": categoria}) + "\n")
+
+def _forca_bruta(indice, vetor, k, categoria):
+    codigo = indice.meta["categorias"].index(categoria)
+    linhas = np.flatnonzero(np.asarray(indice.categorias) == codigo)
+    scores = np.asarray(indice.embeddings)[linhas] @ vetor
+    return [indice.exemplo(int(linhas[i]))["input"] for i in np.argsort(-scores)[:k]]
+
+def test_pares_novos_sao_anexados_sem_reagrupar(tmp_path, codificados):
+    dataset, pasta = tmp_path / "dataset.jsonl", str(tmp_path / "indice")
+    _gravar_dataset(dataset, 40)
+    construir_indice(str(dataset), pasta, num_listas=4)
+    centroides = np.load(f"{pasta}/centroides.npy")
+    with open(f"{pasta}/exemplos.jsonl", 'rb') as f:
+        exemplos_antes = f.read()
+
+    codificados.clear()
+    _gravar_dataset(dataset, 46)
+    construir_indice(str(dataset), pasta, num_listas=4)
+    assert codificados == [f"mensagem {i}" for i in range(40, 46)]
+    np.testing.assert_array_equal(np.load(f"{pasta}/centroides.npy"), centroides)
+    with open(f"{pasta}/exemplos.jsonl", 'rb') as f:
+        assert f.read().startswith(exemplos_antes)
+    assert len(np.load(f"{pasta}/atribuicoes_novas.npy")) == 6
+
+    indice = IndiceExemplos(pasta)
+    assert len(indice) == 46 and indice.meta["total"] == 46
+    assert indice.categoria_no_indice("amigo") == "Amigo" and indice.categoria_no_indice("família") is None
+    for i in (3, 41, 44):
+        vetor = indice.embeddings[[indice.exemplo(j)["input"] for j in range(46)].index(f"mensagem {i}")]
+        resultados = indice.buscar(vetor, k=3, nprobe=4, categoria="Amigo")
+        assert all(exemplo["categoria"] == "Amigo" for _, exemplo in resultados)
+        assert [e["input"] for _, e in resultados] == _forca_bruta(indice, vetor, 3, "Amigo")
+
+def test_remocao_reescreve_com_os_mesmos_centroides(tmp_path, codificados):
+    dataset, pasta = tmp_path / "dataset.jsonl", str(tmp_path / "indice")
+    _gravar_dataset(dataset, 40)
+    construir_indice(str(dataset), pasta, num_listas=4)
+    _gravar_dataset(dataset, 44)
+    construir_indice(str(dataset), pasta, num_listas=4)
+    centroides = np.load(f"{pasta}/centroides.npy")
+
+    codificados.clear()
+    _gravar_dataset(dataset, 44, inicio=2)
+    construir_indice(str(dataset), pasta, num_listas=4)
+    assert codificados == []
+    np.testing.assert_array_equal(np.load(f"{pasta}/centroides.npy"), centroides)
+    indice = IndiceExemplos(pasta)
+    assert len(indice) == 42 and indice.atribuicoes_novas is None
+    assert int(indice.listas[-1]) == 42
+
+def test_anexar_npy_atualiza_o_cabecalho_no_lugar(tmp_path):
+    caminho = str(tmp_path / "matriz.npy")
+    np.save(caminho, np.arange(6, dtype=np.float32).reshape(3, 2))
+    anexar_npy(caminho, np.array([[6, 7]], dtype=np.float32))
+    np.testing.assert_array_equal(np.load(caminho), np.arange(8, dtype=np.float32).reshape(4, 2))
+
+def test_dataset_em_parquet_e_encontrado_pelo_nome_jsonl(tmp_path, codificados):
+    pytest.importorskip("pyarrow")
+    from formato_dados import escrever_pares
+
+    escrever_pares(str(tmp_path / "dataset.parquet"),
+                   [{"input": f"mensagem {i}", "output": f"resposta {i}", "categoria": "Amigo"} for i in range(5)])
+    pasta = str(tmp_path / "indice")
+    construir_indice(str(tmp_path / "dataset.jsonl"), pasta)
+    indice = IndiceExemplos(pasta)
+    assert [indice.exemplo(i)["output"] for i in range(5)] == [f"resposta {i}" for i in range(5)]
@@ -0,0 +1,39 @@
+import instrumentacao
+
+def _funcao_quente():
+    return sum(i * i for i in range(1000))
+
+def test_cprofile_perfila_o_codigo_das_etapas(monkeypatch):
+    monkeypatch.setattr(instrumentacao, "PERFIS_ATIVOS", {"cprofile"})
+    coletor = instrumentacao.Coletor()
+    with coletor.etapa("leitura") as registro:
+        _funcao_quente()
+        registro["itens"] = 1
+    _funcao_quente() # Fora de etapas: não entra no perfil.
+
+    coletor.perfil.create_stats()
+    chamadas = {funcao[2]: estatistica[1] for funcao, estatistica in coletor.perfil.stats.items()}
+    assert chamadas["_funcao_quente"] == 1
+    assert coletor._perfil_usado and coletor._profundidade_perfil == 0
+
+def test_etapas_e_funcoes_aninhadas_desligam_o_perfil_so_no_fim(monkeypatch):
+    monkeypatch.setattr(instrumentacao, "PERFIS_ATIVOS", {"cprofile"})
+    coletor = instrumentacao.Coletor()
+    quente = coletor.cronometrar(_funcao_quente)
+    with coletor.etapa("externa"):
+        quente()
+        with coletor.etapa("interna"):
+            quente()
+        _funcao_quente()
+    coletor.perfil.create_stats()
+    chamadas = {funcao[2]: estatistica[1] for funcao, estatistica in coletor.perfil.stats.items()}
+    assert chamadas["_funcao_quente"] == 3
+    assert coletor.funcoes["_funcao_quente"]["chamadas"] == 2
+    assert coletor.etapas["interna"]["chamadas"] == 1
+
+def test_sem_perfil_as_etapas_nao_ligam_o_cprofile(monkeypatch):
+    monkeypatch.setattr(instrumentacao, "PERFIS_ATIVOS", set())
+    coletor = instrumentacao.Coletor()
+    with coletor.etapa("leitura"):
+        _funcao_quente()
+    assert coletor.perfil is None and coletor.etapas["leitura"]["chamadas"] == 1
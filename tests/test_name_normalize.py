@@ -0,0 +1,30 @@
+from name_normalize import anonimizar_autores
+
+CONVERSA_GRUPO = (
+    "01/02/2023, 10:00 - Augusto Silva: bom dia\n"
+    "01/02/2023 10:01 - Maria: Augusto Silva: você viu o que a Joana falou?\n"
+    "mensagem encaminhada de Maria: chego às 10\n"
+    "01/02/2023, 10:02 - Joana: vi sim, Maria\n"
+    "01/02/2023, 10:03 - Ana Paula: Mariana vem também\n"
+)
+
+def test_autores_viram_rotulos():
+    conteudo, rotulos = anonimizar_autores(CONVERSA_GRUPO, "Augusto Silva", "Maria", "Amigo1")
+    assert rotulos == {"Augusto Silva": "MeuNome", "Maria": "Amigo1", "Joana": "Amigo1_1", "Ana Paula": "Amigo1_2"}
+    cabecalhos = [linha.split(" - ")[1].split(":")[0] for linha in conteudo.splitlines() if " - " in linha]
+    assert cabecalhos == ["MeuNome", "Amigo1", "Amigo1_1", "Amigo1_2"]
+
+def test_mencoes_no_corpo_sao_anonimizadas():
+    conteudo, _ = anonimizar_autores(CONVERSA_GRUPO, "Augusto Silva", "Maria", "Amigo1")
+    for nome in ("Augusto", "Joana", "Ana Paula"):
+        assert nome not in conteudo
+    assert "Amigo1: MeuNome: você viu o que a Amigo1_1 falou?" in conteudo
+    assert "mensagem encaminhada de Amigo1: chego às 10" in conteudo
+    assert "vi sim, Amigo1\n" in conteudo
+    # Só a palavra inteira: "Mariana" não é "Maria".
+    assert "Mariana vem também" in conteudo
+
+def test_mencao_antes_da_primeira_mensagem_do_autor():
+    conteudo, _ = anonimizar_autores(
+        "01/02/2023, 10:00 - Maria: cadê a Joana?\n01/02/2023, 10:05 - Joana: aqui\n", "Eu", "Maria", "Amigo1")
+    assert conteudo == "01/02/2023, 10:00 - Amigo1: cadê a Amigo1_1?\n01/02/2023, 10:05 - Amigo1_1: aqui\n"
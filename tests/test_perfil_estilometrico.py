@@ -0,0 +1,73 @@
+import json
+import random
+import statistics
+
+import pytest
+
+from perfil_estilometrico import (CATEGORIA_GERAL, HyperLogLog, PerfilTextos, Welford, carregar_perfil, comparar,
+                                  perfilar, salvar_perfil)
+
+ERRO_PADRAO_HLL = 1.04 / 64 # 1,04 / sqrt(m) com a precisão padrão (m = 4096).
+
+TEXTOS = [
+    ("Amigo", "bora sair hoje?\nkkkk"),
+    ("Amigo", "bora sim"),
+    ("Trabalho", "Bom dia, segue o relatório.\n\nQualquer dúvida me avise."),
+    (None, "ok"),
+]
+
+def test_welford_igual_a_media_e_variancia_populacional():
+    rng = random.Random(0)
+    for valores in ([rng.gauss(50, 12) for _ in range(5000)], [rng.randint(0, 3) for _ in range(7)], [4.0]):
+        welford = Welford()
+        for valor in valores:
+            welford.atualizar(valor)
+        assert welford.n == len(valores)
+        assert welford.media == pytest.approx(statistics.fmean(valores), rel=1e-12)
+        assert welford.variancia == pytest.approx(statistics.pvariance(valores), rel=1e-9, abs=1e-12)
+        assert welford.desvio == pytest.approx(statistics.pstdev(valores), rel=1e-9, abs=1e-12)
+    assert Welford().variancia == 0.0
+
+@pytest.mark.parametrize("distintos", [1000, 200_000]) # 1000 usa a contagem linear (abaixo de 2,5 m).
+def test_hyperloglog_dentro_de_tres_erros_padrao(distintos):
+    hll = HyperLogLog()
+    hll.registrar(hll.posicoes([f"palavra{i}" for i in range(distintos)]))
+    hll.registrar(hll.posicoes([f"palavra{i}" for i in range(0, distintos, 7)])) # Repetidas não contam.
+    assert abs(hll.estimar() - distintos) <= 3 * ERRO_PADRAO_HLL * distintos
+
+def test_hyperloglog_vazio_e_com_um_elemento():
+    hll = HyperLogLog()
+    assert hll.estimar() == 0
+    hll.adicionar("oi")
+    hll.adicionar("oi")
+    assert round(hll.estimar()) == 1
+
+def test_perfis_por_categoria_e_geral():
+    perfis = perfilar(TEXTOS)
+    assert set(perfis) == {CATEGORIA_GERAL, "Amigo", "Trabalho"}
+    assert perfis[CATEGORIA_GERAL].resumo()["textos"] == 4 and perfis["Amigo"].resumo()["textos"] == 2
+    amigo = perfis["Amigo"].resumo()
+    assert amigo["total_palavras"] == 6 and amigo["vocabulario_estimado"] == 5
+    assert amigo["linhas_media"] == 1.5
+    # Linhas em branco não contam nas palavras por linha: 3 e 1 ("kkkk"), depois 2.
+    assert amigo["palavras_por_linha_media"] == pytest.approx(2.0)
+
+def test_para_dict_e_de_dict_preservam_o_resumo(tmp_path):
+    perfis = perfilar(TEXTOS)
+    for perfil in perfis.values():
+        copia = PerfilTextos.de_dict(json.loads(json.dumps(perfil.para_dict())))
+        assert copia.resumo() == perfil.resumo()
+        # A cópia continua acumulando como o original.
+        copia.adicionar("mais um texto")
+        perfil.adicionar("mais um texto")
+        assert copia.resumo() == perfil.resumo()
+
+    caminho = str(tmp_path / "perfil.json")
+    salvar_perfil(perfis, caminho)
+    carregados = carregar_perfil(caminho)
+    assert {c: p.resumo() for c, p in carregados.items()} == {c: p.resumo() for c, p in perfis.items()}
+
+def test_comparar_perfil_consigo_mesmo_da_z_zero():
+    perfil = perfilar(TEXTOS)[CATEGORIA_GERAL]
+    for nome, referencia, bot, z in comparar(perfil, perfil):
+        assert referencia == bot and z in (0.0, None)
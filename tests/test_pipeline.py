@@ -0,0 +1,123 @@
+import pytest
+
+from pipeline import Etapa, HashesConteudo, executar_pipeline
+
+# Etapa trivial: copia a entrada para a saída com um sufixo e anota a execução em execucoes.txt.
+SCRIPT_COPIAR = """import sys
+entrada, saida, sufixo = sys.argv[1:4]
+with open(entrada, encoding='utf-8') as f:
+    conteudo = f.read()
+with open(saida, 'w', encoding='utf-8') as f:
+    f.write(conteudo + sufixo)
+with open('execucoes.txt', 'a', encoding='utf-8') as f:
+    f.write(saida + '\\n')
+"""
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """Pasta de trabalho com os scripts das etapas (as etapas usam caminhos relativos)."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "copiar.py").write_text(SCRIPT_COPIAR, encoding="utf-8")
+    (tmp_path / "falhar.py").write_text("import sys\nsys.exit(3)\n", encoding="utf-8")
+    (tmp_path / "entrada.txt").write_text("dados", encoding="utf-8")
+    return tmp_path
+
+def _copiar(nome, entrada, saida, sufixo="+"):
+    return Etapa(nome, "copiar.py", [entrada, saida, sufixo], entradas=[entrada], saidas=[saida])
+
+def _executadas(pasta):
+    caminho = pasta / "execucoes.txt"
+    execucoes = caminho.read_text(encoding="utf-8").split() if caminho.exists() else []
+    caminho.unlink(missing_ok=True)
+    return execucoes
+
+def _situacoes(resumo):
+    return {nome: info["situacao"] for nome, info in resumo.items()}
+
+def _rodar(etapas):
+    return _situacoes(executar_pipeline(etapas, paralelas=2, caminho_estado=".estado.json"))
+
+def test_entradas_sem_mudanca_pulam_a_etapa(pasta):
+    etapas = [_copiar("a", "entrada.txt", "a.txt"), _copiar("b", "a.txt", "b.txt")]
+    assert _rodar(etapas) == {"a": "executada", "b": "executada"}
+    assert _executadas(pasta) == ["a.txt", "b.txt"]
+    assert (pasta / "b.txt").read_text(encoding="utf-8") == "dados++"
+
+    assert _rodar(etapas) == {"a": "pulada", "b": "pulada"}
+    assert _executadas(pasta) == []
+
+    (pasta / "entrada.txt").write_text("outros dados", encoding="utf-8")
+    assert _rodar(etapas) == {"a": "executada", "b": "executada"}
+
+def test_saida_apagada_roda_a_etapa_de_novo(pasta):
+    etapas = [_copiar("a", "entrada.txt", "a.txt")]
+    _rodar(etapas)
+    (pasta / "a.txt").unlink()
+    assert _rodar(etapas) == {"a": "executada"}
+
+def test_mudanca_de_codigo_ou_argumentos_roda_de_novo(pasta):
+    _rodar([_copiar("a", "entrada.txt", "a.txt"), _copiar("b", "a.txt", "b.txt")])
+    _executadas(pasta)
+
+    with open(pasta / "copiar.py", 'a', encoding='utf-8') as f:
+        f.write("# mudança no código\n")
+    assert _rodar([_copiar("a", "entrada.txt", "a.txt"), _copiar("b", "a.txt", "b.txt")]) == \
+        {"a": "executada", "b": "executada"}
+    _executadas(pasta)
+
+    # Só o argumento de b mudou: a é pulada e b roda de novo.
+    assert _rodar([_copiar("a", "entrada.txt", "a.txt"), _copiar("b", "a.txt", "b.txt", "!")]) == \
+        {"a": "pulada", "b": "executada"}
+    assert (pasta / "b.txt").read_text(encoding="utf-8") == "dados+!"
+
+def test_etapa_que_gera_o_mesmo_conteudo_nao_invalida_as_seguintes(pasta):
+    etapas = [_copiar("a", "entrada.txt", "a.txt"), _copiar("b", "a.txt", "b.txt")]
+    _rodar(etapas)
+    _executadas(pasta)
+    assert _situacoes(executar_pipeline(etapas, forcar={"a"}, caminho_estado=".estado.json")) == \
+        {"a": "executada", "b": "pulada"}
+    assert _executadas(pasta) == ["a.txt"]
+
+def test_falha_cancela_as_etapas_dependentes(pasta):
+    etapas = [
+        Etapa("a", "falhar.py", entradas=["entrada.txt"], saidas=["a.txt"]),
+        _copiar("b", "a.txt", "b.txt"),
+        _copiar("c", "b.txt", "c.txt"),
+        _copiar("independente", "entrada.txt", "d.txt"),
+    ]
+    assert _rodar(etapas) == {"a": "falhou", "b": "cancelada", "c": "cancelada", "independente": "executada"}
+    assert _executadas(pasta) == ["d.txt"]
+
+    # A falha não fica registrada como sucesso: a etapa roda de novo na próxima vez.
+    etapas[0] = _copiar("a", "entrada.txt", "a.txt")
+    assert _rodar(etapas) == {"a": "executada", "b": "executada", "c": "executada", "independente": "pulada"}
+
+def test_ciclo_e_cancelado_sem_travar(pasta):
+    etapas = [
+        _copiar("x", "y.txt", "x.txt"),
+        _copiar("y", "x.txt", "y.txt"),
+        _copiar("fora_do_ciclo", "entrada.txt", "z.txt"),
+    ]
+    assert _rodar(etapas) == {"fora_do_ciclo": "executada", "x": "cancelada", "y": "cancelada"}
+    assert _executadas(pasta) == ["z.txt"]
+
+def test_etapas_independentes_rodam_todas(pasta):
+    (pasta / "outra.txt").write_text("mais dados", encoding="utf-8")
+    etapas = [
+        _copiar("a", "entrada.txt", "a.txt"),
+        _copiar("b", "outra.txt", "b.txt"),
+        _copiar("c", "entrada.txt", "c.txt"),
+    ]
+    resumo = executar_pipeline(etapas, paralelas=2, caminho_estado=".estado.json")
+    assert _situacoes(resumo) == {"a": "executada", "b": "executada", "c": "executada"}
+    assert sorted(_executadas(pasta)) == ["a.txt", "b.txt", "c.txt"]
+    assert all(info["tempo_s"] > 0 for info in resumo.values())
+
+def test_hash_de_pasta_depende_dos_nomes_e_do_conteudo(tmp_path):
+    (tmp_path / "pasta").mkdir()
+    (tmp_path / "pasta" / "a.txt").write_text("1", encoding="utf-8")
+    hashes = HashesConteudo()
+    antes = hashes.hash(str(tmp_path / "pasta"))
+    (tmp_path / "pasta" / "a.txt").rename(tmp_path / "pasta" / "b.txt")
+    assert hashes.hash(str(tmp_path / "pasta")) != antes
+    assert hashes.hash(str(tmp_path / "nao_existe")) is None
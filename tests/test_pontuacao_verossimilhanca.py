@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+torch = pytest.importorskip("torch")
+import torch.nn.functional as F
+
+from pontuacao_verossimilhanca import montar_lotes, pontuar_lote
+
+PAD_ID = 0
+
+@pytest.fixture(scope="module")
+def modelo(modelo_sintetico):
+    from transformers import AutoModelForCausalLM
+    return AutoModelForCausalLM.from_pretrained(modelo_sintetico[0]).eval()
+
+def _exemplos(quantidade, semente=0):
+    """Sequências de comprimentos e inícios de resposta variados, como as de tokenizar_exemplos."""
+    rng = random.Random(semente)
+    exemplos = []
+    for indice in range(quantidade):
+        prompt, resposta = rng.randint(2, 12), rng.randint(1, 8)
+        exemplos.append({"indice": indice, "categoria": "Amigo",
+                         "ids": [rng.randint(3, 31) for _ in range(prompt + resposta)], "inicio_resposta": prompt})
+    return exemplos
+
+def _nll_isolada(model, item):
+    """Entropia cruzada somada só sobre os tokens da resposta, sem lote nem padding."""
+    ids = torch.tensor([item["ids"]])
+    with torch.no_grad():
+        logits = model(input_ids=ids).logits[0].float()
+    inicio = item["inicio_resposta"]
+    nll = F.cross_entropy(logits[inicio - 1:-1], ids[0, inicio:], reduction="sum")
+    return nll.item(), len(item["ids"]) - inicio
+
+@pytest.mark.parametrize("tokens_por_lote, lote_maximo", [(10_000, 64), (60, 4)])
+def test_lote_com_padding_igual_a_pontuacao_isolada(modelo, tokens_por_lote, lote_maximo):
+    exemplos = _exemplos(12)
+    lotes = montar_lotes(exemplos, tokens_por_lote, lote_maximo)
+    assert sum(len(lote) for lote in lotes) == len(exemplos)
+    if tokens_por_lote == 10_000:
+        assert len(lotes) == 1 # Um lote só, com comprimentos e inícios de resposta misturados.
+
+    for lote in lotes:
+        for item, (nll, tokens) in zip(lote, pontuar_lote(modelo, lote, PAD_ID)):
+            nll_esperada, tokens_esperados = _nll_isolada(modelo, item)
+            assert tokens == tokens_esperados
+            assert nll == pytest.approx(nll_esperada, rel=1e-4, abs=1e-4)
+
+def test_montar_lotes_respeita_o_orcamento_e_ordena_do_maior(modelo):
+    exemplos = _exemplos(30, semente=1)
+    lotes = montar_lotes(exemplos, tokens_por_lote=50, lote_maximo=3)
+    comprimentos = [len(item["ids"]) for lote in lotes for item in lote]
+    assert comprimentos == sorted(comprimentos, reverse=True)
+    for lote in lotes:
+        assert len(lote) <= 3
+        assert len(lote) == 1 or len(lote) * len(lote[0]["ids"]) <= 50
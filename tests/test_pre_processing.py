@@ -0,0 +1,25 @@
+from pre_processing import TabelaAutores, parsear_conversa_bruta
+
+EXPORTACAO = (
+    "01/02/2024 10:00 - Ana: oi\n"
+    "01/02/2024 10:01 - Beto: mensagem encaminhada\n"
+    "01/02/2024 10:02 - MeuNome: olá\n"
+    "01/02/2024 10:03 - Carla: e aí?\n"
+)
+
+def _parsear(tmp_path, **kwargs):
+    caminho = tmp_path / "Conversa do WhatsApp com Ana.txt"
+    caminho.write_text(EXPORTACAO, encoding="utf-8")
+    autores = TabelaAutores("MeuNome", "Ana")
+    return autores, parsear_conversa_bruta(str(caminho), "MeuNome", "Ana", autores, **kwargs)
+
+def test_sem_modo_de_grupo_descarta_outros_autores(tmp_path):
+    autores, mensagens = _parsear(tmp_path)
+    assert [(m["autor"], m["texto_bruto"]) for m in mensagens] == [(1, "oi"), (0, "olá")]
+    assert not autores.e_grupo()
+
+def test_modo_de_grupo_inclui_todos_os_participantes(tmp_path):
+    autores, mensagens = _parsear(tmp_path, aceitar_grupo=True)
+    assert [m["autor"] for m in mensagens] == [1, 2, 0, 3]
+    assert autores.nomes == ["MeuNome", "Ana", "Beto", "Carla"]
+    assert autores.e_grupo()
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from recarga_adaptadores import MARCADOR_COMPLETO, RecargaAdaptadores
+
+ENTRADA = [[0, 5, 9, 6, 7, 30]]
+
+def _carregar(base, adaptadores):
+    from peft import PeftModel
+    from transformers import AutoModelForCausalLM
+    return PeftModel.from_pretrained(AutoModelForCausalLM.from_pretrained(base), adaptadores).eval()
+
+def _logits(model):
+    with torch.no_grad():
+        return model(torch.tensor(ENTRADA)).logits
+
+def _salvar_checkpoint(base, adaptadores, pasta, passo, semente):
+    """Grava em `pasta/checkpoint-<passo>` os adaptadores com pesos LoRA perturbados, como faria o Trainer."""
+    model = _carregar(base, adaptadores)
+    gerador = torch.Generator().manual_seed(semente)
+    with torch.no_grad():
+        for nome, parametro in model.named_parameters():
+            if "lora_" in nome:
+                parametro.add_(torch.randn(parametro.shape, generator=gerador) * 0.05)
+    caminho = os.path.join(pasta, f"checkpoint-{passo}")
+    model.save_pretrained(caminho)
+    with open(os.path.join(caminho, MARCADOR_COMPLETO), "w") as f:
+        json.dump({"global_step": passo}, f)
+    return caminho
+
+def test_troca_de_slot_usa_os_pesos_do_checkpoint(modelo_sintetico, tmp_path):
+    base, adaptadores = modelo_sintetico
+    pasta = str(tmp_path / "results")
+    checkpoints = [_salvar_checkpoint(base, adaptadores, pasta, passo, passo) for passo in (10, 20)]
+
+    model = _carregar(base, adaptadores)
+    originais = _logits(model)
+    trocas = []
+    recarga = RecargaAdaptadores(model, pasta, ao_trocar=trocas.append)
+    torch.testing.assert_close(_logits(model), originais) # O slot reserva não muda as respostas.
+
+    for caminho in checkpoints:
+        assert recarga.carregar(caminho) is not None
+        assert not model.training
+        torch.testing.assert_close(_logits(model), _logits(_carregar(base, caminho)))
+    assert trocas == checkpoints
+    assert recarga.checkpoint_atual == checkpoints[-1] and len(recarga.trocas) == 2
+
+def test_troca_espera_as_geracoes_em_andamento(modelo_sintetico, tmp_path):
+    base, adaptadores = modelo_sintetico
+    caminho = _salvar_checkpoint(base, adaptadores, str(tmp_path / "results"), 10, 10)
+    model = _carregar(base, adaptadores)
+    originais = _logits(model)
+    recarga = RecargaAdaptadores(model, str(tmp_path / "results"))
+
+    with recarga.uso():
+        thread = threading.Thread(target=recarga.carregar, args=(caminho,))
+        thread.start()
+        thread.join(timeout=2)
+        # Enquanto a geração não termina, a troca não acontece.
+        assert thread.is_alive() and not recarga.trocas
+        torch.testing.assert_close(_logits(model), originais)
+    thread.join(timeout=10)
+    assert recarga.trocas and recarga.trocas[0]["espera_s"] > 0
+    torch.testing.assert_close(_logits(model), _logits(_carregar(base, caminho)))
+
+def test_checkpoint_sem_pesos_e_ignorado(modelo_sintetico, tmp_path):
+    base, adaptadores = modelo_sintetico
+    pasta = str(tmp_path / "results")
+    caminho = _salvar_checkpoint(base, adaptadores, pasta, 10, 10)
+    recarga = RecargaAdaptadores(_carregar(base, adaptadores), pasta)
+    for arquivo in os.listdir(caminho):
+        if arquivo.startswith("adapter_model"):
+            os.remove(os.path.join(caminho, arquivo))
+    assert recarga.verificar() is None and recarga.checkpoint_atual is None
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from registro_geracoes import COLUNAS, TAMANHO_LOTE_PARQUET, RegistroGeracoes, hash_prompt, ler_registros
+
+pd = pytest.importorskip("pandas")
+
+CONVERSA = [{"role": "system", "content": "Você é o Doppelbot."}, {"role": "user", "content": "Gosto de festas."}]
+
+def _gravar(caminho, quantidade, semente=42, **fixos):
+    with RegistroGeracoes(caminho, modelo="base", parametros={"temperature": 0.7}, semente=semente, **fixos) as registro:
+        for i in range(quantidade):
+            registro.adicionar(pergunta_id=i + 1, pergunta=f"pergunta {i}", conversa=CONVERSA, texto=f"resposta {i}",
+                               amostra=1, tokens_prompt=10 + i, tokens_resposta=None if i % 2 else 5,
+                               latencia_s=0.5)
+    return registro
+
+def _tipos_esperados():
+    return {coluna: "Int64" if tipo == "int64" else tipo for coluna, tipo in COLUNAS.items()}
+
+def test_jsonl_acumula_execucoes_e_preserva_colunas_e_tipos(tmp_path):
+    caminho = str(tmp_path / "respostas.jsonl")
+    primeira = _gravar(caminho, 3)
+    segunda = _gravar(caminho, 2, semente=None, adaptador="adaptadores")
+    with open(caminho, encoding="utf-8") as f:
+        assert all(list(json.loads(linha)) == list(COLUNAS) for linha in f)
+
+    df = ler_registros(caminho)
+    assert list(df.columns) == list(COLUNAS)
+    assert {coluna: str(tipo) for coluna, tipo in df.dtypes.items()} == _tipos_esperados()
+    assert len(df) == 5
+    assert df["execucao"].tolist() == [primeira.fixos["execucao"]] * 3 + [segunda.fixos["execucao"]] * 2
+    assert df["semente"].isna().tolist() == [False] * 3 + [True] * 2
+    assert df["tokens_resposta"].isna().tolist() == [False, True, False, False, True]
+    assert df["hash_prompt"].unique().tolist() == [hash_prompt(CONVERSA)]
+    assert json.loads(df["parametros"][0]) == {"temperature": 0.7}
+
+def test_parquet_em_varios_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    caminho = str(tmp_path / "respostas.parquet")
+    total = 2 * TAMANHO_LOTE_PARQUET + 5
+    assert _gravar(caminho, total).total == total
+
+    assert pq.ParquetFile(caminho).metadata.num_row_groups == 3
+    df = ler_registros(caminho)
+    assert list(df.columns) == list(COLUNAS)
+    assert {coluna: str(tipo) for coluna, tipo in df.dtypes.items()} == _tipos_esperados()
+    assert df["pergunta_id"].tolist() == list(range(1, total + 1))
+    assert df["tokens_resposta"].isna().sum() == total // 2
+
+def test_ler_registros_junta_os_formatos(tmp_path):
+    pytest.importorskip("pyarrow")
+    _gravar(str(tmp_path / "bot.jsonl"), 2)
+    _gravar(str(tmp_path / "base.parquet"), 3, semente=None)
+    df = ler_registros([str(tmp_path / "bot.jsonl"), str(tmp_path / "base.parquet")])
+    assert len(df) == 5 and list(df.columns) == list(COLUNAS)
+    assert str(df["semente"].dtype) == "Int64" and df["semente"].isna().sum() == 3
+
+def test_ler_registros_sem_arquivos():
+    df = ler_registros([])
+    assert df.empty and list(df.columns) == list(COLUNAS)
+    assert {coluna: str(tipo) for coluna, tipo in df.dtypes.items()} == _tipos_esperados()
+
+def test_extensao_desconhecida_encerra(tmp_path):
+    with pytest.raises(SystemExit):
+        RegistroGeracoes(str(tmp_path / "respostas.csv"), modelo="base")
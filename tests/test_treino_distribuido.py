@@ -0,0 +1,46 @@
+import os
+import random
+from argparse import Namespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+import torch.distributed as dist
+
+from treino_distribuido import lancar
+
+pytestmark = pytest.mark.skipif(not (dist.is_available() and dist.is_gloo_available()), reason="gloo indisponível")
+
+def _exemplos(quantidade, semente):
+    rng = random.Random(semente)
+    return [[rng.randint(3, 31) for _ in range(rng.randint(4, 16))] for _ in range(quantidade)]
+
+def _treinar(base, processos, saida):
+    # Sem dropout as duas configurações veem exatamente o mesmo modelo; micro-lotes de 1 exemplo
+    # fazem cada processo acumular gradientes (no_sync) antes de sincronizar.
+    args = Namespace(modelo=base, processos=processos, threads_por_processo=1, lote_efetivo=4, micro_lote=1,
+                     epocas=1, max_passos=3, taxa_aprendizado=1e-2, passos_log=100, semente=0,
+                     saida=str(saida), lora_dropout=0.0)
+    return lancar(args, _exemplos(12, semente=1), _exemplos(5, semente=2))
+
+def test_dois_processos_gloo_equivalem_a_um(modelo_sintetico, tmp_path):
+    from safetensors.torch import load_file
+
+    base, _ = modelo_sintetico
+    um = _treinar(base, 1, tmp_path / "um")
+    dois = _treinar(base, 2, tmp_path / "dois")
+
+    assert (um["passos"], um["tokens"]) == (dois["passos"], dois["tokens"]) == (3, um["tokens"])
+    # A norma do gradiente sincronizado de cada passo pega erros de escala, que o AdamW esconderia nos pesos.
+    for chave in ("loss", "norma_gradiente"):
+        assert [h[chave] for h in dois["historico"]] == pytest.approx([h[chave] for h in um["historico"]], rel=1e-5)
+    assert um["historico"][0]["loss"] != um["historico"][-1]["loss"]
+    assert dois["loss_validacao"] == pytest.approx(um["loss_validacao"], rel=1e-5)
+
+    pesos_um = load_file(os.path.join(tmp_path / "um", "adapter_model.safetensors"))
+    pesos_dois = load_file(os.path.join(tmp_path / "dois", "adapter_model.safetensors"))
+    assert pesos_um.keys() == pesos_dois.keys()
+    for nome, tensor in pesos_um.items():
+        # O AdamW divide pela raiz do segundo momento: em gradientes quase nulos, a ordem diferente das somas
+        # (arredondamento) vira uma diferença de ~1e-5 no passo, que tem ordem 1e-2 (a taxa de aprendizado).
+        torch.testing.assert_close(pesos_dois[nome], tensor, rtol=1e-3, atol=1e-4)
@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+
+import instrumentacao
+from add_instruction import MAX_TOKENS_EXEMPLO, formatar_conversa_para_treino
+from formato_dados import iterar_conversas, resolver_caminho
+
+# --- CONFIGURAÇÕES ---
+# Mesmos hiperparâmetros de LoRA do fine_tuning.py.
+CONFIG_LORA = dict(
+    lora_alpha=128,
+    lora_dropout=0.1,
+    r=64,
+    bias="none",
+    task_type="CAUSAL_LM",
+    target_modules=[
+        "q_proj", "k_proj", "v_proj", "o_proj",
+        "gate_proj", "up_proj", "down_proj",
+    ],
+)
+MAX_SEQ_LENGTH = MAX_TOKENS_EXEMPLO
+
+# --- Dados Pré-tokenizados ---
+
+def pretokenizar(caminho_dataset, tokenizer, max_seq_length=MAX_SEQ_LENGTH):
+    """Tokeniza o dataset instrucional uma única vez, no mesmo texto visto pelo fine_tuning.py."""
+    textos = [formatar_conversa_para_treino(conversa) for conversa in iterar_conversas(caminho_dataset)]
+    return tokenizer(textos, truncation=True, max_length=max_seq_length)["input_ids"]
+
+def _montar_lote(sequencias, pad_id):
+    maior = max(len(s) for s in sequencias)
+    input_ids = torch.full((len(sequencias), maior), pad_id, dtype=torch.long)
+    rotulos = torch.full((len(sequencias), maior), -100, dtype=torch.long)
+    mascara = torch.zeros((len(sequencias), maior), dtype=torch.long)
+    for linha, sequencia in enumerate(sequencias):
+        input_ids[linha, :len(sequencia)] = torch.tensor(sequencia)
+        rotulos[linha, :len(sequencia)] = torch.tensor(sequencia)
+        mascara[linha, :len(sequencia)] = 1
+    return input_ids, mascara, rotulos
+
+def _nll_soma(model, lote):
+    """Soma do log-negativo da verossimilhança e número de tokens previstos no lote."""
+    input_ids, mascara, rotulos = lote
+    logits = model(input_ids=input_ids, attention_mask=mascara).logits
+    alvos = rotulos[:, 1:]
+    nll = F.cross_entropy(logits[:, :-1].reshape(-1, logits.shape[-1]).float(), alvos.reshape(-1),
+                          ignore_index=-100, reduction="sum")
+    return nll, int((alvos != -100).sum())
+
+def _somar_entre_processos(*valores):
+    """all_reduce (soma) de escalares entre os processos; no modo de processo único só devolve os valores."""
+    tensor = torch.tensor(valores, dtype=torch.float64)
+    if dist.is_initialized():
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+# --- Processo de Treino ---
+
+def treinar_processo(rank, world_size, args, porta, exemplos, validacao):
+    """
+    Executado em cada processo. A cada passo do otimizador o lote global é
+    o mesmo do modo de processo único; cada rank processa sua fatia
+    (lote_global[rank::world_size]). A loss é normalizada pelo total de tokens
+    do lote global, então o gradiente médio do DDP é idêntico ao de um único
+    processo. Com dropout as máscaras sorteadas em cada processo são outras, e
+    a equivalência vale em média; com `--lora-dropout 0` ela é exata (a menos
+    do arredondamento de ponto flutuante).
+    """
+    from peft import LoraConfig, get_peft_model
+    from torch.nn.parallel import DistributedDataParallel
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    distribuido = world_size > 1
+    if distribuido:
+        dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{porta}", rank=rank, world_size=world_size)
+    torch.set_num_threads(args.threads_por_processo or max(1, (os.cpu_count() or 1) // world_size))
+    torch.manual_seed(args.semente)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.modelo)
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    model = AutoModelForCausalLM.from_pretrained(args.modelo, torch_dtype=torch.float32)
+    model.config.use_cache = False
+    model = get_peft_model(model, LoraConfig(**{**CONFIG_LORA, "lora_dropout": args.lora_dropout}))
+    modelo_treino = DistributedDataParallel(model) if distribuido else model
+    otimizador = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad],
+                                   lr=args.taxa_aprendizado, weight_decay=0.001)
+
+    passos_por_epoca = len(exemplos) // args.lote_efetivo
+    total_passos = int(passos_por_epoca * args.epocas)
+    if args.max_passos > 0:
+        total_passos = min(total_passos, args.max_passos)
+    micro_lotes_por_rank = args.lote_efetivo // (world_size * args.micro_lote)
+
+    historico, tokens_processados, passo = [], 0, 0
+    inicio = time.perf_counter()
+    modelo_treino.train()
+    while passo < total_passos:
+        # Todos os ranks embaralham com a mesma semente: a ordem global é a mesma do processo único.
+        ordem = list(range(len(exemplos)))
+        random.Random(args.semente + passo // max(1, passos_por_epoca)).shuffle(ordem)
+        for inicio_lote in range(0, passos_por_epoca * args.lote_efetivo, args.lote_efetivo):
+            if passo >= total_passos:
+                break
+            fatia = ordem[inicio_lote:inicio_lote + args.lote_efetivo][rank::world_size]
+            micro_lotes = [_montar_lote([exemplos[i] for i in fatia[j:j + args.micro_lote]], pad_id)
+                           for j in range(0, len(fatia), args.micro_lote)]
+
+            tokens_rank = sum(int((rotulos[:, 1:] != -100).sum()) for _, _, rotulos in micro_lotes)
+            tokens_globais, = _somar_entre_processos(tokens_rank)
+
+            nll_rank = 0.0
+            for j, micro_lote in enumerate(micro_lotes):
+                # Só sincroniza os gradientes no último micro-lote do passo.
+                sincronizar = not distribuido or j == micro_lotes_por_rank - 1
+                contexto = modelo_treino.no_sync() if not sincronizar else nullcontext()
+                with contexto:
+                    nll, _ = _nll_soma(modelo_treino, micro_lote)
+                    (nll * world_size / tokens_globais).backward()
+                nll_rank += nll.item()
+
+            norma_gradiente = torch.nn.utils.clip_grad_norm_(model.parameters(), 0.3).item() # Antes do corte.
+            otimizador.step()
+            otimizador.zero_grad(set_to_none=True)
+            passo += 1
+            tokens_processados += tokens_globais
+
+            nll_global, = _somar_entre_processos(nll_rank)
+            historico.append({"passo": passo, "loss": nll_global / tokens_globais, "norma_gradiente": norma_gradiente})
+            if rank == 0 and (passo % args.passos_log == 0 or passo == total_passos):
+                print(f"[passo {passo}/{total_passos}] loss {nll_global / tokens_globais:.4f}")
+    duracao = time.perf_counter() - inicio
+
+    resultado = {
+        "processos": world_size,
+        "passos": passo,
+        "tempo_s": duracao,
+        "tokens": tokens_processados,
+        "tokens_por_s": tokens_processados / duracao if duracao else 0.0,
+        "historico": historico,
+    }
+    if validacao:
+        model.eval()
+        nll_rank, tokens_rank = 0.0, 0
+        with torch.no_grad():
+            minha_parte = validacao[rank::world_size]
+            for j in range(0, len(minha_parte), 8):
+                nll, tokens = _nll_soma(model, _montar_lote(minha_parte[j:j + 8], pad_id))
+                nll_rank, tokens_rank = nll_rank + nll.item(), tokens_rank + tokens
+        nll_total, tokens_total = _somar_entre_processos(nll_rank, tokens_rank)
+        resultado["loss_validacao"] = nll_total / tokens_total if tokens_total else None
+
+    if rank == 0:
+        if args.saida:
+            model.save_pretrained(args.saida)
+            tokenizer.save_pretrained(args.saida)
+        with open(args.arquivo_resultado, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f)
+    if distribuido:
+        dist.barrier()
+        dist.destroy_process_group()
+
+# --- Lançador ---
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def lancar(args, exemplos, validacao=None):
+    """
+    Treina com `args.processos` processos via DDP/gloo. Com 1 processo (ou sem
+    suporte a torch.distributed) roda o mesmo laço no processo atual, sem DDP.
+    Retorna o dicionário de resultados do rank 0.
+    """
+    processos = args.processos
+    if processos > 1 and not (dist.is_available() and dist.is_gloo_available()):
+        print("AVISO: backend gloo indisponível; usando um único processo.")
+        processos = 1
+    if args.lote_efetivo % (processos * args.micro_lote) != 0:
+        print(f"ERRO: --lote-efetivo ({args.lote_efetivo}) deve ser múltiplo de processos x micro-lote "
+              f"({processos} x {args.micro_lote}).")
+        sys.exit(1)
+    if len(exemplos) < args.lote_efetivo:
+        print(f"ERRO: O dataset tem {len(exemplos)} exemplos, menos que um lote efetivo ({args.lote_efetivo}).")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        args.arquivo_resultado = os.path.join(pasta, "resultado.json")
+        if processos == 1:
+            treinar_processo(0, 1, args, None, exemplos, validacao)
+        else:
+            import torch.multiprocessing as mp
+            mp.spawn(treinar_processo, args=(processos, args, _porta_livre(), exemplos, validacao),
+                     nprocs=processos, join=True)
+        with open(args.arquivo_resultado, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+def adicionar_argumentos_treino(parser):
+    parser.add_argument("--processos", type=int, default=1, help="Processos DDP (1 = processo único, sem DDP).")
+    parser.add_argument("--threads-por-processo", type=int, default=None,
+                        help="Threads do PyTorch em cada processo (padrão: núcleos / processos).")
+    parser.add_argument("--lote-efetivo", type=int, default=8, help="Exemplos por passo do otimizador, somando todos os processos.")
+    parser.add_argument("--micro-lote", type=int, default=1)
+    parser.add_argument("--epocas", type=float, default=1)
+    parser.add_argument("--max-passos", type=int, default=-1)
+    parser.add_argument("--taxa-aprendizado", type=float, default=2e-5)
+    parser.add_argument("--passos-log", type=int, default=10)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--lora-dropout", type=float, default=CONFIG_LORA["lora_dropout"],
+                        help="Dropout dos adaptadores (0 torna o resultado idêntico para qualquer número de processos).")
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fine-tuning LoRA em CPU com vários processos (DistributedDataParallel sobre gloo). "
+                    "Para treino QLoRA em GPU continue usando o fine_tuning.py.",
+        epilog="Exemplo: python treino_distribuido.py caminho/modelo_pequeno --processos 4"
+    )
+    parser.add_argument("modelo", help="Pasta ou ID de um modelo pequeno o bastante para treinar em CPU.")
+    parser.add_argument("--dataset", default="dataset_instruct.jsonl")
+    parser.add_argument("--validacao", default="dataset_instruct_validacao.jsonl")
+    parser.add_argument("--saida", default="doppelbot-adaptadores-cpu")
+    adicionar_argumentos_treino(parser)
+    args = parser.parse_args()
+    # O .parquet de mesmo nome, se a Etapa 3 gravou nesse formato.
+    args.dataset, args.validacao = resolver_caminho(args.dataset), resolver_caminho(args.validacao)
+
+    if not os.path.exists(args.dataset):
+        print(f"ERRO: Arquivo de dataset '{args.dataset}' não encontrado.")
+        sys.exit(1)
+
+    instrumentacao.iniciar("treino_distribuido")
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.modelo)
+    print(f"Pré-tokenizando '{args.dataset}'...")
+    with instrumentacao.etapa("pretokenizacao", unidade="exemplos") as registro:
+        exemplos = pretokenizar(args.dataset, tokenizer)
+        validacao = pretokenizar(args.validacao, tokenizer) if os.path.exists(args.validacao) else None
+        registro["itens"] = len(exemplos) + len(validacao or [])
+
+    print(f"Treinando com {args.processos} processo(s) em {len(exemplos)} exemplos...")
+    with instrumentacao.etapa("treino", unidade="tokens") as registro:
+        resultado = lancar(args, exemplos, validacao)
+        registro["itens"] = resultado["tokens"]
+    print("-" * 50)
+    print(f"Passos: {resultado['passos']} em {resultado['tempo_s']:.1f}s ({resultado['tokens_por_s']:.0f} tokens/s)")
+    if resultado.get("loss_validacao") is not None:
+        print(f"Loss de validação: {resultado['loss_validacao']:.4f}")
+    print(f"Adaptadores salvos em '{args.saida}'.")